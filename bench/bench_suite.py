@@ -0,0 +1,321 @@
+"""
+Hot-path benchmark suite with a stored baseline.
+
+Usage:
+    python bench/bench_suite.py                     # run and print µs/op
+    python bench/bench_suite.py --size stress       # only one size (realistic | stress)
+    python bench/bench_suite.py --save              # write bench/baseline.json
+    python bench/bench_suite.py --compare [--threshold 0.25]
+
+Everything runs offline on synthetic data shaped like the live bot's:
+
+    tu.parse            parse_tu over the golden `$tu` corpus
+    tu.refresh          parse + ChannelState.apply_report + summary (the
+                        part of fetch_startup_timers after the reply)
+    tu.segment          parse_time_segment
+    watchlist.lookup    exact lookups, half hits, at 1k / 10k names
+    watchlist.fuzzy     misses through the trigram index (FUZZY_THRESHOLD)
+    roll.extract        roll_event.extract on roll embeds with buttons
+    roll.reject         extract on Mudae embeds that aren't rolls
+    roll.decide         extract + watchlist + claim policy (on_message's
+                        synchronous part)
+    roll.ingest         decide + planner.observe + history.record at the
+                        size's rolls per minute (includes history flushes)
+    schedule.pick       auto_roll's pick of the next channel: scheduler pop
+                        with planner ranking across every due channel
+
+The golden corpus is checked first. `--compare` exits 1 if any benchmark is
+slower than the baseline by more than the threshold (a fraction, 0.25 =
+25%), keeping the best of RETRIES re-timings of anything that looks slower.
+Baselines are machine-specific: re-run `--save` on the machine that does the
+comparing.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import discord  # noqa: E402
+
+from bench_tu import check_corpus, load_corpus  # noqa: E402
+from history import RollHistory  # noqa: E402
+from planner import RollPlanner  # noqa: E402
+from policy import compile_policy  # noqa: E402
+from roll_event import KAKERA_EMOJIS, extract  # noqa: E402
+from scheduler import Scheduler  # noqa: E402
+from sim.fakes import FakeActionRow, FakeButton, FakeMessage, FakeUser  # noqa: E402
+from state import ChannelState  # noqa: E402
+from tu_parser import parse_time_segment, parse_tu  # noqa: E402
+from watchlist import Watchlist  # noqa: E402
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+DEFAULT_THRESHOLD = 0.25
+REPEAT = 5
+RETRIES = 2  # re-timings of an apparent regression before --compare fails
+
+SIZES = {
+    "realistic": {"names": 1_000, "channels": 10, "rolls_per_min": 100},
+    "stress": {"names": 10_000, "channels": 50, "rolls_per_min": 1_000},
+}
+
+_SYLLABLES = ["ka", "ri", "to", "mi", "su", "ne", "ra", "yu", "ko", "ha", "shi", "ren", "zu", "no", "a", "el"]
+_SERIES = ["Re:Zero", "Sword Art Online", "Steins;Gate", "Fate/stay night", "Bleach", "Monogatari"]
+_HEARTS = ["❤️", "💕", "💘", "💖", "💓", "💗"]
+
+
+def _name(rng: random.Random) -> str:
+    first = "".join(rng.choice(_SYLLABLES) for _ in range(rng.randint(2, 4))).title()
+    last = "".join(rng.choice(_SYLLABLES) for _ in range(rng.randint(2, 4))).title()
+    return f"{first} {last}"
+
+
+def _roll_message(rng: random.Random, author: FakeUser, name: str) -> FakeMessage:
+    kakera = int(30 + rng.paretovariate(1.6) * 25)
+    embed = discord.Embed(description=f"{rng.choice(_SERIES)}\n**{kakera:,}**<:kakera:469835869059153940>")
+    embed.set_author(name=name)
+    msg = FakeMessage(None, author, embeds=[embed])
+    if rng.random() < 0.3:
+        embed.set_footer(text="Belongs to someone_else")
+        emoji_id = rng.choice(list(KAKERA_EMOJIS))
+        emoji = discord.PartialEmoji(name=KAKERA_EMOJIS[emoji_id], id=emoji_id)
+    else:
+        emoji = discord.PartialEmoji(name=rng.choice(_HEARTS))
+    msg.components = [FakeActionRow([FakeButton(None, msg, emoji)])]
+    return msg
+
+
+class Fixture:
+    """Synthetic watchlist, rolls, channel states and planner for one size."""
+
+    def __init__(self, size: dict, seed: int = 1):
+        rng = random.Random(seed)
+        self.size = size
+        self.scratch = tempfile.TemporaryDirectory(prefix="mudae-bench-")
+        self.names = [_name(rng) for _ in range(size["names"])]
+        self.watchlist = Watchlist(self.names)
+        self.fuzzy_watchlist = Watchlist(self.names, fuzzy_threshold=0.85)
+        self.policy = compile_policy({}, min_kakera=200)
+        author = FakeUser(432610292342587392, "Mudae")
+        # roughly one roll in twenty is a watchlist name
+        rolled = [rng.choice(self.names) if rng.random() < 0.05 else _name(rng) for _ in range(1_000)]
+        self.rolls = [_roll_message(rng, author, name) for name in rolled]
+        self.probes = [rng.choice(self.names) if i % 2 else _name(rng) for i in range(1_000)]
+        self.misses = [_name(rng) for _ in range(200)]
+        self.non_rolls = []
+        for _ in range(200):
+            embed = discord.Embed(description="Series: x\nKakera value")
+            self.non_rolls.append(FakeMessage(None, author, embeds=[embed]))  # $im and the like: no buttons
+        self.channels = [1_000 + i for i in range(size["channels"])]
+        self.channel_of = [rng.choice(self.channels) for _ in self.rolls]
+        reports = [parse_tu(entry["raw"]) for entry in load_corpus()]
+        self.states = {cid: ChannelState.from_report(rng.choice(reports)) for cid in self.channels}
+        self.planner = RollPlanner(["$wa", "$ha", "$ma"])
+        for i, msg in enumerate(self.rolls):
+            self.planner.sent(self.channel_of[i], rng.choice(self.planner.commands), now=0.0)
+            event = extract(msg)
+            decision = self.policy.decide(self.channel_of[i], event.name, event.series, event.kakera, None)
+            self.planner.observe(self.channel_of[i], event.kakera, decision, event.owned, now=0.5)
+
+
+# ---- benchmarks: name -> (fixture -> (fn, ops per call)) ----
+def bench_tu_parse(fx):
+    raws = [entry["raw"] for entry in load_corpus()]
+    return lambda: [parse_tu(raw) for raw in raws], len(raws)
+
+
+def bench_tu_refresh(fx):
+    raws = [entry["raw"] for entry in load_corpus()]
+    state = ChannelState()
+
+    def run():
+        for raw in raws:
+            state.apply_report(parse_tu(raw), now=0.0)
+            state.summary(now=0.0)
+    return run, len(raws)
+
+
+def bench_tu_segment(fx):
+    segments = ["1h 18", "1h 18 min", "28", "28 min", "49 m", "**2h 05**"]
+    return lambda: [parse_time_segment(seg) for seg in segments], len(segments)
+
+
+def bench_watchlist_lookup(fx):
+    lookup = fx.watchlist.lookup
+    probes = fx.probes
+    return lambda: [lookup(name) for name in probes], len(probes)
+
+
+def bench_watchlist_fuzzy(fx):
+    lookup = fx.fuzzy_watchlist.lookup
+    misses = fx.misses
+    return lambda: [lookup(name) for name in misses], len(misses)
+
+
+def bench_roll_extract(fx):
+    rolls = fx.rolls
+    return lambda: [extract(msg) for msg in rolls], len(rolls)
+
+
+def bench_roll_reject(fx):
+    non_rolls = fx.non_rolls
+    return lambda: [extract(msg) for msg in non_rolls], len(non_rolls)
+
+
+def bench_roll_decide(fx):
+    rolls, channel_of, lookup, decide = fx.rolls, fx.channel_of, fx.watchlist.lookup, fx.policy.decide
+
+    def run():
+        for i, msg in enumerate(rolls):
+            event = extract(msg)
+            decide(channel_of[i], event.name, event.series, event.kakera, lookup(event.name))
+    return run, len(rolls)
+
+
+def bench_roll_ingest(fx):
+    rolls, channel_of, lookup, decide = fx.rolls, fx.channel_of, fx.watchlist.lookup, fx.policy.decide
+    planner = fx.planner
+    history = RollHistory(fx.scratch.name)
+    step = 60.0 / fx.size["rolls_per_min"]
+    clock = {"ts": 0.0, "mid": 0}
+
+    def run():
+        for i, msg in enumerate(rolls):
+            clock["ts"] += step
+            clock["mid"] += 1
+            event = extract(msg)
+            decision = decide(channel_of[i], event.name, event.series, event.kakera, lookup(event.name))
+            planner.sent(channel_of[i], "$wa", now=clock["ts"])
+            planner.observe(channel_of[i], event.kakera, decision, event.owned, now=clock["ts"])
+            history.record(clock["mid"], channel_of[i], event.name, event.kakera, decision.claim, 1e-5,
+                           decision.reason, ts=clock["ts"])
+    return run, len(rolls)
+
+
+def bench_schedule_pick(fx):
+    planner, states = fx.planner, fx.states
+    scheduler = Scheduler(max_workers=3, rank=lambda cid, kind: planner.channel_value(cid, states.get(cid), now=0.0))
+    rng = random.Random(2)
+    for cid in fx.channels:
+        scheduler.arm(cid, rng.uniform(-60, 0), "roll")
+    picks = 200
+
+    def run():
+        # every channel is due: the worst case, each pick ranks all of them
+        for _ in range(picks):
+            _, _, cid, kind = scheduler._pop_due(1.0)
+            scheduler._armed.pop(cid, None)
+            scheduler.arm(cid, rng.uniform(-60, 0), kind)
+    return run, picks
+
+
+BENCHMARKS = {
+    "tu.parse": bench_tu_parse,
+    "tu.refresh": bench_tu_refresh,
+    "tu.segment": bench_tu_segment,
+    "watchlist.lookup": bench_watchlist_lookup,
+    "watchlist.fuzzy": bench_watchlist_fuzzy,
+    "roll.extract": bench_roll_extract,
+    "roll.reject": bench_roll_reject,
+    "roll.decide": bench_roll_decide,
+    "roll.ingest": bench_roll_ingest,
+    "schedule.pick": bench_schedule_pick,
+}
+
+
+def _time(fn, ops: int, min_time: float) -> float:
+    """µs per operation of `fn` (which does `ops` operations), best of REPEAT runs."""
+    number = 1
+    while timeit.timeit(fn, number=number) < min_time / REPEAT and number < 1 << 16:
+        number *= 2
+    return min(timeit.repeat(fn, number=number, repeat=REPEAT)) / (number * ops) * 1e6
+
+
+def run_suite(sizes: list[str], only: set[str] | None = None, min_time: float = 0.2) -> dict[str, float]:
+    """µs per operation, keyed "<benchmark>[<size>]" (only the keys in `only`, if given)."""
+    results = {}
+    for size in sizes:
+        wanted = [name for name in BENCHMARKS if only is None or f"{name}[{size}]" in only]
+        if not wanted:
+            continue
+        fx = Fixture(SIZES[size])
+        for name in wanted:
+            fn, ops = BENCHMARKS[name](fx)
+            results[f"{name}[{size}]"] = _time(fn, ops, min_time)
+        fx.scratch.cleanup()
+    return results
+
+
+def compare(results: dict[str, float], baseline: dict[str, float], threshold: float) -> list[str]:
+    """Names of benchmarks slower than baseline by more than `threshold`."""
+    return [name for name, us in results.items() if name in baseline and us > baseline[name] * (1 + threshold)]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Offline hot-path benchmarks.")
+    parser.add_argument("--size", choices=[*SIZES, "all"], default="all")
+    parser.add_argument("--save", action="store_true", help=f"write results to {os.path.relpath(BASELINE_PATH, ROOT)}")
+    parser.add_argument("--compare", action="store_true", help="fail on regressions against the baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="allowed slowdown (0.25 = 25%%)")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    args = parser.parse_args()
+
+    corpus = load_corpus()
+    failures = check_corpus(corpus)
+    if failures:
+        print(f"❌ {failures}/{len(corpus)} $tu corpus entries failed")
+        sys.exit(1)
+
+    baseline = {}
+    if args.compare:
+        try:
+            with open(args.baseline, encoding="utf-8") as f:
+                stored = json.load(f)
+        except FileNotFoundError:
+            print(f"❌ No baseline at {args.baseline}; create one with --save")
+            sys.exit(2)
+        baseline = stored["results"]
+
+    sizes = list(SIZES) if args.size == "all" else [args.size]
+    results = run_suite(sizes)
+    if args.compare:
+        # a slowdown has to show up again before it counts: shared machines are noisy
+        for _ in range(RETRIES):
+            slower = compare(results, baseline, args.threshold)
+            if not slower:
+                break
+            for name, us in run_suite(sizes, only=set(slower)).items():
+                results[name] = min(results[name], us)
+
+    print(f"{'benchmark':<28} {'µs/op':>10} {'baseline':>10} {'change':>8}")
+    for name, us in results.items():
+        base = baseline.get(name)
+        change = f"{(us / base - 1) * 100:+.0f}%" if base else ""
+        print(f"{name:<28} {us:>10.3f} {'' if base is None else f'{base:.3f}':>10} {change:>8}")
+
+    if args.save:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({
+                "python": platform.python_version(),
+                "machine": f"{platform.system()} {platform.machine()}",
+                "results": {name: round(us, 4) for name, us in results.items()},
+            }, f, indent=2)
+            f.write("\n")
+        print(f"💾 Baseline written to {args.baseline}")
+
+    if args.compare:
+        slower = compare(results, baseline, args.threshold)
+        if slower:
+            print(f"❌ {len(slower)} regression(s) over {args.threshold:.0%}: {', '.join(slower)}")
+            sys.exit(1)
+        print(f"✅ No regressions over {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
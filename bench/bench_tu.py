@@ -0,0 +1,67 @@
+"""
+Microbenchmark + golden check for the `$tu` parser.
+
+Usage:
+    python bench/bench_tu.py [iterations]
+
+Every corpus entry is parsed and compared against its recorded `expected`
+result first; any mismatch exits non-zero before timing starts.
+"""
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tu_parser import parse_time_segment, parse_tu  # noqa: E402
+
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tu_corpus.json")
+
+
+def load_corpus(path: str = CORPUS_PATH) -> list[dict]:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def check_corpus(corpus: list[dict]) -> int:
+    """Return the number of corpus entries whose parse differs from `expected`."""
+    failures = 0
+    for entry in corpus:
+        got = parse_tu(entry["raw"]).as_dict()
+        if got != entry["expected"]:
+            failures += 1
+            diff = {k: (entry["expected"].get(k), v) for k, v in got.items() if entry["expected"].get(k) != v}
+            print(f"❌ {entry['name']}: (expected, got) {diff}")
+    return failures
+
+
+def main() -> None:
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    corpus = load_corpus()
+
+    failures = check_corpus(corpus)
+    if failures:
+        print(f"❌ {failures}/{len(corpus)} corpus entries failed")
+        sys.exit(1)
+    print(f"✅ {len(corpus)} corpus entries match")
+
+    raws = [entry["raw"] for entry in corpus]
+    segments = ["1h 18", "1h 18 min", "28", "28 min", "49 m", "**2h 05**"]
+
+    def run_tu():
+        for raw in raws:
+            parse_tu(raw)
+
+    def run_segments():
+        for seg in segments:
+            parse_time_segment(seg)
+
+    for label, fn, per in (("parse_tu", run_tu, len(raws)), ("parse_time_segment", run_segments, len(segments))):
+        best = min(timeit.repeat(fn, number=iterations // per or 1, repeat=5))
+        calls = (iterations // per or 1) * per
+        print(f"⏱ {label}: {best / calls * 1e6:.2f} µs/call ({calls} calls)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+"""
+Typed bot configuration.
+
+Settings are read from `.env`, an optional TOML file (CONFIG_FILE, default
+`mudae.toml`, keys named like the env variables in any case) and the
+process environment, later sources winning. Every field is parsed with its
+type and range-checked, and all problems are reported together in one
+ConfigError instead of a crash on the first `int(None)`.
+
+A reload builds a new Config the same way. `diff` lists the changed fields;
+the caller applies them to the running bot, except RESTART_ONLY fields,
+which keep their running value until the next start.
+"""
+import ast
+import os
+import tomllib
+import typing
+from dataclasses import MISSING, dataclass, fields
+
+from dotenv import dotenv_values
+
+ENV_FILE = ".env"
+DEFAULT_CONFIG_FILE = "mudae.toml"
+
+# env names that aren't just the upper-cased field name
+_ENV_NAMES = {"token": "DISCORD_TOKEN"}
+# fields whose new value only takes effect after a restart
+RESTART_ONLY = frozenset({"token", "state_db", "history_dir", "metrics_port", "log_queue_size", "roll_workers",
+                          "lean_mode", "message_cache", "loop_lag_interval"})
+
+
+class ConfigError(ValueError):
+    """One or more settings are missing or invalid; the message has one line per problem."""
+
+    def __init__(self, problems: list[str]):
+        super().__init__("\n".join(problems))
+        self.problems = problems
+
+
+@dataclass(slots=True)
+class Config:
+    token: str
+    character_channel_id: int
+    owner_id: int
+    commands_channel_id: int
+    allowed_channels: frozenset[int]
+    username: str = ""
+    rolling_commands: tuple[str, ...] = ("$wa",)
+    kakera_list: tuple[str, ...] = ()
+    timer: float = 10.0  # base delay in seconds for claiming actions
+    min_kakera: int = 0
+    claim_policy: str = "claim_policy.toml"
+    fuzzy_threshold: float = 0.0
+    click_retries: int = 3
+    click_retry_delay: float = 0.8
+    roll_wait_event_timeout: float = 6.0
+    claim_confirm_timeout: float = 5.0
+    send_rate: float = 2.0
+    send_burst: int = 5
+    channel_send_rate: float = 1.0
+    channel_send_burst: int = 3
+    delay_between_rolls: float = 3.0
+    roll_workers: int = 3
+    roll_task_limit: int = 32  # roll handlers (claim/kakera clicks) in flight at once
+    startup_concurrency: int = 4  # channels whose timers are discovered in parallel after login
+    state_db: str = "mudae_state.db"
+    history_dir: str = "roll_history"
+    metrics_port: int = 0
+    log_level: str = "info"
+    log_levels: str = ""
+    log_format: str = "json"
+    log_queue_size: int = 10000
+    config_watch: float = 5.0  # seconds between checks of .env / CONFIG_FILE for changes, 0 disables
+    lean_mode: bool = False  # small caches, no member caching, drop events of other channels (lean.py)
+    message_cache: int = 200  # messages kept in the client cache in lean mode
+    shadow_mode: bool = False  # dry run: decide everything, never roll, claim, $rt or click (shadow.py)
+    shadow_policy: str = ""  # candidate claim policy decided next to the live one
+    shadow_kakera_list: tuple[str, ...] = ()  # candidate KAKERA_LIST (empty: same as KAKERA_LIST)
+    loop_lag_interval: float = 1.0  # seconds between event-loop lag samples ($looplag), 0 disables
+
+    def diff(self, other: "Config") -> dict[str, tuple]:
+        """name -> (current, other) for every field that differs."""
+        changed = {}
+        for f in fields(self):
+            old, new = getattr(self, f.name), getattr(other, f.name)
+            if old != new:
+                changed[f.name] = (old, new)
+        return changed
+
+
+# (check, message) per field; checks run on parsed values
+_CHECKS = {
+    "allowed_channels": (lambda v: bool(v), "needs at least one channel id"),
+    "rolling_commands": (lambda v: bool(v), "needs at least one command"),
+    "timer": (lambda v: v >= 0, "must be >= 0"),
+    "min_kakera": (lambda v: v >= 0, "must be >= 0"),
+    "fuzzy_threshold": (lambda v: 0 <= v <= 1, "must be between 0 and 1"),
+    "click_retries": (lambda v: v >= 1, "must be >= 1"),
+    "click_retry_delay": (lambda v: v >= 0, "must be >= 0"),
+    "roll_wait_event_timeout": (lambda v: v > 0, "must be > 0"),
+    "claim_confirm_timeout": (lambda v: v > 0, "must be > 0"),
+    "send_rate": (lambda v: v > 0, "must be > 0"),
+    "send_burst": (lambda v: v >= 1, "must be >= 1"),
+    "channel_send_rate": (lambda v: v > 0, "must be > 0"),
+    "channel_send_burst": (lambda v: v >= 1, "must be >= 1"),
+    "delay_between_rolls": (lambda v: v >= 0, "must be >= 0"),
+    "roll_workers": (lambda v: v >= 1, "must be >= 1"),
+    "roll_task_limit": (lambda v: v >= 1, "must be >= 1"),
+    "startup_concurrency": (lambda v: v >= 1, "must be >= 1"),
+    "metrics_port": (lambda v: 0 <= v <= 65535, "must be a port number (0 disables)"),
+    "log_level": (lambda v: v.lower() in ("debug", "info", "warning", "error"), "must be debug, info, warning or error"),
+    "log_format": (lambda v: v.lower() in ("json", "text"), "must be json or text"),
+    "log_queue_size": (lambda v: v >= 1, "must be >= 1"),
+    "config_watch": (lambda v: v >= 0, "must be >= 0"),
+    "message_cache": (lambda v: v >= 1, "must be >= 1"),
+    "loop_lag_interval": (lambda v: v >= 0, "must be >= 0"),
+}
+
+
+def env_name(field_name: str) -> str:
+    return _ENV_NAMES.get(field_name, field_name.upper())
+
+
+def parse_list(value) -> list[str]:
+    """Comma-separated or Python-list-like ("['a', 'b']") values, or a TOML array."""
+    if isinstance(value, (list, tuple)):
+        return [str(item).strip() for item in value if str(item).strip()]
+    value = str(value).strip()
+    if value.startswith("[") and value.endswith("]"):
+        try:
+            return [str(item).strip() for item in ast.literal_eval(value)]
+        except (ValueError, SyntaxError):
+            raise ValueError(f"not a valid list: {value}") from None
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def _parse_int(value) -> int:
+    if isinstance(value, bool):
+        raise ValueError(f"expected an integer, got {value!r}")
+    if isinstance(value, int):
+        return value
+    try:
+        return int(str(value).strip())
+    except ValueError:
+        raise ValueError(f"expected an integer, got {value!r}") from None
+
+
+def _parse_float(value) -> float:
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    try:
+        return float(str(value).strip())
+    except ValueError:
+        raise ValueError(f"expected a number, got {value!r}") from None
+
+
+def _parse_bool(value) -> bool:
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in ("1", "true", "yes", "on"):
+        return True
+    if text in ("0", "false", "no", "off"):
+        return False
+    raise ValueError(f"expected true or false, got {value!r}")
+
+
+def _parse_ids(value) -> frozenset[int]:
+    items = value if isinstance(value, (list, tuple)) else parse_list(value)
+    bad = [str(item) for item in items if not str(item).strip().isdigit()]
+    if bad:
+        raise ValueError(f"not channel ids: {', '.join(bad)}")
+    return frozenset(int(str(item).strip()) for item in items)
+
+
+def _parse_str(value) -> str:
+    return str(value).strip()
+
+
+_PARSERS = {
+    bool: _parse_bool,
+    int: _parse_int,
+    float: _parse_float,
+    str: _parse_str,
+    frozenset: _parse_ids,
+    tuple: lambda value: tuple(parse_list(value)),
+}
+
+
+def read_sources(env_file: str = ENV_FILE, environ: typing.Mapping[str, str] | None = None) -> dict:
+    """Raw values by env name: .env, then CONFIG_FILE, then the process environment."""
+    environ = os.environ if environ is None else environ
+    values = _dotenv(env_file)
+    config_file = _config_file(env_file, environ)
+    if os.path.exists(config_file):
+        try:
+            with open(config_file, "rb") as f:
+                values.update({key.upper(): value for key, value in tomllib.load(f).items()})
+        except tomllib.TOMLDecodeError as exc:
+            raise ConfigError([f"{config_file}: {exc}"]) from None
+    values.update(environ)
+    return values
+
+
+def _dotenv(env_file: str) -> dict:
+    if not os.path.exists(env_file):
+        return {}
+    return {k: v for k, v in dotenv_values(env_file).items() if v is not None}
+
+
+def _config_file(env_file: str = ENV_FILE, environ: typing.Mapping[str, str] | None = None) -> str:
+    environ = os.environ if environ is None else environ
+    return environ.get("CONFIG_FILE") or _dotenv(env_file).get("CONFIG_FILE") or DEFAULT_CONFIG_FILE
+
+
+def watched_files(env_file: str = ENV_FILE) -> list[str]:
+    """Files a config watch should poll for changes."""
+    return [env_file, _config_file(env_file)]
+
+
+def files_stamp(paths: list[str]) -> tuple:
+    """Modification times of `paths` (None for a missing one); compare to detect edits."""
+    return tuple(os.path.getmtime(path) if os.path.exists(path) else None for path in paths)
+
+
+def format_value(value) -> str:
+    """Setting value as an owner would write it in .env."""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, frozenset):
+        return ", ".join(str(v) for v in sorted(value)) or "(none)"
+    if isinstance(value, tuple):
+        return ", ".join(value) or "(none)"
+    return str(value)
+
+
+def load_config(env_file: str = ENV_FILE, environ: typing.Mapping[str, str] | None = None) -> Config:
+    """Parse and validate every setting; raises ConfigError naming each bad one."""
+    values = read_sources(env_file, environ)
+    parsed, problems = {}, []
+    for f in fields(Config):
+        env = env_name(f.name)
+        raw = values.get(env)
+        if raw is None or (isinstance(raw, str) and not raw.strip()):
+            if f.default is MISSING:
+                problems.append(f"{env}: is required")
+            continue
+        parse = _PARSERS[typing.get_origin(f.type) or f.type]
+        try:
+            parsed[f.name] = parse(raw)
+        except ValueError as exc:
+            problems.append(f"{env}: {exc}")
+            continue
+        check = _CHECKS.get(f.name)
+        if check is not None and not check[0](parsed[f.name]):
+            problems.append(f"{env}: {check[1]}")
+    if problems:
+        raise ConfigError(problems)
+    for name in ("kakera_list", "shadow_kakera_list"):
+        if name in parsed:
+            parsed[name] = tuple(k.lower() for k in parsed[name])
+    return Config(**parsed)
@@ -0,0 +1,182 @@
+"""
+On-demand diagnostics for a sluggish bot (`$profile`, `$looplag`).
+
+- LoopMonitor runs for the bot's lifetime: a task that asks to wake every
+  SAMPLE_INTERVAL seconds and records how late it actually woke. That is the
+  lag every other callback on the event loop saw at the same moment.
+- `profile` runs cProfile over the loop's thread for a bounded time and
+  reports the top functions by cumulative and own time.
+- `slow_callbacks` switches asyncio's debug mode on for a bounded time; the
+  callbacks it reports as running longer than SLOW_CALLBACK are collected.
+- `task_report` lists in-flight tasks grouped by origin (roll handlers from
+  `on_message`, channel workers from `auto_roll`, ...) with the chain of
+  coroutines each one is suspended in, e.g. a roll handler inside a nested
+  `fetch_startup_timers`.
+
+Only one capture runs at a time. Profiling and debug mode slow the loop down
+while they run, so absolute timings in a report are inflated.
+"""
+import asyncio
+import cProfile
+import io
+import logging
+import pstats
+import time
+from collections import deque
+from typing import Callable
+
+SAMPLE_INTERVAL = 1.0  # seconds between loop lag samples
+KEEP = 600  # lag samples kept (10 minutes at SAMPLE_INTERVAL)
+SLOW_CALLBACK = 0.1  # seconds; callbacks slower than this are reported
+MAX_SECONDS = 600  # longest capture an owner command may ask for
+TOP = 25  # functions listed per profile table
+
+# task name prefix -> where it was spawned
+_ORIGINS = (
+    ("roll:", "on_message roll handlers"),
+    ("scheduler:", "auto_roll channel workers"),
+    ("discord.py: ", "discord.py event handlers"),
+)
+
+
+def _quantile(ordered: list[float], q: float) -> float:
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class LoopMonitor:
+    def __init__(self, interval: float = SAMPLE_INTERVAL, metrics=None):
+        self.interval = interval
+        self.metrics = metrics
+        self.samples: deque = deque(maxlen=KEEP)  # (loop time, lag seconds)
+
+    async def run(self, should_stop: Callable[[], bool] = lambda: False) -> None:
+        loop = asyncio.get_running_loop()
+        while not should_stop():
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            now = loop.time()
+            lag = max(0.0, now - expected)
+            self.samples.append((now, lag))
+            if self.metrics is not None:
+                self.metrics.observe("loop.lag", lag)
+
+    def summary(self, since: float | None = None) -> str:
+        """One line of lag percentiles (ms) over the samples taken after loop time `since`."""
+        lags = sorted(lag for at, lag in self.samples if since is None or at >= since)
+        if not lags:
+            return "no samples"
+        ms = lambda s: f"{s * 1000:.1f}"
+        return (f"{len(lags)} samples: p50 {ms(_quantile(lags, 0.5))} ms, p90 {ms(_quantile(lags, 0.9))} ms, "
+                f"p99 {ms(_quantile(lags, 0.99))} ms, max {ms(lags[-1])} ms")
+
+
+class _SlowCallbacks(logging.Handler):
+    """Collects asyncio's "Executing <callback> took N seconds" warnings."""
+
+    def __init__(self):
+        super().__init__(logging.WARNING)
+        self.lines: list[str] = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if isinstance(record.msg, str) and record.msg.startswith("Executing"):
+            self.lines.append(record.getMessage())
+
+
+class Diagnostics:
+    def __init__(self, interval: float = SAMPLE_INTERVAL, metrics=None):
+        self.monitor = LoopMonitor(interval=interval, metrics=metrics)
+        self.lock = asyncio.Lock()
+
+    @property
+    def busy(self) -> bool:
+        return self.lock.locked()
+
+    async def profile(self, seconds: float) -> str:
+        """cProfile everything the loop runs for `seconds`; top functions, lag and tasks as text."""
+        async with self.lock:
+            started = asyncio.get_running_loop().time()
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                await asyncio.sleep(seconds)
+            finally:
+                profiler.disable()
+            out = io.StringIO()
+            out.write(f"Profile of the event loop over {seconds:g}s\n\n")
+            stats = pstats.Stats(profiler, stream=out)
+            for order in ("cumulative", "tottime"):
+                out.write(f"---- top {TOP} by {order} ----\n")
+                stats.sort_stats(order).print_stats(TOP)
+            out.write(f"---- loop lag during the profile ----\n{self.monitor.summary(since=started)}\n\n")
+            out.write(task_report())
+            return out.getvalue()
+
+    async def slow_callbacks(self, seconds: float) -> list[str]:
+        """Callbacks that ran longer than SLOW_CALLBACK during the next `seconds` (asyncio debug mode)."""
+        async with self.lock:
+            loop = asyncio.get_running_loop()
+            debug, threshold = loop.get_debug(), loop.slow_callback_duration
+            handler = _SlowCallbacks()
+            asyncio_log = logging.getLogger("asyncio")
+            asyncio_log.addHandler(handler)
+            loop.slow_callback_duration = SLOW_CALLBACK
+            loop.set_debug(True)
+            try:
+                await asyncio.sleep(seconds)
+            finally:
+                loop.set_debug(debug)
+                loop.slow_callback_duration = threshold
+                asyncio_log.removeHandler(handler)
+            return handler.lines
+
+    async def looplag(self, seconds: float) -> str:
+        """Lag percentiles, slow callbacks over `seconds` (none captured if 0) and in-flight tasks as text."""
+        started = asyncio.get_running_loop().time()
+        slow = await self.slow_callbacks(seconds) if seconds > 0 else None
+        out = io.StringIO()
+        out.write("---- loop lag ----\n")
+        if seconds > 0:
+            out.write(f"last {seconds:g}s: {self.monitor.summary(since=started)}\n")
+        out.write(f"last 1 min: {self.monitor.summary(since=asyncio.get_running_loop().time() - 60)}\n")
+        out.write(f"kept samples: {self.monitor.summary()}\n\n")
+        if slow is not None:
+            out.write(f"---- callbacks over {SLOW_CALLBACK * 1000:.0f} ms in {seconds:g}s ----\n")
+            out.write("\n".join(slow) if slow else "none")
+            out.write("\n\n")
+        out.write(task_report())
+        return out.getvalue()
+
+
+def await_chain(task: asyncio.Task) -> str:
+    """Where a task is suspended: its coroutine, the one it awaits, ... down to the innermost awaitable."""
+    parts = []
+    coro = task.get_coro()
+    while coro is not None and len(parts) < 16:
+        code = getattr(coro, "cr_code", None) or getattr(coro, "gi_code", None)
+        if code is None:
+            parts.append(type(coro).__name__)
+            break
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None)
+        name = getattr(code, "co_qualname", code.co_name)
+        parts.append(f"{name}:{frame.f_lineno}" if frame is not None else name)
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None)
+    return " → ".join(parts)
+
+
+def task_report() -> str:
+    """In-flight tasks of the running loop grouped by origin, each with its await chain."""
+    groups: dict[str, list[str]] = {}
+    current = asyncio.current_task()
+    for task in asyncio.all_tasks():
+        if task is current or task.done():
+            continue
+        name = task.get_name()
+        origin = next((label for prefix, label in _ORIGINS if name.startswith(prefix)), "other")
+        groups.setdefault(origin, []).append(f"  {name}: {await_chain(task)}")
+    labels = [label for _, label in _ORIGINS] + ["other"]
+    out = [f"---- in-flight tasks ({sum(map(len, groups.values()))}) at {time.strftime('%Y-%m-%d %H:%M:%S')} ----"]
+    for label in labels:
+        if label in groups:
+            out.append(f"{label} ({len(groups[label])}):")
+            out.extend(sorted(groups[label]))
+    return "\n".join(out) + "\n"
@@ -0,0 +1,237 @@
+"""
+Columnar roll history.
+
+Every roll the bot sees is kept as one row of fixed-width columns:
+
+    ts        float64  wall-clock time of the roll
+    channel   int64    channel id
+    name      uint32   character name (string dictionary id)
+    kakera    int32    kakera value
+    wanted    uint8    1 if the claim policy wanted it
+    claimed   uint8    claim outcome (CLAIM_* below)
+    latency   float32  embed received -> policy decision, seconds
+    reason    uint32   policy reason code (string dictionary id)
+
+Rows are buffered in memory for SETTLE seconds, so a claim outcome can still
+be filled in, then appended to one raw file per column in the current
+segment directory (`seg-000001/ts.f8`, ...). A segment is closed after
+SEGMENT_ROWS rows. Names and reason codes go to `strings.txt`, one per line;
+the line number is the id. That is about 34 bytes per roll, so months of
+history stay in the low megabytes.
+
+Queries memory-map only the columns they need and skip segments that end
+before the requested window, so `$rollstats 7d` is a handful of NumPy
+reductions instead of a scan of text logs.
+"""
+import os
+import time
+
+import numpy as np
+
+COLUMNS = {
+    "ts": np.dtype("<f8"),
+    "channel": np.dtype("<i8"),
+    "name": np.dtype("<u4"),
+    "kakera": np.dtype("<i4"),
+    "wanted": np.dtype("u1"),
+    "claimed": np.dtype("u1"),
+    "latency": np.dtype("<f4"),
+    "reason": np.dtype("<u4"),
+}
+_SUFFIX = {"<f8": "f8", "<i8": "i8", "<u4": "u4", "<i4": "i4", "|u1": "u1", "<f4": "f4"}
+
+# claim outcomes (the store's claim log statuses)
+CLAIM_NONE, CLAIM_CONFIRMED, CLAIM_UNCONFIRMED, CLAIM_REFUSED, CLAIM_LOST = range(5)
+CLAIM_STATUS = {
+    "confirmed": CLAIM_CONFIRMED,
+    "unconfirmed": CLAIM_UNCONFIRMED,
+    "refused": CLAIM_REFUSED,
+    "lost": CLAIM_LOST,
+}
+
+SEGMENT_ROWS = 1 << 16
+SETTLE = 60.0  # seconds a row stays in memory so its claim outcome can be filled in
+STRINGS_FILE = "strings.txt"
+
+_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 7 * 86400}
+
+
+def parse_window(text: str, default: float = 86400.0) -> float | None:
+    """'7d' / '12h' / '30m' -> seconds; '' -> default; None if malformed."""
+    text = text.strip().lower()
+    if not text:
+        return default
+    unit = _UNITS.get(text[-1])
+    number = text[:-1] if unit else text
+    try:
+        value = float(number)
+    except ValueError:
+        return None
+    return value * (unit or 86400) if value > 0 else None
+
+
+def _column_file(segment: str, column: str) -> str:
+    return os.path.join(segment, f"{column}.{_SUFFIX[COLUMNS[column].str]}")
+
+
+class RollHistory:
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self._strings: list[str] = []
+        self._string_ids: dict[str, int] = {}
+        self._new_strings: list[str] = []
+        strings_path = os.path.join(path, STRINGS_FILE)
+        if os.path.exists(strings_path):
+            with open(strings_path, encoding="utf-8") as f:
+                for line in f:
+                    self._intern(line.rstrip("\n"), new=False)
+        # unflushed rows, one list per column; message id -> row index for claim outcomes
+        self._buffer: dict[str, list] = {name: [] for name in COLUMNS}
+        self._rows_by_message: dict[int, int] = {}
+        self._segments = sorted(
+            os.path.join(path, d) for d in os.listdir(path) if d.startswith("seg-")
+        )
+        self._segment_rows = self._repair(self._segments[-1]) if self._segments else 0
+
+    # ---- strings ----
+    def _intern(self, text: str, new: bool = True) -> int:
+        sid = self._string_ids.get(text)
+        if sid is None:
+            sid = self._string_ids[text] = len(self._strings)
+            self._strings.append(text)
+            if new:
+                self._new_strings.append(text)
+        return sid
+
+    def string(self, sid: int) -> str:
+        return self._strings[sid]
+
+    # ---- writing ----
+    def record(self, message_id: int, channel_id: int, name: str, kakera: int, wanted: bool,
+               latency: float, reason: str, ts: float | None = None) -> None:
+        ts = time.time() if ts is None else ts
+        buf = self._buffer
+        self._rows_by_message[message_id] = len(buf["ts"])
+        buf["ts"].append(ts)
+        buf["channel"].append(channel_id)
+        buf["name"].append(self._intern(name.replace("\n", " ")))
+        buf["kakera"].append(kakera)
+        buf["wanted"].append(1 if wanted else 0)
+        buf["claimed"].append(CLAIM_NONE)
+        buf["latency"].append(latency)
+        buf["reason"].append(self._intern(reason))
+        if ts - buf["ts"][0] > 2 * SETTLE:
+            self.flush(ts - SETTLE)
+
+    def set_claim(self, message_id: int, status: str) -> None:
+        """Fill in the claim outcome of a roll that is still buffered (unknown rolls are ignored)."""
+        row = self._rows_by_message.get(message_id)
+        if row is not None:
+            self._buffer["claimed"][row] = CLAIM_STATUS.get(status, CLAIM_NONE)
+
+    def flush(self, before: float | None = None) -> int:
+        """Append buffered rows older than `before` (all rows if None) to disk; returns rows written."""
+        ts = self._buffer["ts"]
+        count = len(ts) if before is None else next((i for i, t in enumerate(ts) if t >= before), len(ts))
+        if not count:
+            return 0
+        if self._new_strings:
+            with open(os.path.join(self.path, STRINGS_FILE), "a", encoding="utf-8") as f:
+                f.write("".join(s + "\n" for s in self._new_strings))
+            self._new_strings.clear()
+        written = 0
+        while written < count:
+            if not self._segments or self._segment_rows >= SEGMENT_ROWS:
+                self._new_segment()
+            take = min(count - written, SEGMENT_ROWS - self._segment_rows)
+            segment = self._segments[-1]
+            for name, dtype in COLUMNS.items():
+                with open(_column_file(segment, name), "ab") as f:
+                    np.asarray(self._buffer[name][written:written + take], dtype=dtype).tofile(f)
+            self._segment_rows += take
+            written += take
+        for column in self._buffer.values():
+            del column[:count]
+        self._rows_by_message = {mid: row - count for mid, row in self._rows_by_message.items() if row >= count}
+        return count
+
+    def close(self) -> None:
+        self.flush()
+
+    def _new_segment(self) -> None:
+        segment = os.path.join(self.path, f"seg-{len(self._segments) + 1:06d}")
+        os.makedirs(segment, exist_ok=True)
+        self._segments.append(segment)
+        self._segment_rows = 0
+
+    @staticmethod
+    def _repair(segment: str) -> int:
+        """Rows in a segment; columns left uneven by a crash mid-flush are cut to the shortest."""
+        lengths = {}
+        for name, dtype in COLUMNS.items():
+            path = _column_file(segment, name)
+            lengths[name] = os.path.getsize(path) // dtype.itemsize if os.path.exists(path) else 0
+        rows = min(lengths.values())
+        for name, dtype in COLUMNS.items():
+            if lengths[name] != rows:
+                with open(_column_file(segment, name), "r+b") as f:
+                    f.truncate(rows * dtype.itemsize)
+        return rows
+
+    # ---- reading ----
+    def columns(self, names: list[str], since: float = 0.0) -> dict[str, np.ndarray]:
+        """The requested columns for rows with ts >= since, flushed and buffered."""
+        parts = {name: [] for name in names}
+        for segment in self._segments:
+            ts_path = _column_file(segment, "ts")
+            size = os.path.getsize(ts_path) // 8 if os.path.exists(ts_path) else 0
+            if segment == self._segments[-1]:
+                size = min(size, self._segment_rows)
+            if not size:
+                continue
+            ts = np.memmap(ts_path, dtype=COLUMNS["ts"], mode="r", shape=(size,))
+            if ts[-1] < since:
+                continue  # the whole segment is older than the window
+            start = int(np.searchsorted(ts, since))
+            for name in names:
+                col = ts if name == "ts" else np.memmap(_column_file(segment, name), dtype=COLUMNS[name], mode="r", shape=(size,))
+                parts[name].append(np.array(col[start:]))
+        buffered = self._buffer["ts"]
+        start = next((i for i, t in enumerate(buffered) if t >= since), len(buffered))
+        for name in names:
+            parts[name].append(np.asarray(self._buffer[name][start:], dtype=COLUMNS[name]))
+        return {name: np.concatenate(chunks) for name, chunks in parts.items()}
+
+    def stats(self, since: float) -> list[dict]:
+        """Per-channel aggregates for rows since `since`, busiest channel first."""
+        cols = self.columns(["channel", "kakera", "wanted", "claimed", "latency"], since)
+        channel = cols["channel"]
+        if not len(channel):
+            return []
+        ids, inverse, counts = np.unique(channel, return_inverse=True, return_counts=True)
+        wanted = np.bincount(inverse, weights=cols["wanted"], minlength=len(ids))
+        claimed = np.bincount(inverse, weights=cols["claimed"] == CLAIM_CONFIRMED, minlength=len(ids))
+        kakera_total = np.bincount(inverse, weights=cols["kakera"], minlength=len(ids))
+        order = np.argsort(inverse, kind="stable")
+        bounds = np.cumsum(counts)[:-1]
+        kakera_groups = np.split(cols["kakera"][order], bounds)
+        latency_groups = np.split(cols["latency"][order], bounds)
+        rows = []
+        for i, channel_id in enumerate(ids):
+            p50, p90, p99 = np.percentile(kakera_groups[i], (50, 90, 99))
+            lat50, lat95 = np.percentile(latency_groups[i], (50, 95))
+            rows.append({
+                "channel": int(channel_id),
+                "rolls": int(counts[i]),
+                "hit_rate": float(wanted[i] / counts[i]),
+                "claimed": int(claimed[i]),
+                "kakera_total": int(kakera_total[i]),
+                "kakera_p50": float(p50),
+                "kakera_p90": float(p90),
+                "kakera_p99": float(p99),
+                "latency_p50": float(lat50),
+                "latency_p95": float(lat95),
+            })
+        rows.sort(key=lambda r: r["rolls"], reverse=True)
+        return rows
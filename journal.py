@@ -0,0 +1,165 @@
+"""
+Watchlist journal kept in the character channel.
+
+Instead of purging the channel and reposting the whole list on every change,
+each edit appends one record message:
+
+    + Rem | Remu          (add, aliases allowed)
+    - Emilia              (remove)
+
+and every COMPACT_EVERY records a snapshot message with the full list as a
+`watchlist.txt` attachment is posted. A load walks the history newest-first
+down to the latest snapshot and replays the records after it, so its cost is
+bounded by the compaction interval rather than the channel's age. A snapshot
+whose attachment is missing or can't be fetched is passed over: the load keeps
+walking to the snapshot before it and replays everything after that. Plain
+lines without a marker (the old format) are read as adds, so existing channels
+load unchanged.
+"""
+import io
+
+import discord
+
+from watchlist import Watchlist
+
+ADD = "+"
+REMOVE = "-"
+SNAPSHOT_MARKER = "📜 Watchlist snapshot"
+SNAPSHOT_FILENAME = "watchlist.txt"
+COMPACT_EVERY = 50  # record messages after the latest snapshot before compacting
+MESSAGE_LIMIT = 2000  # Discord message length cap
+
+
+def is_snapshot(message) -> bool:
+    return (message.content or "").startswith(SNAPSHOT_MARKER)
+
+
+def parse_records(content: str) -> list[tuple[str, str]]:
+    """(op, entry) pairs from one record message; unmarked lines are adds."""
+    records = []
+    for line in content.splitlines():
+        line = line.strip()
+        op = ADD
+        if line[:1] in (ADD, REMOVE):
+            op, line = line[0], line[1:].strip()
+        if line:
+            records.append((op, line))
+    return records
+
+
+def format_records(op: str, entries: list[str]) -> list[str]:
+    """Record messages for `entries`, split to stay under the message length cap."""
+    messages, lines, size = [], [], 0
+    for entry in entries:
+        line = f"{op} {entry}"
+        if lines and size + len(line) + 1 > MESSAGE_LIMIT:
+            messages.append("\n".join(lines))
+            lines, size = [], 0
+        lines.append(line)
+        size += len(line) + 1
+    if lines:
+        messages.append("\n".join(lines))
+    return messages
+
+
+def apply_records(watchlist: Watchlist, content: str) -> None:
+    for op, entry in parse_records(content):
+        if op == ADD:
+            watchlist.add(entry)
+        else:
+            watchlist.remove(entry)
+
+
+async def read_snapshot(message, fuzzy_threshold: float) -> Watchlist | None:
+    """Watchlist stored in a snapshot message's attachment, or None if it can't be read."""
+    attachment = next((a for a in message.attachments if a.filename == SNAPSHOT_FILENAME), None)
+    if attachment is None:
+        return None
+    try:
+        text = (await attachment.read()).decode("utf-8")
+    except (discord.HTTPException, UnicodeDecodeError):
+        return None
+    watchlist = Watchlist(fuzzy_threshold=fuzzy_threshold)
+    for line in text.splitlines():
+        watchlist.add(line)
+    return watchlist
+
+
+async def _channel_send(channel, content: str = "", **kwargs):
+    return await channel.send(content, **kwargs)
+
+
+class WatchlistJournal:
+    """
+    Reads and appends the journal of one channel; `records` counts entries since the last snapshot.
+    `send(channel, content, **kwargs)` posts a message (defaults to `channel.send`).
+    """
+
+    def __init__(self, fuzzy_threshold: float = 0.0, send=None):
+        self.fuzzy_threshold = fuzzy_threshold
+        self.records = 0
+        self.send = send or _channel_send
+
+    async def load(self, channel) -> tuple[Watchlist, int | None]:
+        """Full load: latest snapshot plus the records after it. Returns (watchlist, newest message id)."""
+        pending = []
+        snapshot = watchlist = None
+        async for msg in channel.history(limit=None):
+            if is_snapshot(msg):
+                watchlist = await read_snapshot(msg, self.fuzzy_threshold)
+                if watchlist is not None:
+                    snapshot = msg
+                    break
+            pending.append(msg)
+
+        if watchlist is None:
+            watchlist = Watchlist(fuzzy_threshold=self.fuzzy_threshold)
+        for msg in reversed(pending):
+            if not is_snapshot(msg):
+                apply_records(watchlist, msg.content or "")
+        self.records = sum(not is_snapshot(msg) for msg in pending)
+        newest = pending[0] if pending else snapshot
+        return watchlist, newest.id if newest else None
+
+    async def catch_up(self, channel, watchlist: Watchlist, after_id: int) -> int:
+        """Replay messages posted after `after_id` onto `watchlist`; returns the newest id seen."""
+        newest = after_id
+        async for msg in channel.history(limit=None, after=discord.Object(id=after_id), oldest_first=True):
+            if is_snapshot(msg):
+                snapshot = await read_snapshot(msg, self.fuzzy_threshold)
+                if snapshot is None:
+                    # the records before it are already replayed; keep counting towards the next one
+                    newest = msg.id
+                    continue
+                watchlist.clear()
+                for entry in snapshot.entries():
+                    watchlist.add(entry)
+                self.records = 0
+            else:
+                apply_records(watchlist, msg.content or "")
+                self.records += 1
+            newest = msg.id
+        return newest
+
+    async def append(self, channel, op: str, entries: list[str]) -> int | None:
+        """Post `entries` as `op` records; returns the id of the last message sent."""
+        last = None
+        for content in format_records(op, entries):
+            last = await self.send(channel, content)
+            self.records += 1
+        return last.id if last else None
+
+    def needs_compaction(self) -> bool:
+        return self.records >= COMPACT_EVERY
+
+    async def snapshot(self, channel, watchlist: Watchlist) -> int:
+        """Post the full list as one snapshot message; later loads start from it."""
+        entries = watchlist.entries()
+        data = io.BytesIO("\n".join(entries).encode("utf-8"))
+        msg = await self.send(
+            channel,
+            f"{SNAPSHOT_MARKER} ({len(entries)} entries)",
+            file=discord.File(data, filename=SNAPSHOT_FILENAME),
+        )
+        self.records = 0
+        return msg.id
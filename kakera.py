@@ -0,0 +1,204 @@
+"""
+Kakera reaction engine.
+
+Every kakera button costs `consumption`% of a reaction power that Mudae
+regenerates at 1% per POWER_REGEN seconds, up to 100%. Power belongs to the
+server, so channels of one guild share it (a "pool"). The engine
+
+- projects each pool's power locally from the last `$tu` (power and
+  consumption) plus regeneration and our own clicks, so no extra `$tu` is
+  needed to know whether a reaction is affordable;
+- values buttons by kakera type, starting from typical yields and learning
+  the real ones from Mudae's "+N" replies;
+- skips a button when its value is below what the power would likely buy
+  later: with `slots` reactions affordable and `expected` buttons arriving
+  before one more slot regenerates, only the best `slots / expected` share
+  of recent button values is taken. Power about to hit the cap is never
+  saved, since regeneration beyond 100% is lost;
+- coordinates channels: buttons waiting to be clicked in the same pool are
+  served best value first, a click is refused if the power it needs is
+  already promised to better ones.
+"""
+import math
+import time
+from collections import deque
+
+POWER_REGEN = 180.0  # seconds per 1% of reaction power
+MAX_POWER = 100.0
+RECENT = 200  # button values kept for the value distribution
+RATE_WINDOW = 3 * 3600.0  # seconds of button arrivals used for the arrival rate
+MIN_SAMPLES = 10  # buttons seen before low-value buttons are ever skipped
+VALUE_ALPHA = 0.2  # weight of a new "+N" reply in a type's value
+
+# typical yield per kakera type (the KAKERA_LIST names); refined from replies
+DEFAULT_VALUES = {
+    "kakerap": 100.0,
+    "kakera": 100.0,
+    "kakerat": 175.0,
+    "kakerag": 250.0,
+    "kakeray": 400.0,
+    "kakerao": 700.0,
+    "kakerar": 1000.0,
+    "kakeraw": 2000.0,
+    "kakeral": 5000.0,
+}
+
+# decide() outcomes
+CLICK = "click"
+NO_POWER = "no_power"
+OUTBID = "outbid"
+LOW_VALUE = "low_value"
+
+
+class PowerPool:
+    __slots__ = ("power", "consumption", "updated", "pending", "arrivals", "values", "earned", "clicks")
+
+    def __init__(self):
+        self.power: float | None = None  # None until a $tu reported it
+        self.consumption: float | None = None
+        self.updated = 0.0
+        self.pending: dict[int, float] = {}  # message id -> value of buttons waiting to be clicked
+        self.arrivals: deque = deque()  # monotonic time of each button seen
+        self.values: deque = deque(maxlen=RECENT)
+        self.earned = 0
+        self.clicks = 0
+
+    @property
+    def known(self) -> bool:
+        return self.power is not None and self.consumption is not None
+
+    def project(self, now: float) -> float:
+        return min(MAX_POWER, self.power + (now - self.updated) / POWER_REGEN)
+
+    def set(self, power: float, now: float) -> None:
+        self.power = power
+        self.updated = now
+
+
+class KakeraEngine:
+    def __init__(self):
+        self.values = dict(DEFAULT_VALUES)
+        self._pools: dict[int, PowerPool] = {}
+
+    def _pool(self, pool_id: int) -> PowerPool:
+        pool = self._pools.get(pool_id)
+        if pool is None:
+            pool = self._pools[pool_id] = PowerPool()
+        return pool
+
+    def value(self, kind: str) -> float:
+        return self.values.get(kind, DEFAULT_VALUES["kakera"])
+
+    # ---- power ----
+    def sync(self, pool_id: int, power: int | None, consumption: int | None, now: float | None = None) -> None:
+        """Reset a pool's power from a `$tu` report (fields it didn't show are kept)."""
+        now = time.monotonic() if now is None else now
+        pool = self._pool(pool_id)
+        if consumption is not None:
+            pool.consumption = float(consumption)
+        if power is not None:
+            pool.set(float(power), now)
+
+    def can_react(self, pool_id: int, now: float | None = None) -> bool | None:
+        """Whether the pool can afford a reaction now; None if no `$tu` reported its power yet."""
+        pool = self._pools.get(pool_id)
+        if pool is None or not pool.known:
+            return None
+        now = time.monotonic() if now is None else now
+        return pool.project(now) >= pool.consumption
+
+    def refused(self, pool_id: int, now: float | None = None) -> None:
+        """Mudae said we can't react: our projection was optimistic, drop it below one reaction."""
+        now = time.monotonic() if now is None else now
+        pool = self._pool(pool_id)
+        if pool.known:
+            pool.set(min(pool.project(now), pool.consumption - 1), now)
+
+    def earned(self, pool_id: int, kind: str, amount: int) -> None:
+        """A "+N" reply for a `kind` button: learn its value."""
+        pool = self._pool(pool_id)
+        pool.earned += amount
+        current = self.values.get(kind)
+        self.values[kind] = float(amount) if current is None else current + VALUE_ALPHA * (amount - current)
+
+    # ---- choosing ----
+    def best(self, buttons: list[tuple[object, str]]) -> tuple[object, str] | None:
+        """Most valuable (button, kind) of a roll's clickable kakera buttons."""
+        return max(buttons, key=lambda b: self.value(b[1]), default=None)
+
+    def seen(self, pool_id: int, kind: str, now: float | None = None) -> None:
+        """A clickable button was rolled in the pool (clicked or not): feeds the arrival rate and value mix."""
+        now = time.monotonic() if now is None else now
+        pool = self._pool(pool_id)
+        pool.arrivals.append(now)
+        while pool.arrivals and now - pool.arrivals[0] > RATE_WINDOW:
+            pool.arrivals.popleft()
+        pool.values.append(self.value(kind))
+
+    def offer(self, pool_id: int, message_id: int, kind: str) -> None:
+        """A button we mean to click after the human-like delay: queued for the pool's power."""
+        self._pool(pool_id).pending[message_id] = self.value(kind)
+
+    def withdraw(self, pool_id: int, message_id: int) -> None:
+        pool = self._pools.get(pool_id)
+        if pool is not None:
+            pool.pending.pop(message_id, None)
+
+    def threshold(self, pool_id: int, now: float | None = None) -> float:
+        """Lowest button value worth a reaction in the pool right now (0 = take anything)."""
+        now = time.monotonic() if now is None else now
+        pool = self._pools.get(pool_id)
+        if pool is None or not pool.known or len(pool.values) < MIN_SAMPLES or len(pool.arrivals) < 2:
+            return 0.0
+        power = pool.project(now)
+        span = max(now - pool.arrivals[0], POWER_REGEN)
+        rate = len(pool.arrivals) / span  # buttons per second
+        if (MAX_POWER - power) * POWER_REGEN <= 1.0 / rate:
+            return 0.0  # the cap is reached before the next button: saving power wastes it
+        slots = math.floor(power / pool.consumption)
+        expected = rate * pool.consumption * POWER_REGEN  # buttons before one more slot regenerates
+        if slots <= 0 or expected <= slots:
+            return 0.0
+        ranked = sorted(pool.values)
+        return ranked[min(len(ranked) - 1, int(len(ranked) * (1.0 - slots / expected)))]
+
+    def decide(self, pool_id: int, message_id: int, now: float | None = None) -> str:
+        """
+        Whether to click a button offered earlier; CLICK spends the power locally.
+        Without a `$tu` power reading the click is allowed (Mudae has the final word).
+        """
+        now = time.monotonic() if now is None else now
+        pool = self._pool(pool_id)
+        value = pool.pending.pop(message_id, None)
+        if not pool.known:
+            return CLICK
+        if value is None:
+            value = 0.0
+        power = pool.project(now)
+        if power < pool.consumption:
+            return NO_POWER
+        better = sum(1 for v in pool.pending.values() if v > value)
+        if power - better * pool.consumption < pool.consumption:
+            return OUTBID
+        if value < self.threshold(pool_id, now):
+            return LOW_VALUE
+        pool.set(power - pool.consumption, now)
+        pool.clicks += 1
+        return CLICK
+
+    # ---- reporting ----
+    def summary(self, names: dict[int, str] | None = None, now: float | None = None) -> list[str]:
+        """Rows for `$kakera`: per pool, projected power, consumption, value threshold, clicks and kakera earned."""
+        now = time.monotonic() if now is None else now
+        names = names or {}
+        rows = [f"{'pool':<16} {'power':>6} {'cost':>5} {'min value':>9} {'clicks':>6} {'earned':>7}"]
+        for pool_id, pool in sorted(self._pools.items()):
+            label = names.get(pool_id, str(pool_id))[:16]
+            power = f"{pool.project(now):.0f}%" if pool.known else "?"
+            cost = f"{pool.consumption:.0f}%" if pool.consumption is not None else "?"
+            rows.append(
+                f"{label:<16} {power:>6} {cost:>5} {self.threshold(pool_id, now):>9.0f} {pool.clicks:>6} {pool.earned:>7}"
+            )
+        values = ", ".join(f"{kind} {value:.0f}" for kind, value in sorted(self.values.items(), key=lambda kv: kv[1]))
+        rows.append(f"values: {values}")
+        return rows
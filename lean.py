@@ -0,0 +1,100 @@
+"""
+Lean client mode.
+
+The bot only acts on messages in ALLOWED_CHANNELS, the commands channel and
+the character channel, yet discord.py-self's defaults cache 1000 messages,
+every member of every guild and chunk all guilds before `on_ready`. On an
+account in hundreds of busy guilds that costs a lot of memory and CPU for
+traffic the bot never looks at. In lean mode the client
+
+- keeps a small message cache (MESSAGE_CACHE; roll embeds only need to live
+  until their claim settles, older edits still arrive as raw events),
+- caches no members and doesn't chunk guilds at startup,
+- drops typing and presence events, and message/reaction events of other
+  channels, before discord.py builds objects for them.
+
+Guild subscriptions stay on: without them Discord may not send messages of
+large guilds at all. Lean mode is opt-in (LEAN_MODE=true).
+"""
+import os
+import sys
+from typing import Callable
+
+import discord
+
+# dropped whatever the channel
+_ALWAYS_DROPPED = ("TYPING_START", "PRESENCE_UPDATE", "PRESENCES_REPLACE")
+# dropped unless their channel_id is one the bot uses
+_CHANNEL_EVENTS = (
+    "MESSAGE_CREATE",
+    "MESSAGE_UPDATE",
+    "MESSAGE_DELETE",
+    "MESSAGE_DELETE_BULK",
+    "MESSAGE_ACK",
+    "MESSAGE_REACTION_ADD",
+    "MESSAGE_REACTION_REMOVE",
+    "MESSAGE_REACTION_REMOVE_ALL",
+    "MESSAGE_REACTION_REMOVE_EMOJI",
+)
+
+
+def client_options(message_cache: int) -> dict:
+    """discord.Client keyword arguments for lean mode."""
+    return {
+        "max_messages": message_cache,
+        "member_cache_flags": discord.MemberCacheFlags.none(),
+        "chunk_guilds_at_startup": False,
+    }
+
+
+def filter_gateway(connection, wanted: Callable[[int], bool], on_drop: Callable[[str], None] | None = None) -> None:
+    """Wrap the connection's event parsers so unwanted events stop before any object is built."""
+    parsers = connection.parsers
+
+    def drop(event: str):
+        def parse(data) -> None:
+            if on_drop is not None:
+                on_drop(event)
+        return parse
+
+    def only_wanted(event: str, parse):
+        def filtered(data) -> None:
+            channel_id = data.get("channel_id")
+            if channel_id is not None and not wanted(int(channel_id)):
+                if on_drop is not None:
+                    on_drop(event)
+                return
+            parse(data)
+        return filtered
+
+    for event in _ALWAYS_DROPPED:
+        if event in parsers:
+            parsers[event] = drop(event)
+    for event in _CHANNEL_EVENTS:
+        if event in parsers:
+            parsers[event] = only_wanted(event, parsers[event])
+
+
+def resident_memory() -> int | None:
+    """Resident set size in bytes (peak RSS where the current one isn't available), None if unknown."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def cache_sizes(client: discord.Client) -> dict:
+    """Guilds, cached members and cached messages: what the client is holding on to."""
+    guilds = client.guilds
+    return {
+        "guilds": len(guilds),
+        "members": sum(len(guild.members) for guild in guilds),
+        "messages": len(client.cached_messages),
+    }
@@ -0,0 +1,154 @@
+"""
+Non-blocking structured logging.
+
+Loggers are named after a subsystem (`tu`, `roll`, `claim`, `kakera`, `owner`,
+...). A call only checks the level and puts a tuple on a bounded queue; a
+daemon thread formats the records (JSON lines, or plain text) and writes them
+out. Messages take `%`-style arguments, so a disabled call costs a level check
+and no string formatting. When the queue is full the record is dropped and counted instead of
+blocking, so a slow stdout can never stall the event loop. Dropped counts are
+reported by the writer once it catches up.
+"""
+import json
+import queue
+import sys
+import threading
+import time
+from collections import Counter
+
+DEBUG, INFO, WARNING, ERROR = 10, 20, 30, 40
+LEVELS = {"debug": DEBUG, "info": INFO, "warning": WARNING, "error": ERROR}
+_LEVEL_NAMES = {value: name for name, value in LEVELS.items()}
+
+
+def parse_levels(spec: str) -> dict[str, int]:
+    """`"roll=debug, tu=warning"` -> {"roll": DEBUG, "tu": WARNING}; unknown levels are skipped."""
+    levels = {}
+    for item in spec.split(","):
+        name, _, level = item.partition("=")
+        level = LEVELS.get(level.strip().lower())
+        if name.strip() and level is not None:
+            levels[name.strip()] = level
+    return levels
+
+
+class LogPipeline:
+    def __init__(self, maxsize: int = 10000):
+        self.level = INFO
+        self.levels: dict[str, int] = {}
+        self.format = "json"
+        self.stream = None  # None = whatever sys.stdout is at write time
+        self.dropped: Counter = Counter()
+        self._reported: Counter = Counter()
+        self._queue: queue.Queue = queue.Queue(maxsize=maxsize)
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    def configure(self, level: str = "info", levels: str = "", fmt: str = "json", maxsize: int | None = None) -> None:
+        self.level = LEVELS.get(level.strip().lower(), INFO)
+        self.levels = parse_levels(levels)
+        self.format = "text" if fmt.strip().lower() == "text" else "json"
+        if maxsize is not None:
+            # resized in place: the writer thread keeps the queue it started with
+            with self._queue.mutex:
+                self._queue.maxsize = maxsize
+
+    def enabled(self, subsystem: str, level: int) -> bool:
+        return level >= self.levels.get(subsystem, self.level)
+
+    def emit(self, subsystem: str, level: int, msg: str, args: tuple, fields: dict) -> None:
+        if self._thread is None:
+            self._start()
+        try:
+            self._queue.put_nowait((time.time(), level, subsystem, msg, args, fields))
+        except queue.Full:
+            self.dropped[subsystem] += 1
+
+    def flush(self, timeout: float = 5.0) -> None:
+        """Wait (up to `timeout`) until every queued record has been written."""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.005)
+
+    # ---- writer thread ----
+    def _start(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        q = self._queue
+        while True:
+            batch = [q.get()]
+            while True:
+                try:
+                    batch.append(q.get_nowait())
+                except queue.Empty:
+                    break
+            lines = [self._format(*record) for record in batch]
+            dropped = self.dropped - self._reported
+            if dropped:
+                self._reported.update(dropped)
+                lines.append(self._format(time.time(), WARNING, "logs", "records dropped", (), {"dropped": dict(dropped)}))
+            try:
+                stream = self.stream or sys.stdout
+                stream.write("\n".join(lines) + "\n")
+                stream.flush()
+            except Exception:
+                pass  # nowhere left to report it
+            finally:
+                for _ in batch:
+                    q.task_done()
+
+    def _format(self, ts: float, level: int, subsystem: str, msg: str, args: tuple, fields: dict) -> str:
+        if args:
+            try:
+                msg = msg % args
+            except (TypeError, ValueError):
+                msg = f"{msg} {args!r}"
+        if self.format == "text":
+            extra = "".join(f" {k}={v}" for k, v in fields.items())
+            return f"{time.strftime('%H:%M:%S', time.localtime(ts))} {_LEVEL_NAMES[level].upper():<7} [{subsystem}] {msg}{extra}"
+        record = {"ts": round(ts, 3), "level": _LEVEL_NAMES[level], "subsystem": subsystem, "msg": msg}
+        record.update(fields)
+        return json.dumps(record, ensure_ascii=False, default=str)
+
+
+pipeline = LogPipeline()
+
+
+class Logger:
+    __slots__ = ("subsystem",)
+
+    def __init__(self, subsystem: str):
+        self.subsystem = subsystem
+
+    def enabled(self, level: int) -> bool:
+        return pipeline.enabled(self.subsystem, level)
+
+    def log(self, level: int, msg: str, *args, **fields) -> None:
+        if pipeline.enabled(self.subsystem, level):
+            pipeline.emit(self.subsystem, level, msg, args, fields)
+
+    def debug(self, msg: str, *args, **fields) -> None:
+        self.log(DEBUG, msg, *args, **fields)
+
+    def info(self, msg: str, *args, **fields) -> None:
+        self.log(INFO, msg, *args, **fields)
+
+    def warning(self, msg: str, *args, **fields) -> None:
+        self.log(WARNING, msg, *args, **fields)
+
+    def error(self, msg: str, *args, **fields) -> None:
+        self.log(ERROR, msg, *args, **fields)
+
+
+_loggers: dict[str, Logger] = {}
+
+
+def get_logger(subsystem: str) -> Logger:
+    logger = _loggers.get(subsystem)
+    if logger is None:
+        logger = _loggers[subsystem] = Logger(subsystem)
+    return logger
@@ -1,104 +1,99 @@
 import discord
 import asyncio
-import os
-import ast
+import io
 import random
-import re
 import time
-from dotenv import load_dotenv
+
+from config import RESTART_ONLY, ConfigError, env_name, files_stamp, format_value, load_config, watched_files
+from diagnostics import MAX_SECONDS as DIAGNOSTICS_MAX_SECONDS, Diagnostics
+from history import RollHistory, parse_window
+from journal import ADD, REMOVE, WatchlistJournal
+from kakera import CLICK as KAKERA_CLICK, KakeraEngine
+from lean import cache_sizes, client_options as lean_client_options, filter_gateway, resident_memory
+from logs import get_logger, pipeline as log_pipeline
+from metrics import Metrics
+from outbound import CRITICAL, OWNER, REFRESH, ROLL, Outbox
+from planner import RollPlanner
+from roll_event import RollEvent, extract
+from roll_tasks import CLAIM as CLAIM_TASK, KAKERA as KAKERA_TASK, RollTasks
+from policy import PolicyError, load_policy
+from router import KAKERA, REFUSED, REST, RT, TU, ClaimOutcome, ReplyRouter, footer_owner, kakera_earned
+from scheduler import Scheduler
+from shadow import (CLAIM as SHADOW_CLAIM, DAILY as SHADOW_DAILY, KAKERA_CLICK as SHADOW_KAKERA_CLICK, ROLL as SHADOW_ROLL,
+                    RT_CLAIM as SHADOW_RT_CLAIM, SKIP_RT as SHADOW_SKIP_RT, Shadow, load_candidate)
+from state import ChannelState
+from store import StateStore
+from tu_parser import parse_tu
+from watchlist import Watchlist
 
 # -------------------------
 # Configuration / constants
 # -------------------------
-load_dotenv()
-TOKEN = os.getenv("DISCORD_TOKEN")
-TIMER = int(os.getenv("TIMER", 10))  # base delay in seconds for claiming actions
-CHARACTER_CHANNEL_ID = int(os.getenv("CHARACTER_CHANNEL_ID"))
-OWNER_ID = int(os.getenv("OWNER_ID"))
-COMMANDS_CHANNEL_ID = int(os.getenv("COMMANDS_CHANNEL_ID"))
-USERNAME = os.getenv("USERNAME")
+# Typed settings from .env, CONFIG_FILE and the environment (see config.py).
+# $reloadconfig or an edit of those files updates this object in place.
+config = load_config()
 
 MUDAE_ID = 432610292342587392  # Mudae bot id
-allowed_channels_str = os.getenv("ALLOWED_CHANNELS", "")
-ALLOWED_CHANNELS = {int(ch.strip()) for ch in allowed_channels_str.split(",") if ch.strip().isdigit()}
-EMOJI_LIST = ['❤️', '💕', '💘', '💖', '💓','💗']
-MIN_KAKERA = int(os.getenv("MIN_KAKERA", 0))
-
-# Click retry config (tweak if needed)
-CLICK_RETRIES = int(os.getenv("CLICK_RETRIES", 3))
-CLICK_RETRY_DELAY = float(os.getenv("CLICK_RETRY_DELAY", 0.8))
-ROLL_WAIT_EVENT_TIMEOUT = float(os.getenv("ROLL_WAIT_EVENT_TIMEOUT", 6.0))
-DELAY_BETWEEN_ROLLS = int(os.getenv("DELAY_BETWEEN_ROLLS", 3))
-
-rolling_commands_str = os.getenv("ROLLING_COMMANDS", "$wa")
-ROLLING_COMMANDS = [cmd.strip() for cmd in rolling_commands_str.split(",") if cmd.strip()]
-
-def parse_env_list(env_value: str):
-    """Parse comma or Python-list like env values into a list of strings."""
-    if not env_value:
-        return []
-    env_value = env_value.strip()
-    if env_value.startswith("[") and env_value.endswith("]"):
-        try:
-            return [item.strip() for item in ast.literal_eval(env_value)]
-        except Exception:
-            print(f"⚠️ Failed to parse Python list: {env_value}")
-            return []
-    return [item.strip() for item in env_value.split(",") if item.strip()]
-
-KAKERA_LIST = [k.lower() for k in parse_env_list(os.getenv("KAKERA_LIST"))]
-
-# -------------------------
-# Utilities
-# -------------------------
-def parse_time_segment(seg: str) -> int:
-    """
-    Parse a time segment from Mudae $tu lines.
-    Accepts examples: '1h 18', '1h 18 min', '28', '28 min', '49 m'.
-    Returns seconds.
-    """
-    if not seg:
-        return 0
-    t = re.sub(r"\*", "", seg).strip().lower()
-    h = 0
-    m = 0
-
-    mh = re.search(r"(\d+)\s*h", t)
-    if mh:
-        h = int(mh.group(1))
-
-    mm = re.search(r"(\d+)\s*m(?:in(?:ute)?s?)?", t)
-    if mm:
-        m = int(mm.group(1))
-    else:
-        nums = [int(n) for n in re.findall(r"\d+", t)]
-        if mh and len(nums) >= 2:
-            m = nums[1]
-        elif not mh and nums:
-            m = nums[0]
-
-    return h * 3600 + m * 60
+TU_MIN_INTERVAL = 11  # minimum seconds between two $tu in the same channel
+
+# Logging: JSON lines (or LOG_FORMAT=text) written off the event loop.
+# LOG_LEVELS overrides the level per subsystem, e.g. "roll=debug,tu=warning".
+log_pipeline.configure(config.log_level, config.log_levels, config.log_format, config.log_queue_size)
+bot_log = get_logger("bot")
+tu_log = get_logger("tu")
+roll_log = get_logger("roll")
+claim_log = get_logger("claim")
+kakera_log = get_logger("kakera")
+owner_log = get_logger("owner")
 
 # -------------------------
 # Bot client
 # -------------------------
 class MyClient(discord.Client):
     def __init__(self, **kwargs):
+        self.started_at = time.monotonic()
+        self.rss_at_start = resident_memory()
+        if config.lean_mode:
+            kwargs = {**lean_client_options(config.message_cache), **kwargs}
         super().__init__(**kwargs)
 
         # Characters to auto-claim (loaded from CHARACTER_CHANNEL_ID)
-        self.character_list: list[str] = []
+        self.watchlist = Watchlist(fuzzy_threshold=config.fuzzy_threshold)
+        # hot-path span histograms ($stats, METRICS_PORT)
+        self.metrics = Metrics()
+        self.metrics_server = None
 
-        # timers_per_channel[channel_id] -> dict of timers and flags for that channel
-        # e.g. { 'claim_available': True/False, 'claim_in_progress': True/False, 'claim': seconds,
-        #        'rolls_left': int, 'rolls': seconds, '_fetched_at': timestamp, 'rt_available': bool, 'rt': seconds }
-        self.timers_per_channel: dict[int, dict] = {}
+        # every channel.send goes through here: rate limits, priorities, $tu dedup, 429 retries
+        self.outbox = Outbox(rate=config.send_rate, burst=config.send_burst, channel_rate=config.channel_send_rate,
+                             channel_burst=config.channel_send_burst, metrics=self.metrics)
+
+        # compiled claim rules, swapped whole by $reloadpolicy
+        self.policy = load_policy(config.claim_policy, min_kakera=config.min_kakera)
+        # dry-run records and the SHADOW_POLICY candidate decided next to the live policy
+        self.shadow = Shadow(candidate=load_candidate(config.shadow_policy, min_kakera=config.min_kakera), metrics=self.metrics)
+
+        # the character channel is an append-only journal of add/remove records
+        self.journal = WatchlistJournal(fuzzy_threshold=config.fuzzy_threshold, send=self.outbox.sender(OWNER))
+        # newest journal message reflected in self.watchlist (None = not synced yet)
+        self.watchlist_synced_id: int | None = None
+
+        # timers_per_channel[channel_id] -> ChannelState (timers projected from the last $tu)
+        self.timers_per_channel: dict[int, ChannelState] = {}
 
         # global timers (daily / vote)
         self.global_timers: dict[str, int] = {}
+        # first refresh of the first channel also reads (and claims) the global timers
+        self.global_refresh_due = True
+
+        # timers, watchlist and claim log survive restarts here; every roll goes to the columnar history
+        self.store = StateStore(config.state_db)
+        self.history = RollHistory(config.history_dir)
+
+        # one $tu in flight per channel; replies are told apart by the router
+        self.tu_locks: dict[int, asyncio.Lock] = {}
 
-        # ensure only one $tu is ever in-flight at a time
-        self.tu_lock = asyncio.Lock()
+        # hands each Mudae reply to the request waiting for it in that channel
+        self.router = ReplyRouter(MUDAE_ID)
 
         # per-channel locks to protect timers modifications
         self.channel_locks: dict[int, asyncio.Lock] = {}
@@ -106,30 +101,233 @@ class MyClient(discord.Client):
         # per-channel events so auto_roll can be notified immediately when a claim starts/ends
         self.claim_events: dict[int, asyncio.Event] = {}
 
+        # per-channel/command roll statistics: which channel to service first and which command to roll
+        self.planner = RollPlanner(config.rolling_commands)
+
+        # polls .env / CONFIG_FILE and applies edits (config_watch seconds)
+        self.config_watch_task: asyncio.Task | None = None
+
+        # startup: login time, set once the watchlist is usable, first roll (time-to-first-roll metric)
+        self.login_at: float | None = None
+        self.watchlist_ready = asyncio.Event()
+        self.first_roll_at: float | None = None
+
+        # reaction power per server, projected between $tu; ranks and rations kakera buttons
+        self.kakera = KakeraEngine()
+
+        # lean mode: typing/presence and other channels' messages never become objects
+        if config.lean_mode:
+            filter_gateway(self._connection, self._wanted_channel, on_drop=lambda event: self.metrics.incr("gateway.dropped"))
+
+        # one task per actionable roll (claim clicks, $rt, kakera), deduped by message id
+        self.roll_tasks = RollTasks(limit=config.roll_task_limit, metrics=self.metrics)
+
+        # (ready_time, channel, event_kind) queue driving auto_roll's per-channel workers;
+        # when several channels are due, the one with the best expected claim value per roll goes first
+        self.scheduler = Scheduler(max_workers=config.roll_workers, rank=self._channel_rank)
+
+        # event-loop lag samples and the $profile / $looplag captures
+        self.diagnostics = Diagnostics(interval=config.loop_lag_interval, metrics=self.metrics)
+
     async def on_ready(self) -> None:
-        """Called when the bot connected and ready."""
-        print(f"✅ Logged in as {self.user}!")
-        await self.load_character_list()
-        print("🎯 Watching for characters:", self.character_list)
-        print("💠 Watching for kakera:", KAKERA_LIST)
-
-        # On startup fetch timers sequentially (first channel also fetches global timers)
-        allowed_channels = [self.get_channel(cid) for cid in ALLOWED_CHANNELS if self.get_channel(cid)]
-        if not allowed_channels:
-            print("⚠️ No valid channels found for $tu")
-        else:
-            first = allowed_channels[0]
-            await asyncio.sleep(3)
-            print(f"\n🌍 Fetching timers in #{first.name} (global + per-channel)")
-            await self.fetch_startup_timers(first, include_global=True)
-            await asyncio.sleep(3)
-            for ch in allowed_channels[1:]:
-                print(f"\n📡 Fetching timers in #{ch.name} (per-channel only)")
-                await self.fetch_startup_timers(ch, include_global=False)
-                await asyncio.sleep(3)
-
-        # Start background auto-roller
-        self.loop.create_task(self.auto_roll())
+        """
+        Called when the bot connected and ready. Startup runs as concurrent stages so
+        rolling starts as early as possible:
+        - the watchlist is restored/loaded in the background (roll sessions wait for it),
+        - channels with stored, still valid timers are handed to the scheduler right away,
+        - the rest discover their timers with $tu, STARTUP_CONCURRENCY at a time, and
+          become eligible one by one as their own reply arrives.
+        """
+        bot_log.info("✅ Logged in as %s!", self.user)
+        self._set_names()
+        self.planner.self_id = self.user.id
+        if self.login_at is not None:
+            return  # reconnect: everything is already running
+        self.login_at = time.monotonic()
+        self._report_footprint()
+
+        restored = self.store.load_channels()
+        for channel_id, state in restored.items():
+            if channel_id in config.allowed_channels:
+                self.timers_per_channel[channel_id] = state
+        self.global_timers = self.store.load_global_timers()
+        planner_stats = self.store.load_planner()
+        if planner_stats:
+            self.planner.load_dict(planner_stats)
+        self.global_refresh_due = self.global_timers.get("daily", 0) == 0
+        if restored:
+            bot_log.info("💾 Restored timers for %s channel(s) from %s", len(self.timers_per_channel), config.state_db)
+
+        if not any(self.get_channel(cid) for cid in config.allowed_channels):
+            bot_log.warning("⚠️ No valid channels found for $tu")
+
+        if config.metrics_port and self.metrics_server is None:
+            self.metrics_server = await self.metrics.serve("127.0.0.1", config.metrics_port)
+            bot_log.info("📈 Metrics on http://127.0.0.1:%s/metrics", config.metrics_port)
+
+        self.loop.create_task(self._startup_watchlist(), name="startup_watchlist")
+        self.loop.create_task(self.auto_roll(), name="auto_roll")
+        self.loop.create_task(self._discover_timers(), name="discover_timers")
+        if config.loop_lag_interval:
+            self.loop.create_task(self.diagnostics.monitor.run(should_stop=self.is_closed), name="loop_monitor")
+        if self.config_watch_task is None:
+            self.config_watch_task = self.loop.create_task(self.watch_config(), name="watch_config")
+
+    def _wanted_channel(self, channel_id: int) -> bool:
+        """Channels whose messages the bot acts on (lean mode drops the rest at the gateway)."""
+        return (channel_id in config.allowed_channels or channel_id == config.commands_channel_id
+                or channel_id == config.character_channel_id)
+
+    def _report_footprint(self) -> None:
+        """Log startup time and resident memory before login vs. ready, with what the caches hold."""
+        ready_in = self.login_at - self.started_at
+        rss = resident_memory()
+        self.metrics.observe("startup.ready", ready_in)
+        mb = lambda b: None if b is None else round(b / 2**20, 1)
+        bot_log.info("🧠 Ready %.1fs after start, RSS %s MB (%s MB before login)", ready_in, mb(rss), mb(self.rss_at_start),
+                     lean=config.lean_mode, ready_seconds=round(ready_in, 2), rss_mb=mb(rss),
+                     rss_before_login_mb=mb(self.rss_at_start), **cache_sizes(self))
+
+    async def _startup_watchlist(self) -> None:
+        """Startup stage: stored watchlist first (then catch up with the journal), else a full journal load."""
+        with self.metrics.span("startup.watchlist"):
+            saved = self.store.load_watchlist()
+            if saved is not None and saved[1] is not None:
+                entries, self.watchlist_synced_id, self.journal.records = saved
+                watchlist = Watchlist(fuzzy_threshold=config.fuzzy_threshold)
+                for entry in entries:
+                    watchlist.add(entry)
+                self.watchlist = watchlist
+                self.watchlist_ready.set()
+                bot_log.info("💾 Restored %s characters from %s", len(self.watchlist), config.state_db)
+                await self.load_character_list()
+            else:
+                try:
+                    await self.load_character_list(full=True)
+                finally:
+                    self.watchlist_ready.set()
+        bot_log.info("🎯 Watching for %s characters", len(self.watchlist))
+        bot_log.debug("🎯 Watching for characters", names=self.watchlist.names())
+        bot_log.info("💠 Watching for kakera", kakera=config.kakera_list)
+
+    async def _discover_timers(self) -> None:
+        """Startup stage: $tu in every channel without usable stored timers, a few channels at a time."""
+        await self.wait_until_ready()
+        pending = [
+            cid for cid in config.allowed_channels
+            if (state := self.timers_per_channel.get(cid)) is None or state.stale
+        ]
+        if not pending:
+            return
+        slots = asyncio.Semaphore(config.startup_concurrency)
+        global_id = self._global_channel_id()
+
+        async def discover(channel_id: int) -> None:
+            async with slots:
+                channel = self.get_channel(channel_id)
+                if channel is not None:
+                    include_global = self.global_refresh_due and channel_id == global_id
+                    await self.fetch_startup_timers(channel, include_global=include_global)
+            # eligible as soon as its own state is known (or retried later if the $tu failed)
+            self.scheduler.arm(channel_id, *self._next_check(channel_id))
+
+        with self.metrics.span("startup.timers"):
+            await asyncio.gather(*(discover(cid) for cid in pending), return_exceptions=True)
+        bot_log.info("⏱️ Timers known for %s channel(s) %.1fs after login", len(pending), time.monotonic() - self.login_at)
+
+    async def close(self) -> None:
+        await self.roll_tasks.shutdown()
+        await super().close()
+        await self.outbox.close()
+        if self.metrics_server is not None:
+            self.metrics_server.close()
+        self.store.close()
+        self.history.close()
+        log_pipeline.flush()
+
+    async def reload_config(self) -> list[str]:
+        """
+        Re-read the configuration and apply what changed to the running bot; returns one
+        line per change. Raises ConfigError (and changes nothing) if the new settings are invalid.
+        """
+        changes = config.diff(load_config())
+        lines = []
+        for name, (old, new) in changes.items():
+            if name in RESTART_ONLY:
+                lines.append(f"{env_name(name)} changed; takes effect after a restart")
+            else:
+                setattr(config, name, new)
+                if name != "allowed_channels":
+                    lines.append(f"{env_name(name)}: {format_value(old)} → {format_value(new)}")
+        applied = changes.keys() - RESTART_ONLY
+
+        if applied & {"log_level", "log_levels", "log_format"}:
+            log_pipeline.configure(config.log_level, config.log_levels, config.log_format)
+        if applied & {"send_rate", "send_burst", "channel_send_rate", "channel_send_burst"}:
+            self.outbox.configure(config.send_rate, config.send_burst, config.channel_send_rate, config.channel_send_burst)
+        if "roll_task_limit" in applied:
+            self.roll_tasks.limit = config.roll_task_limit
+        if "rolling_commands" in applied:
+            self.planner.commands = list(config.rolling_commands)
+        if "fuzzy_threshold" in applied:
+            self.watchlist.fuzzy_threshold = self.journal.fuzzy_threshold = config.fuzzy_threshold
+        if applied & {"claim_policy", "min_kakera"}:
+            try:
+                self.policy = load_policy(config.claim_policy, min_kakera=config.min_kakera)
+            except (PolicyError, OSError) as exc:
+                lines.append(f"claim policy not reloaded, keeping the current one: {exc}")
+        if applied & {"shadow_policy", "min_kakera"}:
+            try:
+                self.shadow.candidate = load_candidate(config.shadow_policy, min_kakera=config.min_kakera)
+            except (PolicyError, OSError) as exc:
+                lines.append(f"candidate policy not reloaded, keeping the current one: {exc}")
+        if "shadow_mode" in applied and not config.shadow_mode:
+            # the dry run's pretended claims and rolls only exist locally: ask Mudae again
+            self.shadow.reset()
+            for channel_id, state in self.timers_per_channel.items():
+                state.stale = True
+                self._rearm(channel_id)
+        if "allowed_channels" in applied:
+            old, new = changes["allowed_channels"]
+            # new channels get a $tu right away; removed ones are dropped when their entry comes up
+            for channel_id in new - old:
+                self.scheduler.arm_now(channel_id, "refresh")
+            for channel_id in old - new:
+                self.scheduler.disarm(channel_id)
+            if new - old:
+                lines.append(f"ALLOWED_CHANNELS: added {format_value(new - old)}")
+            if old - new:
+                lines.append(f"ALLOWED_CHANNELS: removed {format_value(old - new)}")
+        if "username" in applied and self.user is not None:
+            self._set_names()
+        if "character_channel_id" in applied:
+            await self.load_character_list(full=True)
+        return lines
+
+    def _set_names(self) -> None:
+        """Tell the reply router every name Mudae may address us by."""
+        me = self.user
+        self.router.set_names(config.username, str(me), getattr(me, "name", None), getattr(me, "display_name", None))
+
+    async def watch_config(self) -> None:
+        """Reload the configuration whenever .env or CONFIG_FILE is modified."""
+        paths = watched_files()
+        last = files_stamp(paths)
+        while not self.is_closed():
+            await asyncio.sleep(config.config_watch or 5.0)
+            if not config.config_watch:
+                continue
+            current = files_stamp(paths)
+            if current == last:
+                continue
+            last = current
+            try:
+                lines = await self.reload_config()
+            except ConfigError as exc:
+                bot_log.error("❌ Config change rejected, keeping the running settings", problems=exc.problems)
+                continue
+            if lines:
+                bot_log.info("🔧 Config reloaded", changes=lines)
 
     async def _get_channel_lock(self, channel_id: int) -> asyncio.Lock:
         """Return a per-channel lock, creating if needed."""
@@ -139,6 +337,22 @@ class MyClient(discord.Client):
             self.channel_locks[channel_id] = lock
         return lock
 
+    def _get_tu_lock(self, channel_id: int) -> asyncio.Lock:
+        """Return the per-channel $tu lock, creating if needed."""
+        lock = self.tu_locks.get(channel_id)
+        if lock is None:
+            lock = asyncio.Lock()
+            self.tu_locks[channel_id] = lock
+        return lock
+
+    def _get_channel_state(self, channel_id: int) -> ChannelState:
+        """Return per-channel state; unknown channels start stale so auto_roll refreshes them."""
+        state = self.timers_per_channel.get(channel_id)
+        if state is None:
+            state = ChannelState(stale=True)
+            self.timers_per_channel[channel_id] = state
+        return state
+
     def _get_claim_event(self, channel_id: int) -> asyncio.Event:
         """Return per-channel claim event, create if needed."""
         ev = self.claim_events.get(channel_id)
@@ -147,667 +361,917 @@ class MyClient(discord.Client):
             self.claim_events[channel_id] = ev
         return ev
 
-    async def fetch_startup_timers(self, channel: discord.TextChannel, include_global: bool):
+    async def fetch_startup_timers(self, channel: discord.TextChannel, include_global: bool, fresh: bool = False):
         """
-        Send $tu in `channel`, wait for Mudae reply, parse timers, and populate
-        self.timers_per_channel[channel.id]. This function uses a global tu_lock
-        so only one $tu is sent across the bot at any given time.
-        It will retry up to 3 times on timeouts.
+        Send $tu in `channel`, wait for Mudae reply, parse timers, and update
+        self.timers_per_channel[channel.id] in place. Only one $tu is in flight per
+        channel; different channels refresh concurrently.
+        It will retry up to 3 times on timeouts. A call that arrives while another
+        $tu is already in flight for the channel waits for that one instead of sending,
+        unless `fresh` is set: a $tu sent before e.g. $rt can't answer for the state after it.
         """
-        chan_label = f"#{channel.name}"
+        lock = self._get_tu_lock(channel.id)
+        if lock.locked() and not include_global and not fresh:
+            async with lock:
+                self.metrics.incr("tu.coalesced")
+                return
 
         for attempt in range(1, 4):
-            async with self.tu_lock:
+            async with self.metrics.locked(lock, "tu.lock_wait"):
                 try:
-                    await channel.send("$tu")
-
-                    def check(m: discord.Message):
-                        return m.author.id == MUDAE_ID and m.channel.id == channel.id
-
-                    msg = await self.wait_for("message", timeout=15, check=check)
-                    raw = msg.content or ""
-                    lc = raw.lower()
-                    # debug output of the raw $tu reply
-
-                    timers: dict = {}
+                    with self.router.expect(channel.id, TU) as reply, self.metrics.span("tu.reply"):
+                        await self.outbox.send(channel, "$tu", priority=REFRESH, dedup_key=("$tu", channel.id))
+                        msg = await reply.wait(15)
+                    with self.metrics.span("tu.parse"):
+                        report = parse_tu(msg.content or "")
 
                     # ----- Claim -----
-                    if re.search(r"you\s+__can__\s+claim right now", lc):
-                        m = re.search(r"next claim reset is in \*\*(.+?)\*\*", raw, re.I)
-                        timers["claim"] = parse_time_segment(m.group(1)) if m else 0
-                        timers["claim_available"] = True
-                        timers["claim_in_progress"] = False
-                        print(f"[{chan_label}] ✅ Claim available (reset {timers['claim']//60} min)")
-                    else:
-                        m = re.search(r"you can'?t claim for another \*\*(.+?)\*\*", raw, re.I)
-                        if m:
-                            timers["claim"] = parse_time_segment(m.group(1))
-                            timers["claim_available"] = False
-                            timers["claim_in_progress"] = False
-                            print(f"[{chan_label}] ❌ Claim cooldown: {timers['claim']//60} min")
+                    if report.claim_available:
+                        tu_log.debug("✅ Claim available (reset %s min)", report.claim//60, channel=channel.name)
+                    elif report.claim_available is False:
+                        tu_log.debug("❌ Claim cooldown: %s min", report.claim//60, channel=channel.name)
 
                     # ----- Rolls -----
-                    m = re.search(r"you have \*\*(\d+)\*\* rolls?.*?next rolls reset in \*\*(.+?)\*\*", raw, re.I | re.S)
-                    if m:
-                        timers["rolls_left"] = int(m.group(1))
-                        timers["rolls"] = parse_time_segment(m.group(2))
-                        print(f"[{chan_label}] 🎲 Rolls left: {timers['rolls_left']} (reset {timers['rolls']//60} min)")
+                    if report.rolls_left is not None and report.rolls is not None:
+                        tu_log.debug("🎲 Rolls left: %s (reset %s min)", report.rolls_left, report.rolls//60, channel=channel.name)
 
                     # ----- Kakera availability/cooldown -----
-                    if "you __can__ react to kakera right now" in lc:
-                        timers["kakera_available"] = True
-                        timers["kakera"] = 0
-                        print(f"[{chan_label}] 💎 Kakera available now")
-                    else:
-                        m = re.search(r"react to kakera for \*\*(.+?)\*\*", raw, re.I)
-                        if m:
-                            timers["kakera"] = parse_time_segment(m.group(1))
-                            timers["kakera_available"] = False
-                            print(f"[{chan_label}] 💎 Kakera cooldown: {timers['kakera']//60} min")
-
-                    # ----- Kakera power / consumption / stock -----
-                    m = re.search(r"power:\s*\*\*(\d+)%\*\*", raw, re.I)
-                    if m:
-                        timers["power"] = int(m.group(1))
-                    m = re.search(r"consumes\s*(\d+)%\s*of your reaction power", raw, re.I)
-                    if m:
-                        timers["consumption"] = int(m.group(1))
-                    m = re.search(r"stock:\s*\*\*([\d,]+)\*\*<:kakera", raw, re.I)
-                    if m:
-                        timers["stock"] = int(m.group(1).replace(",", ""))
-                        print(f"[{chan_label}] 💎 Kakera stock: {timers['stock']}")
+                    if report.kakera_available:
+                        tu_log.debug("💎 Kakera available now", channel=channel.name)
+                    elif report.kakera_available is False:
+                        tu_log.debug("💎 Kakera cooldown: %s min", report.kakera//60, channel=channel.name)
+                    if report.stock is not None:
+                        tu_log.debug("💎 Kakera stock: %s", report.stock, channel=channel.name)
 
                     # ----- RT availability/cooldown -----
-                    # Various Mudae $tu outputs may include "$rt is available!" or a "Time left: ..." line.
-                    if re.search(r"\$rt is available", raw, re.I):
-                        timers["rt_available"] = True
-                        timers["rt"] = 0
-                        print(f"[{chan_label}] 🔁 $rt available")
-                    else:
-                        # try to capture "Time left: 5h 02 min" patterns for $rt cooldown
-                        m = re.search(r"the cooldown of \$rt is not over.*?time left[:\s]*\*\*(.+?)\*\*", raw, re.I)
-                        if not m:
-                            m = re.search(r"time left[:\s]*([\dhm\s:]+)\s*(?:\.\s*\(\$rtu\))?", raw, re.I)
-                        if m:
-                            try:
-                                timers["rt"] = parse_time_segment(m.group(1))
-                                timers["rt_available"] = False
-                                print(f"[{chan_label}] 🔁 $rt cooldown: {timers['rt']//60} min")
-                            except Exception:
-                                timers["rt_available"] = False
-                                timers["rt"] = None
-                        else:
-                            # not present in this $tu
-                            timers.setdefault("rt_available", False)
-                            timers.setdefault("rt", None)
-
-                    # ----- DK ready -----
-                    timers["dk_ready"] = "$dk is ready" in lc
+                    if report.rt_available:
+                        tu_log.debug("🔁 $rt available", channel=channel.name)
+                    elif report.rt is not None:
+                        tu_log.debug("🔁 $rt cooldown: %s min", report.rt//60, channel=channel.name)
 
                     # ----- Global timers (only from first channel in cycle) -----
                     if include_global:
-                        if "$daily is available" in lc:
+                        if report.daily_available:
                             self.global_timers["daily"] = 0
-                            print(f"[{chan_label}] 🌍 Daily available now — sending $daily!")
-                            try:
-                                await channel.send("$daily")
-                            except Exception as exc:
-                                print(f"[{chan_label}] ❗ Failed to send $daily: {exc}")
-                        else:
-                            m = re.search(r"next \$daily reset in \*\*(.+?)\*\*", raw, re.I)
-                            if m:
-                                self.global_timers["daily"] = parse_time_segment(m.group(1))
-                                print(f"[{chan_label}] 🌍 Daily reset in {self.global_timers['daily']//60} min")
+                            if config.shadow_mode:
+                                self.shadow.action(SHADOW_DAILY, channel.name)
+                            else:
+                                tu_log.info("🌍 Daily available now — sending $daily!", channel=channel.name)
+                                try:
+                                    await self.outbox.send(channel, "$daily", priority=REFRESH)
+                                except Exception as exc:
+                                    tu_log.error("❗ Failed to send $daily: %s", exc, channel=channel.name)
+                        elif report.daily is not None:
+                            self.global_timers["daily"] = report.daily
+                            tu_log.debug("🌍 Daily reset in %s min", self.global_timers['daily']//60, channel=channel.name)
 
-                        if "you may vote right now" in lc:
+                        if report.vote_available:
                             self.global_timers["vote"] = 0
-                            print(f"[{chan_label}] 🌍 Vote available now")
-                        else:
-                            m = re.search(r"may vote again in \*\*(.+?)\*\*", raw, re.I)
-                            if m:
-                                self.global_timers["vote"] = parse_time_segment(m.group(1))
-                                print(f"[{chan_label}] 🌍 Vote reset in {self.global_timers['vote']//60} min")
-
-                    # store timers and ensure an event exists
-                    # add a timestamp so we can compute elapsed time later
-                    timers["_fetched_at"] = time.time()
-                    # fill sensible defaults
-                    timers.setdefault("claim_available", timers.get("claim_available", False))
-                    timers.setdefault("claim_in_progress", timers.get("claim_in_progress", False))
-                    timers.setdefault("rolls_left", timers.get("rolls_left", 0))
-                    timers.setdefault("rt_available", timers.get("rt_available", False))
-                    timers.setdefault("rt", timers.get("rt", None))
-
-                    self.timers_per_channel[channel.id] = timers
+                            tu_log.debug("🌍 Vote available now", channel=channel.name)
+                        elif report.vote is not None:
+                            self.global_timers["vote"] = report.vote
+                            tu_log.debug("🌍 Vote reset in %s min", self.global_timers['vote']//60, channel=channel.name)
+
+                    if include_global:
+                        self.global_refresh_due = False
+                        self.store.save_global_timers(self.global_timers)
+
+                    # update state in place (keeps claim/rt in-progress flags) and ensure an event exists
+                    state = self.timers_per_channel.get(channel.id)
+                    if state is None:
+                        state = self.timers_per_channel[channel.id] = ChannelState.from_report(report)
+                    else:
+                        state.apply_report(report)
+                    if config.shadow_mode:
+                        self.shadow.overlay(channel.id, state)
+                    self.kakera.sync(self._kakera_pool(channel.id), report.power, report.consumption)
                     self._get_claim_event(channel.id)  # ensure an Event exists
+                    self._rearm(channel.id)
+                    self._prune_roll_tasks(channel.id)
 
-                    # print a concise summary
-                    print("\n📋 Timer Summary")
-                    print(f"  Channel: {chan_label}")
-                    for k, v in timers.items():
-                        if k == "_fetched_at":
-                            continue
-                        if isinstance(v, int) and k in {"claim", "rolls", "kakera", "rt"} and v is not None:
-                            print(f"   • {k}: {v//60} min")
-                        else:
-                            print(f"   • {k}: {v}")
+                    # one record with the whole summary (durations in seconds)
+                    summary = {k: int(v) if isinstance(v, float) else v for k, v in state.summary().items()}
                     if include_global and self.global_timers:
-                        print("  🌍 Global:")
-                        for k, v in self.global_timers.items():
-                            print(f"   • {k}: {v//60} min")
-                    print("")
+                        summary["global"] = dict(self.global_timers)
+                    tu_log.info("📋 Timer summary", channel=channel.name, **summary)
                     return  # success - exit retry loop
 
                 except asyncio.TimeoutError:
-                    print(f"[{chan_label}] ⚠ Timeout waiting for $tu (attempt {attempt}/3)")
+                    self.metrics.incr("tu.timeout")
+                    tu_log.warning("⚠ Timeout waiting for $tu (attempt %s/3)", attempt, channel=channel.name)
                     await asyncio.sleep(1 + attempt)
                 except Exception as exc:
-                    print(f"[{chan_label}] ❗ Error parsing $tu: {exc}")
+                    tu_log.error("❗ Error parsing $tu: %s", exc, channel=channel.name)
                     return
 
-        print(f"[{chan_label}] ❌ Failed to fetch timers after 3 retries.")
-        # ensure defaults so other code doesn't KeyError
-        self.timers_per_channel.setdefault(channel.id, {"claim_available": False, "claim_in_progress": False, "_fetched_at": time.time(), "rt_available": False, "rt": None})
+        tu_log.error("❌ Failed to fetch timers after 3 retries.", channel=channel.name)
+        # keep whatever we had but make sure auto_roll retries this channel
+        self._get_channel_state(channel.id).stale = True
 
-    async def load_character_list(self):
-        """Load character names (to auto-claim) from CHARACTER_CHANNEL_ID messages."""
-        channel = self.get_channel(CHARACTER_CHANNEL_ID)
+    async def load_character_list(self, full: bool = False):
+        """
+        Sync the watchlist (characters to auto-claim) with the CHARACTER_CHANNEL_ID journal.
+        Only messages newer than the last synced one are read; `full` re-reads from the
+        latest snapshot. Nothing is fetched when the channel has no new messages.
+        """
+        channel = self.get_channel(config.character_channel_id)
         if not channel:
-            print("⚠️ Character channel not found!")
+            bot_log.warning("⚠️ Character channel not found!")
             return
-        messages = [m async for m in channel.history(limit=200)]
-        characters = []
-        for msg in messages:
-            for line in msg.content.splitlines():
-                name = line.strip()
-                if name:
-                    characters.append(name.lower())
-        self.character_list = list(dict.fromkeys(characters))  # preserve order, dedupe
-        print(f"📜 Loaded {len(self.character_list)} characters from #{channel.name}")
+        if full or self.watchlist_synced_id is None:
+            self.watchlist, self.watchlist_synced_id = await self.journal.load(channel)
+        elif channel.last_message_id != self.watchlist_synced_id:
+            self.watchlist_synced_id = await self.journal.catch_up(channel, self.watchlist, self.watchlist_synced_id)
+        if self.journal.needs_compaction():
+            self.watchlist_synced_id = await self.journal.snapshot(channel, self.watchlist)
+        self._save_watchlist()
+        bot_log.info("📜 Loaded %s characters from #%s", len(self.watchlist), channel.name, channel=channel.name)
+
+    async def _journal_watchlist(self, op: str | None, entries: list[str] | None = None) -> None:
+        """Record a watchlist edit in the character channel (op None = snapshot) and cache it."""
+        channel = self.get_channel(config.character_channel_id)
+        if channel:
+            if op is not None:
+                self.watchlist_synced_id = await self.journal.append(channel, op, entries or [])
+            if op is None or self.journal.needs_compaction():
+                self.watchlist_synced_id = await self.journal.snapshot(channel, self.watchlist)
+        self._save_watchlist()
+
+    def _save_watchlist(self) -> None:
+        self.store.save_watchlist(self.watchlist.entries(), self.watchlist_synced_id, self.journal.records)
 
     async def auto_roll(self) -> None:
         """
-        Main background worker:
-        - Iterates allowed channels selecting the next channel to check based on earliest event.
+        Main background worker, driven by the per-channel scheduler:
+        - Every allowed channel is armed once its timers are known and re-armed for its next projected event
+          (or right away when a claim or $tu changes its state).
+        - Up to ROLL_WORKERS channels are serviced concurrently, one worker per channel.
         - Rolls if claim is available OR $rt is available and rolls_left > 0.
         - Stops rolling immediately when a claim is triggered (on_message flips flags and sets event).
         """
         await self.wait_until_ready()
-        channel_ids = list(ALLOWED_CHANNELS)
-
-        # index pointer is chosen each iteration according to earliest-event policy
-        idx = 0
-
-        while not self.is_closed():
-            # pick current channel by idx (wrap)
-            if not channel_ids:
-                await asyncio.sleep(5)
-                continue
-
-            channel_id = channel_ids[idx % len(channel_ids)]
-            channel = self.get_channel(channel_id)
-            if not channel:
-                # skip if channel not available
-                idx += 1
-                await asyncio.sleep(1)
-                continue
-
-            print(f"\n🔍 Checking #{channel.name}...")
-            include_global = False  # keep False here (we fetch global only from first startup)
-            await asyncio.sleep(11)  # small delay to avoid spamming
+        # channels without usable timers are armed by _discover_timers once their $tu is in
+        for channel_id in config.allowed_channels:
+            state = self.timers_per_channel.get(channel_id)
+            if state is not None and not state.stale:
+                self.scheduler.arm(channel_id, *self._next_check(channel_id))
+        await self.scheduler.run(self._service_channel, should_stop=self.is_closed)
+
+    def _global_channel_id(self) -> int | None:
+        """The channel whose $tu also reads the global daily/vote timers."""
+        return next((cid for cid in config.allowed_channels if self.get_channel(cid)), None)
+
+    def _next_check(self, channel_id: int) -> tuple[float, str]:
+        """When (and why) the scheduler should look at `channel_id` again."""
+        now = time.monotonic()
+        state = self.timers_per_channel.get(channel_id)
+        if state is None:
+            return now, "refresh"
+        if state.stale:
+            # keep $tu spaced out per channel to avoid spamming
+            return max(now, state.fetched_at + TU_MIN_INTERVAL), "refresh"
+        if state.can_roll(now):
+            return now, "roll"
+        event_at = state.next_event_at()
+        if event_at is None:
+            return now + 300, "refresh"
+        return event_at + 1.5, "refresh"
+
+    def _channel_rank(self, channel_id: int, kind: str) -> float:
+        return self.planner.channel_value(channel_id, self.timers_per_channel.get(channel_id))
+
+    def _rearm(self, channel_id: int) -> None:
+        """Re-arm (and persist) a channel after its state changed (claim finished, $tu refreshed)."""
+        if channel_id in config.allowed_channels:
+            self._save_channel(channel_id)
+            self.scheduler.arm(channel_id, *self._next_check(channel_id))
+
+    def _prune_roll_tasks(self, channel_id: int) -> None:
+        """Cancel the channel's waiting roll handlers that its timers say can no longer act."""
+        state = self.timers_per_channel.get(channel_id)
+        if state is None:
+            return
+        if not (state.claim_ready() or state.rt_ready()):
+            self.roll_tasks.cancel_channel(channel_id, CLAIM_TASK)
+        if not self._kakera_ready(channel_id):
+            self.roll_tasks.cancel_channel(channel_id, KAKERA_TASK)
+
+    def _best_kakera(self, event: RollEvent, kinds) -> tuple | None:
+        """Most valuable (button, kind) among the roll's kakera buttons of the `kinds` types."""
+        return self.kakera.best([(b, k) for b, k in event.kakera_buttons if k in kinds])
+
+    def _kakera_pool(self, channel_id: int) -> int:
+        """Reaction power is per server: channels of one guild share a pool."""
+        channel = self.get_channel(channel_id)
+        guild = getattr(channel, "guild", None)
+        return guild.id if guild is not None else channel_id
+
+    def _kakera_ready(self, channel_id: int) -> bool:
+        """Locally projected reaction power, or the channel's last $tu if power was never reported."""
+        ready = self.kakera.can_react(self._kakera_pool(channel_id))
+        return self._get_channel_state(channel_id).kakera_ready() if ready is None else ready
+
+    def _save_channel(self, channel_id: int) -> None:
+        state = self.timers_per_channel.get(channel_id)
+        if state is not None:
+            self.store.save_channel(channel_id, state)
+
+    async def _service_channel(self, channel_id: int, kind: str) -> tuple[float, str] | None:
+        """Scheduler worker: refresh a channel if a projected event fired, then roll if possible."""
+        if channel_id not in config.allowed_channels:
+            return None  # removed by a config reload
+        channel = self.get_channel(channel_id)
+        if not channel:
+            # channel not available (yet); look again later
+            return time.monotonic() + 60, "refresh"
+
+        state = self.timers_per_channel.get(channel_id)
+        include_global = self.global_refresh_due and channel_id == self._global_channel_id()
+        if state is None or state.needs_refresh() or include_global:
+            roll_log.info("🔍 Refreshing timers in #%s (%s)...", channel.name, kind, channel=channel.name)
+            if state is not None:
+                since = time.monotonic() - state.fetched_at
+                if since < TU_MIN_INTERVAL:
+                    await asyncio.sleep(TU_MIN_INTERVAL - since)
             await self.fetch_startup_timers(channel, include_global=include_global)
 
-            # snapshot timers under the channel lock
-            channel_lock = await self._get_channel_lock(channel_id)
-            async with channel_lock:
-                timers_snapshot = self.timers_per_channel.get(channel_id, {}).copy()
-
-            rolls_left = timers_snapshot.get("rolls_left", 0)
+        # snapshot state under the channel lock
+        channel_lock = await self._get_channel_lock(channel_id)
+        async with self.metrics.locked(channel_lock, "roll.lock_wait"):
+            state = self._get_channel_state(channel_id)
+            rolls_left = state.rolls_left
             # allow rolling if claim is available OR $rt is available (rt resets claim)
-            claim_available = timers_snapshot.get("claim_available", False)
-            rt_available = timers_snapshot.get("rt_available", False)
-            can_roll_here = (claim_available or rt_available)
-
-            if can_roll_here:
-                if rolls_left > 0:
-                    print(f"🎯 Claim or $rt available in #{channel.name}! Rolling up to {rolls_left} times...")
-                    claim_triggered = False
-                    claim_event = self._get_claim_event(channel_id)
-                    claim_event.clear()
-
-                    for i in range(rolls_left):
-                        # if someone already started a claim, stop
-                        async with channel_lock:
-                            current = self.timers_per_channel.get(channel_id, {})
-                            # allow rolls to continue if rt_available or claim_available
-                            if current.get("claim_in_progress", False) or not (current.get("claim_available", True) or current.get("rt_available", False)):
-                                claim_triggered = True
-                                print("🛑 Claim already in progress/used — stopping further rolls.")
-                                break
-
-                        # send a roll
-                        try:
-                            cmd = random.choice(ROLLING_COMMANDS)
-                            await channel.send(cmd)
-                            print(f"📩 Sent roll {i+1}/{rolls_left} in #{channel.name}")
-                        except Exception as exc:
-                            print(f"[#{channel.name}] ❗ Failed to send roll command: {exc}")
+            can_roll_here = state.claim_ready() or state.rt_ready()
+
+        if can_roll_here:
+            if rolls_left > 0:
+                if not self.watchlist_ready.is_set():
+                    # rolls before the watchlist is known could pass over wanted characters
+                    roll_log.info("📜 Waiting for the watchlist before rolling in #%s", channel.name, channel=channel.name)
+                    await self.watchlist_ready.wait()
+                roll_log.info("🎯 Claim or $rt available in #%s! Rolling up to %s times...", channel.name, rolls_left, channel=channel.name)
+                claim_triggered = False
+                claim_event = self._get_claim_event(channel_id)
+                claim_event.clear()
+
+                for i in range(rolls_left):
+                    # if someone already started a claim, stop
+                    async with channel_lock:
+                        # allow rolls to continue if rt_available or claim_available
+                        if state.claim_in_progress or not (state.claim_ready() or state.rt_ready()):
+                            claim_triggered = True
+                            roll_log.info("🛑 Claim already in progress/used — stopping further rolls.", channel=channel.name)
                             break
 
-                        # wait a bit for on_message to trigger claim or rt flow, but don't block too long
-                        try:
-                            await asyncio.wait_for(claim_event.wait(), timeout=ROLL_WAIT_EVENT_TIMEOUT)
-                        except asyncio.TimeoutError:
-                            # no claim attempt detected in small window
-                            pass
-
-                        # re-check state after wait
-                        async with channel_lock:
-                            current = self.timers_per_channel.get(channel_id, {})
-                            if current.get("claim_in_progress", False) or not (current.get("claim_available", True) or current.get("rt_available", False)):
-                                claim_triggered = True
-                                print("🛑 Claim/rt detected during rolls — stopping further rolls.")
-                                break
-
-                        # small delay between rolls
-                        delay = random.uniform(max(0.5, DELAY_BETWEEN_ROLLS - 1), DELAY_BETWEEN_ROLLS + 1)
-                        await asyncio.sleep(delay)
+                    # send the roll command the planner expects the most from
+                    try:
+                        cmd = self.planner.choose_command(channel_id, rt_only=not state.claim_ready())
+                        if config.shadow_mode:
+                            self.shadow.action(SHADOW_ROLL, channel.name, cmd, command=cmd)
+                            self.shadow.spend_roll(channel_id, state.rolls_reset_at)
+                        else:
+                            with self.metrics.span("roll.send"):
+                                await self.outbox.send(channel, cmd, priority=ROLL)
+                            self.planner.sent(channel_id, cmd)
+                            if self.first_roll_at is None:
+                                self.first_roll_at = time.monotonic()
+                                self.metrics.observe("startup.first_roll", self.first_roll_at - self.login_at)
+                                bot_log.info("🚀 First roll %.1fs after login", self.first_roll_at - self.login_at, channel=channel.name)
+                        roll_log.debug("📩 Sent roll %s/%s in #%s", i+1, rolls_left, channel.name, channel=channel.name, command=cmd)
+                    except Exception as exc:
+                        roll_log.error("❗ Failed to send roll command: %s", exc, channel=channel.name)
+                        break
+                    async with channel_lock:
+                        state.rolls_left = max(0, state.rolls_left - 1)
+
+                    # wait a bit for on_message to trigger claim or rt flow, but don't block too long
+                    try:
+                        with self.metrics.span("roll.wait_event"):
+                            await asyncio.wait_for(claim_event.wait(), timeout=config.roll_wait_event_timeout)
+                    except asyncio.TimeoutError:
+                        # no claim attempt detected in small window
+                        pass
+
+                    # re-check state after wait
+                    async with channel_lock:
+                        if state.claim_in_progress or not (state.claim_ready() or state.rt_ready()):
+                            claim_triggered = True
+                            roll_log.info("🛑 Claim/rt detected during rolls — stopping further rolls.", channel=channel.name)
+                            break
 
-                    if claim_triggered:
-                        print(f"➡ Moving to next channel after claim in #{channel.name}.")
-                    else:
-                        print(f"✅ Finished rolling in #{channel.name} (no claim triggered).")
+                    # small delay between rolls
+                    delay = random.uniform(max(0.5, config.delay_between_rolls - 1), config.delay_between_rolls + 1)
+                    await asyncio.sleep(delay)
+
+                if claim_triggered:
+                    roll_log.info("➡ Moving to next channel after claim in #%s.", channel.name, channel=channel.name)
                 else:
-                    print(f"✅ Claim or $rt indicated in #{channel.name} but no rolls left.")
+                    roll_log.info("✅ Finished rolling in #%s (no claim triggered).", channel.name, channel=channel.name)
             else:
-                print(f"⏳ Claim not ready and no $rt in #{channel.name}. Skipping rolls here.")
-
-            # ---------- EARLIEST-EVENT selection ----------
-            # Examine timers across all channels and pick the earliest remaining time.
-            now = time.time()
-            best_remaining = None
-            best_index = None
-            fallback_sleep = 5  # seconds minimum if nothing scheduled
-            MAX_SLEEP = 24 * 3600  # cap (24h)
-
-            # Prioritize channels where claim_available OR rt_available and rolls_left > 0
-            for i, cid in enumerate(channel_ids):
-                lock = await self._get_channel_lock(cid)
-                async with lock:
-                    t = self.timers_per_channel.get(cid, {})
-                    if (t.get("claim_available") or t.get("rt_available")) and t.get("rolls_left", 0) > 0 and not t.get("claim_in_progress", False):
-                        best_remaining = 0.0
-                        best_index = i
-                        break
+                roll_log.info("✅ Claim or $rt indicated in #%s but no rolls left.", channel.name, channel=channel.name)
+        else:
+            roll_log.info("⏳ Claim not ready and no $rt in #%s. Skipping rolls here.", channel.name, channel=channel.name)
 
-            if best_remaining is None:
-                # otherwise compute remaining times using rolls/claim timers
-                for i, cid in enumerate(channel_ids):
-                    lock = await self._get_channel_lock(cid)
-                    async with lock:
-                        t = self.timers_per_channel.get(cid, {})
-                        fetched = t.get("_fetched_at")
-                        if fetched and "rolls" in t and t.get("rolls") is not None:
-                            remaining = t["rolls"] - (now - fetched)
-                        elif fetched and "claim" in t and t.get("claim") is not None:
-                            remaining = t["claim"] - (now - fetched)
-                        else:
-                            remaining = None
-
-                        if remaining is None:
-                            continue
-                        remaining = max(0.0, remaining)
-                        if best_remaining is None or remaining < best_remaining:
-                            best_remaining = remaining
-                            best_index = i
-
-            # decide how long to sleep and which channel to process next
-            if best_remaining is None:
-                next_sleep = fallback_sleep
-                idx = (idx + 1) % len(channel_ids)
+        self._save_channel(channel_id)
+        self.store.save_planner(self.planner.to_dict())
+        ready_at, next_kind = self._next_check(channel_id)
+        roll_log.info("💤 Next check for #%s in %ss (%s)", channel.name, int(max(0.0, ready_at - time.monotonic())), next_kind, channel=channel.name)
+        return ready_at, next_kind
+
+    async def _confirm_claim(self, message: discord.Message, claim_reply, char_name: str, kakera_value: int, reason: str) -> bool | None:
+        """
+        Wait for Mudae to settle a clicked claim (embed edit, "are now married" or a
+        "can't claim" refusal), falling back to one fetch of the roll message after
+        CLAIM_CONFIRM_TIMEOUT. Updates the channel state and the claim log.
+        Returns True if we got the character, False if not, None if unknown.
+        """
+        channel = message.channel
+        outcome = None
+        try:
+            with self.metrics.span("claim.confirm"):
+                outcome = await claim_reply.wait(config.claim_confirm_timeout)
+        except asyncio.TimeoutError:
+            self.metrics.incr("claim.confirm_fallback")
+            try:
+                new_msg = await channel.fetch_message(message.id)
+                new_embed = new_msg.embeds[0] if new_msg.embeds else None
+                owner = footer_owner(new_embed.footer.text if new_embed and new_embed.footer else None)
+                if owner:
+                    outcome = ClaimOutcome(owner, REST)
+            except Exception as exc:
+                claim_log.warning("⚠ Failed to fetch post-claim message for confirmation: %s", exc, channel=channel.name)
+
+        ours = None if outcome is None else outcome.owner is not None and self.router.is_me(outcome.owner)
+        state = self._get_channel_state(channel.id)
+        lock = await self._get_channel_lock(channel.id)
+        async with lock:
+            if ours:
+                state.mark_claimed()
             else:
-                if best_remaining <= 1.0:
-                    next_sleep = 0.0
-                else:
-                    next_sleep = max(fallback_sleep, best_remaining + 1.5)
-                idx = best_index if best_index is not None else (idx + 1) % len(channel_ids)
+                # refused, lost to someone else or unknown: the next $tu tells where our claim stands
+                state.claim_available = False
+                state.stale = True
+
+        if ours:
+            self.store.log_claim(channel.id, char_name, kakera_value, reason)
+            self.history.set_claim(message.id, "confirmed")
+            claim_log.info("✅ Character claimed in #%s: %s (reason: %s)", channel.name, char_name, reason, channel=channel.name, character=char_name, kakera=kakera_value, reason=reason, confirmed_by=outcome.source)
+        elif outcome is None:
+            self.metrics.incr("claim.unconfirmed")
+            self.store.log_claim(channel.id, char_name, kakera_value, reason, status="unconfirmed")
+            self.history.set_claim(message.id, "unconfirmed")
+            claim_log.warning("⚠ Could not confirm claim for %s", char_name, channel=channel.name, character=char_name)
+        elif outcome.source == REFUSED:
+            self.metrics.incr("claim.refused")
+            self.store.log_claim(channel.id, char_name, kakera_value, reason, status="refused")
+            self.history.set_claim(message.id, "refused")
+            claim_log.warning("⚠ Mudae refused the claim for %s (claim on cooldown)", char_name, channel=channel.name, character=char_name)
+        else:
+            self.metrics.incr("claim.lost")
+            self.store.log_claim(channel.id, char_name, kakera_value, reason, status="lost")
+            self.history.set_claim(message.id, "lost")
+            claim_log.warning("⚠ %s went to %s", char_name, outcome.owner, channel=channel.name, character=char_name, owner=outcome.owner)
+        return ours
+
+    async def on_message_edit(self, before: discord.Message, after: discord.Message) -> None:
+        """Roll embed edits settle pending claims ("Belongs to ..." footer)."""
+        if after.embeds:
+            footer = after.embeds[0].footer
+            self.router.feed_edit(after.id, after.author.id, footer.text if footer else None)
+
+    async def on_raw_message_edit(self, payload: discord.RawMessageUpdateEvent) -> None:
+        """Same as on_message_edit for roll messages that fell out of the message cache."""
+        if payload.cached_message is not None:
+            return  # on_message_edit handles it
+        embeds = payload.data.get("embeds") or []
+        if not embeds:
+            return
+        author_id = int((payload.data.get("author") or {}).get("id", MUDAE_ID))
+        self.router.feed_edit(payload.message_id, author_id, (embeds[0].get("footer") or {}).get("text"))
 
-            next_sleep = min(next_sleep, MAX_SLEEP)
+    async def _reply(self, channel, content: str, **kwargs):
+        """Owner-facing output: lowest send priority."""
+        return await self.outbox.send(channel, content, priority=OWNER, **kwargs)
 
-            if next_sleep > 0:
-                print(f"💤 Sleeping {int(next_sleep)}s until next expected event (channel: {self.get_channel(channel_ids[idx]).name})")
-                await asyncio.sleep(next_sleep)
-            else:
-                await asyncio.sleep(0)
+    async def _diagnose(self, channel, content: str, default: int) -> None:
+        """`$profile [seconds]` / `$looplag [seconds]`: run the capture and send its report as an attachment."""
+        command, _, arg = content.partition(" ")
+        command = command.lower()
+        try:
+            seconds = int(arg) if arg.strip() else default
+        except ValueError:
+            seconds = -1
+        if not 0 <= seconds <= DIAGNOSTICS_MAX_SECONDS or (command == "$profile" and seconds == 0):
+            await self._reply(channel, f"⚠️ Usage: `{command} [seconds]` (up to {DIAGNOSTICS_MAX_SECONDS})")
+            return
+        if self.diagnostics.busy:
+            await self._reply(channel, "⏳ A profile or lag capture is already running.")
+            return
+        if seconds:
+            await self._reply(channel, f"🔬 Capturing for {seconds}s...")
+        if command == "$profile":
+            report = await self.diagnostics.profile(seconds)
+        else:
+            report = await self.diagnostics.looplag(seconds)
+        name = f"{command[1:]}-{time.strftime('%Y%m%d-%H%M%S')}.txt"
+        file = discord.File(io.BytesIO(report.encode()), filename=name)
+        await self._reply(channel, f"🔬 `{command}` report", file=file)
 
     async def on_message(self, message: discord.Message) -> None:
         """
         Handle owner admin commands and Mudae embeds (claims).
-        Now supports $rt flow: if claim not available but $rt is available, send $rt then attempt claim.
-        After clicking, fetch the message and print post-claim embed footer to confirm "Belongs to ...".
+        Supports the $rt flow: if claim is not available but $rt is, send $rt then attempt the claim.
+        After clicking, the outcome comes from the gateway (embed edit, marriage message or a
+        refusal) through the reply router; the roll message is only fetched if none arrives in time.
         """
+        # ---- Replies to our own $tu / $rt / kakera requests ----
+        if self.router.feed(message):
+            return
+        if message.channel.id in config.allowed_channels and message.author.id != MUDAE_ID:
+            self.planner.command_seen(message.channel.id, message.author.id, message.content)
+
         # ---- Owner-only commands (character list management) ----
-        if message.author.id == OWNER_ID and message.channel.id == COMMANDS_CHANNEL_ID:
+        if message.author.id == config.owner_id and message.channel.id == config.commands_channel_id:
             content = message.content.strip()
+            if content.startswith(("$", "!")):
+                owner_log.info("owner command", command=content.split(maxsplit=1)[0].lower())
 
             if content.lower() == "$reloadchars":
-                await self.load_character_list()
-                await message.channel.send(f"✅ Reloaded character list. Now watching **{len(self.character_list)}** characters.")
+                await self.load_character_list(full=True)
+                await self._reply(message.channel, f"✅ Reloaded character list. Now watching **{len(self.watchlist)}** characters.")
                 return
 
             if content.lower().startswith("$addchars"):
                 parts = content.split(maxsplit=1)
                 if len(parts) < 2:
-                    await message.channel.send("⚠️ Usage: `$addchars name1, name2, ...`")
+                    await self._reply(message.channel, "⚠️ Usage: `$addchars name1, name2 | alias, ...`")
                     return
-                new_chars = [c.strip().lower() for c in parts[1].split(",") if c.strip()]
-                added = [c for c in new_chars if c not in self.character_list]
-                self.character_list.extend(added)
-                self.character_list = list(dict.fromkeys(self.character_list))
-                ch = self.get_channel(CHARACTER_CHANNEL_ID)
-                if ch and added:
-                    await ch.send("\n".join(added))
-                await message.channel.send(f"✅ Added {len(added)} characters. Now watching **{len(self.character_list)}** characters.")
+                added = [c.strip() for c in parts[1].split(",") if self.watchlist.add(c)]
+                if added:
+                    await self._journal_watchlist(ADD, added)
+                await self._reply(message.channel, f"✅ Added {len(added)} characters. Now watching **{len(self.watchlist)}** characters.")
                 return
 
             if content.lower().startswith("$removechars"):
                 parts = content.split(maxsplit=1)
                 if len(parts) < 2:
-                    await message.channel.send("⚠️ Usage: `$removechars name1, name2, ...`")
+                    await self._reply(message.channel, "⚠️ Usage: `$removechars name1, name2, ...`")
                     return
-                remove_chars = [c.strip().lower() for c in parts[1].split(",") if c.strip()]
-                removed = [c for c in remove_chars if c in self.character_list]
-                self.character_list = [c for c in self.character_list if c not in remove_chars]
-                ch = self.get_channel(CHARACTER_CHANNEL_ID)
-                if ch:
-                    await ch.purge(limit=100)
-                    if self.character_list:
-                        chunk_size = 50
-                        for i in range(0, len(self.character_list), chunk_size):
-                            await ch.send("\n".join(self.character_list[i:i+chunk_size]))
-                await message.channel.send(f"🗑️ Removed {len(removed)} characters. Now watching **{len(self.character_list)}** characters.")
+                removed = [c.strip() for c in parts[1].split(",") if self.watchlist.remove(c)]
+                if removed:
+                    await self._journal_watchlist(REMOVE, removed)
+                await self._reply(message.channel, f"🗑️ Removed {len(removed)} characters. Now watching **{len(self.watchlist)}** characters.")
                 return
 
             if content.lower() == "$listchars":
-                if not self.character_list:
-                    await message.channel.send("⚠️ Character list is empty.")
+                if not self.watchlist:
+                    await self._reply(message.channel, "⚠️ Character list is empty.")
                     return
+                entries = self.watchlist.entries()
                 chunk_size = 50
-                chunks = [self.character_list[i:i + chunk_size] for i in range(0, len(self.character_list), chunk_size)]
+                chunks = [entries[i:i + chunk_size] for i in range(0, len(entries), chunk_size)]
                 for idx, chunk in enumerate(chunks, start=1):
                     formatted = "\n".join(f"{i+1}. {name}" for i, name in enumerate(chunk))
-                    await message.channel.send(f"📜 **Character List (Page {idx}/{len(chunks)})**\n```{formatted}```")
+                    await self._reply(message.channel, f"📜 **Character List (Page {idx}/{len(chunks)})**\n```{formatted}```")
                 return
 
             if content.lower() == "$clearallchars":
-                await message.channel.send("⚠️ Are you sure you want to **clear all characters**? Type `y` or `yes` within 15 seconds to confirm.")
+                await self._reply(message.channel, "⚠️ Are you sure you want to **clear all characters**? Type `y` or `yes` within 15 seconds to confirm.")
                 def check_confirm(m: discord.Message):
-                    return m.author.id == OWNER_ID and m.channel == message.channel and m.content.strip().lower() in {"y", "yes"}
+                    return m.author.id == config.owner_id and m.channel == message.channel and m.content.strip().lower() in {"y", "yes"}
                 try:
                     confirm_msg = await self.wait_for("message", timeout=15.0, check=check_confirm)
                     if confirm_msg:
-                        self.character_list.clear()
-                        ch = self.get_channel(CHARACTER_CHANNEL_ID)
-                        if ch:
-                            await ch.purge(limit=100)
-                        await message.channel.send("🧹 Cleared all characters. Character list is now empty.")
+                        self.watchlist.clear()
+                        await self._journal_watchlist(None)
+                        await self._reply(message.channel, "🧹 Cleared all characters. Character list is now empty.")
                 except asyncio.TimeoutError:
-                    await message.channel.send("❌ Cancelled. Character list not cleared.")
+                    await self._reply(message.channel, "❌ Cancelled. Character list not cleared.")
+                return
+
+            if content.lower() == "$reloadconfig":
+                try:
+                    lines = await self.reload_config()
+                except ConfigError as exc:
+                    problems = "\n".join(exc.problems)
+                    await self._reply(message.channel, f"❌ Config not reloaded, keeping the running settings:\n```{problems[:1800]}```")
+                    return
+                summary = "\n".join(lines) if lines else "no changes"
+                await self._reply(message.channel, f"🔧 Reloaded config:\n```{summary[:1800]}```")
+                return
+
+            if content.lower() == "$reloadpolicy":
+                try:
+                    policy = load_policy(config.claim_policy, min_kakera=config.min_kakera)
+                    candidate = load_candidate(config.shadow_policy, min_kakera=config.min_kakera)
+                except (PolicyError, OSError) as exc:
+                    await self._reply(message.channel, f"❌ Claim policy not reloaded, keeping the current one: {exc}")
+                    return
+                self.policy, self.shadow.candidate = policy, candidate
+                reply = f"✅ Reloaded claim policy: {self.policy.summary()}."
+                if candidate is not None:
+                    reply += f"\n👻 Candidate policy: {candidate.summary()}."
+                await self._reply(message.channel, reply)
+                return
+
+            if content.lower() == "$planner":
+                names = {cid: ch.name for cid in config.allowed_channels if (ch := self.get_channel(cid))}
+                body = "\n".join(self.planner.summary(names))
+                await self._reply(message.channel, f"🧭 **Roll planner (per channel and command)**\n```{body[:1900]}```")
+                return
+
+            if content.lower() == "$kakera":
+                names = {cid: ch.name for cid in config.allowed_channels if (ch := self.get_channel(cid))}
+                names.update({ch.guild.id: ch.guild.name for cid in config.allowed_channels if (ch := self.get_channel(cid)) and ch.guild})
+                body = "\n".join(self.kakera.summary(names))
+                await self._reply(message.channel, f"💎 **Kakera reaction power**\n```{body[:1900]}```")
+                return
+
+            if content.lower() == "$shadow":
+                hists = self.metrics.histograms
+                decide_p50 = tuple(hists[name].quantile(0.5) if name in hists else None for name in ("claim.match", "shadow.decide"))
+                body = "\n".join(self.shadow.summary(config.shadow_mode, decide_p50))
+                if len(body) <= 1900:
+                    await self._reply(message.channel, f"👻 **Shadow decisions**\n```{body}```")
+                else:
+                    file = discord.File(io.BytesIO(body.encode()), filename=f"shadow-{time.strftime('%Y%m%d-%H%M%S')}.txt")
+                    await self._reply(message.channel, "👻 **Shadow decisions**", file=file)
+                return
+
+            if content.lower().startswith("$rollstats"):
+                parts = content.split(maxsplit=1)
+                window = parse_window(parts[1] if len(parts) > 1 else "")
+                if window is None:
+                    await self._reply(message.channel, "⚠️ Usage: `$rollstats [7d|12h|30m]`")
+                    return
+                rows = self.history.stats(time.time() - window)
+                if not rows:
+                    await self._reply(message.channel, "📊 No rolls recorded in that window.")
+                    return
+                lines = [f"{'channel':<16} {'rolls':>6} {'hit%':>5} {'won':>4} {'kakera':>8} {'p50':>5} {'p90':>5} {'p99':>5} {'dec µs':>7}"]
+                for row in rows:
+                    ch = self.get_channel(row["channel"])
+                    name = (ch.name if ch else str(row["channel"]))[:16]
+                    lines.append(
+                        f"{name:<16} {row['rolls']:>6} {row['hit_rate'] * 100:>5.1f} {row['claimed']:>4} {row['kakera_total']:>8} "
+                        f"{row['kakera_p50']:>5.0f} {row['kakera_p90']:>5.0f} {row['kakera_p99']:>5.0f} {row['latency_p50'] * 1e6:>7.1f}"
+                    )
+                body = "\n".join(lines)
+                await self._reply(message.channel, f"📊 **Rolls in the last {parts[1].strip() if len(parts) > 1 else '1d'}**\n```{body[:1900]}```")
+                return
+
+            if content.lower() == "$stats":
+                rows = self.metrics.summary()
+                uptime = int(time.monotonic() - self.metrics.started_at)
+                rss = resident_memory()
+                caches = cache_sizes(self)
+                rows.append(f"rss {'?' if rss is None else f'{rss / 2**20:.0f} MB'}, cached: {caches['guilds']} guilds, "
+                            f"{caches['members']} members, {caches['messages']} messages")
+                body = "\n".join(rows)
+                await self._reply(message.channel, f"📈 **Hot-path timings (ms, uptime {uptime//60} min)**\n```{body[:1900]}```")
+                return
+
+            if content.lower().split(maxsplit=1)[:1] == ["$profile"]:
+                await self._diagnose(message.channel, content, default=60)
+                return
+
+            if content.lower().split(maxsplit=1)[:1] == ["$looplag"]:
+                await self._diagnose(message.channel, content, default=0)
                 return
 
             if content.lower() == "!help":
                 help_text = (
                     "📖 **Bot Command Help**\n\n"
                     "🌀 **Character Management**\n"
-                    "`$reloadchars`, `$addchars name1, name2, ...`, `$removechars ...`, `$listchars`, `$clearallchars`\n\n"
+                    "`$reloadchars`, `$addchars name1, name2 | alias, ...`, `$removechars ...`, `$listchars`, `$clearallchars`\n\n"
+                    "⚖️ **Claim Policy**\n"
+                    "`$reloadpolicy` — recompile the claim policy file\n"
+                    "`$reloadconfig` — re-read `.env` / CONFIG_FILE and apply changes\n"
+                    "`$shadow` — dry-run actions and differences with the SHADOW_POLICY candidate\n\n"
+                    "📈 **Diagnostics**\n"
+                    "`$stats` — claim/roll/$tu stage timings\n"
+                    "`$rollstats 7d` — rolls, hit rate, claims and kakera percentiles per channel\n"
+                    "`$planner` — per-channel roll statistics behind channel and command choice\n"
+                    "`$kakera` — projected reaction power, value threshold and kakera earned\n"
+                    "`$profile 60` — profile the bot for 60s, top functions as an attachment\n"
+                    "`$looplag [30]` — event-loop lag, slow callbacks over 30s and in-flight tasks\n\n"
                     "✅ Only the bot owner can use these commands."
                 )
-                await message.channel.send(help_text)
+                await self._reply(message.channel, help_text)
                 return
 
         # ---- Mudae embed handling (attempt claims when embed rolls happen) ----
         if (
-            message.channel.id in ALLOWED_CHANNELS
+            message.channel.id in config.allowed_channels
             and message.author.id == MUDAE_ID
-            and message.embeds
-            and message.components
         ):
-            embed: discord.Embed = message.embeds[0]
-            char_name = embed.author.name if embed.author else "Unknown"
-            kakera_text = embed.description or ""
-            kakera_match = re.search(r'\*\*(\d+)\*\*\s*<:kakera:', kakera_text.replace(',', ''))
-            kakera_value = int(kakera_match.group(1)) if kakera_match else 0
-
-            char_lower = char_name.lower()
-            print(f"🎲 Rolled character in #{message.channel.name}: {char_name} (kakera {kakera_value})")
+            received = time.monotonic()
+            with self.metrics.span("claim.parse"):
+                event = extract(message, self.user.id if self.user else None)
+            if event is None or not self.roll_tasks.admit(message.id):
+                return  # not a roll, or a duplicate delivery of one we already handle
+            char_name = event.name
+            kakera_value = event.kakera
 
             # compute claim conditions
-            claim_character = char_lower in self.character_list
-            claim_kakera = kakera_value >= MIN_KAKERA
-
-            # load channel timers (may be slightly stale but good enough)
-            ch_timers = self.timers_per_channel.get(message.channel.id, {})
-            # if timers say claim not available and not in progress, note it (but we may use $rt)
-            if ch_timers.get("claim_available") is False and not ch_timers.get("claim_in_progress", False):
-                print(f"⚠️ Claim currently not available in #{message.channel.name} per last $tu (claim={ch_timers.get('claim')}).")
-
-            # If either condition is met, attempt to press a claim emoji
-            if claim_character or claim_kakera:
-                for row in message.components:
-                    for button in row.children:
-                        try:
-                            if not button.emoji:
-                                continue
-                            if str(button.emoji) not in EMOJI_LIST:
-                                continue
-
-                            # re-read channel timers under lock
-                            lock = await self._get_channel_lock(message.channel.id)
-                            async with lock:
-                                ch_timers = self.timers_per_channel.setdefault(message.channel.id, {})
-
-                            claim_available_now = ch_timers.get("claim_available", False)
-                            rt_available_now = ch_timers.get("rt_available", False)
-
-                            # If claim isn't available but $rt is, attempt the $rt flow first
-                            if not claim_available_now and rt_available_now:
-                                async with lock:
-                                    ch_timers["claim_in_progress"] = True
-                                    ch_timers["rt_in_progress"] = True
-                                ev = self._get_claim_event(message.channel.id)
-                                ev.set()
-                                print(f"🔁 $rt available in #{message.channel.name}. Sending $rt to reset claim cooldown before attempting claim for {char_name}...")
-
-                                # small human-like pause
-                                await asyncio.sleep(random.uniform(0.3, 0.9))
+            with self.metrics.span("claim.match"):
+                watch_hit = self.watchlist.lookup(char_name)
+                decision = self.policy.decide(message.channel.id, char_name, event.series, kakera_value, watch_hit)
+            decided = time.monotonic()
+
+            self.planner.observe(message.channel.id, kakera_value, decision, event.owned, now=received,
+                                 requester=event.requester)
+            claim_log.info("🎲 Rolled character in #%s: %s (kakera %s)", message.channel.name, char_name, kakera_value, channel=message.channel.name, character=char_name, kakera=kakera_value, decision=decision.reason, tier=decision.tier)
+            self.history.record(message.id, message.channel.id, char_name, kakera_value, decision.claim, decided - received, decision.reason)
+
+            best = self._best_kakera(event, config.kakera_list)
+            if self.shadow.candidate is not None:
+                candidate_best = self._best_kakera(event, config.shadow_kakera_list or config.kakera_list)
+                self.shadow.compare(message.channel.id, message.channel.name, event, watch_hit, decision,
+                                    best and best[1], candidate_best and candidate_best[1])
+
+            # clicks, $rt round-trips and timer refreshes run in a managed task per roll
+            if decision.claim and event.claim_button is not None:
+                kind = CLAIM_TASK
+            elif best:
+                self.kakera.seen(self._kakera_pool(message.channel.id), best[1])
+                if not self._kakera_ready(message.channel.id):
+                    return
+                kind = KAKERA_TASK
+            else:
+                return
+            self.roll_tasks.start(message.id, message.channel.id, kind, self._handle_roll(message, event, decision, received))
 
-                                try:
-                                    await message.channel.send("$rt")
-                                except Exception as exc:
-                                    print(f"[#{message.channel.name}] ❗ Failed to send $rt: {exc}")
-                                    async with lock:
-                                        ch_timers["claim_in_progress"] = False
-                                        ch_timers.pop("rt_in_progress", None)
-                                    ev.set()
-                                    return
-
-                                # wait briefly for a Mudae reply to $rt (non-blocking)
-                                try:
-                                    def rt_check(m: discord.Message):
-                                        return m.author.id == MUDAE_ID and m.channel.id == message.channel.id
-                                    rt_msg = await self.wait_for("message", timeout=8.0, check=rt_check)
-                                    print(f"[#{message.channel.name}] 📩 Received Mudae reply after $rt: {rt_msg.content[:200]!s}")
-                                except asyncio.TimeoutError:
-                                    print(f"[#{message.channel.name}] ⚠ Timeout waiting for Mudae response to $rt (will refresh timers).")
-
-                                # refresh timers so we know if claim became available
-                                try:
-                                    await self.fetch_startup_timers(message.channel, include_global=False)
-                                except Exception as exc:
-                                    print(f"[#{message.channel.name}] ❗ Error while refreshing timers after $rt: {exc}")
-
-                                # re-check state after refresh
-                                async with lock:
-                                    post = self.timers_per_channel.get(message.channel.id, {})
-                                    became_available = post.get("claim_available", False)
-                                    post.pop("rt_in_progress", None)
-
-                                if became_available:
-                                    print(f"[#{message.channel.name}] ✅ Claim became available after $rt — attempting claim for {char_name}.")
-                                    # attempt claim click (resilient)
-                                    clicked = False
-                                    last_exc = None
-                                    for attempt_i in range(1, CLICK_RETRIES + 1):
-                                        try:
-                                            await button.click()
-                                            clicked = True
-                                            break
-                                        except Exception as exc:
-                                            last_exc = exc
-                                            print(f"[#{message.channel.name}] ⚠ Claim click attempt {attempt_i}/{CLICK_RETRIES} after $rt failed: {exc}")
-                                            await asyncio.sleep(CLICK_RETRY_DELAY)
-
-                                    # after clicking (or failing), fetch message and print embed/footer for confirmation
-                                    await asyncio.sleep(0.7)
-                                    try:
-                                        new_msg = await message.channel.fetch_message(message.id)
-                                        new_embed = new_msg.embeds[0] if new_msg.embeds else None
-                                        footer_text = new_embed.footer.text if new_embed and new_embed.footer else ""
-                                        print(f"[#{message.channel.name}] 🔎 Post-claim embed footer: {footer_text!r}")
-                                        if footer_text and f"Belongs to {USERNAME}" in footer_text:
-                                            print(f"[#{message.channel.name}] ✅ Confirmed claim via embed footer for {char_name}")
-                                        else:
-                                            print(f"[#{message.channel.name}] ⚠ Post-claim embed footer doesn't contain 'Belongs to' (footer: {footer_text!r})")
-                                    except Exception as exc:
-                                        print(f"[#{message.channel.name}] ⚠ Failed to fetch post-claim message for confirmation: {exc}")
-
-                                    async with lock:
-                                        self.timers_per_channel.setdefault(message.channel.id, {})["claim_in_progress"] = False
-                                        # keep claim_available False until next $tu
-                                    ev.set()
-                                    if not clicked:
-                                        print(f"[#{message.channel.name}] ❌ Clicks after $rt all failed. Last error: {last_exc}")
-                                        # refresh timers to recover
-                                        try:
-                                            await self.fetch_startup_timers(message.channel, include_global=False)
-                                        except Exception as exc:
-                                            print(f"[#{message.channel.name}] ❗ Error refreshing timers after failed click: {exc}")
-                                    return
-                                else:
-                                    print(f"[#{message.channel.name}] ❌ $rt did not make claim available for {char_name}. Aborting claim attempt.")
-                                    async with lock:
-                                        self.timers_per_channel.setdefault(message.channel.id, {})["claim_in_progress"] = False
-                                    ev.set()
-                                    # refresh timers for correctness
-                                    try:
-                                        await self.fetch_startup_timers(message.channel, include_global=False)
-                                    except Exception as exc:
-                                        print(f"[#{message.channel.name}] ❗ Error while refreshing timers after $rt no-op: {exc}")
-                                    return
-
-                            # If claim is available normally (no $rt required), proceed with normal claim flow:
-                            if ch_timers.get("claim_available", False):
-                                # mark claim_in_progress immediately
-                                lock = await self._get_channel_lock(message.channel.id)
-                                async with lock:
-                                    timers = self.timers_per_channel.setdefault(message.channel.id, {})
-                                    timers["claim_available"] = False
-                                    timers["claim_in_progress"] = True
-
-                                ev = self._get_claim_event(message.channel.id)
-                                ev.set()
-
-                                # human-like delay before clicking
-                                delay = random.uniform(max(0.5, TIMER - 1), TIMER + 1)
-                                print(f"⏳ Waiting {delay:.2f}s before attempting claim for {char_name} in #{message.channel.name}...")
-                                await asyncio.sleep(delay)
-
-                                clicked = False
-                                last_exc = None
-                                for attempt in range(1, CLICK_RETRIES + 1):
+    async def _shadow_claim(self, message: discord.Message, event: RollEvent, decision, received: float) -> bool:
+        """
+        Dry run of the claim flow: record the claim, $rt + claim or skipped $rt the live
+        flow would go for, and pretend to spend it. True if a claim was (pretend) made.
+        """
+        channel_id = message.channel.id
+        state = self._get_channel_state(channel_id)
+        lock = await self._get_channel_lock(channel_id)
+        async with lock:
+            if state.claim_ready():
+                action = SHADOW_CLAIM
+            elif state.rt_ready():
+                action = SHADOW_RT_CLAIM if decision.use_rt else SHADOW_SKIP_RT
+            else:
+                return False
+            if action != SHADOW_SKIP_RT:
+                self.roll_tasks.commit(message.id)
+                self.shadow.spend_claim(channel_id, state.claim_reset_at)
+                if action == SHADOW_RT_CLAIM:
+                    self.shadow.spend_rt(channel_id)
+                    state.mark_rt_used()
+                state.mark_claimed()
+        self.shadow.action(action, message.channel.name, f"{event.name} ({event.kakera}, {decision.describe()})",
+                           latency=time.monotonic() - received, character=event.name, kakera=event.kakera,
+                           reason=decision.reason, tier=decision.tier)
+        if action == SHADOW_SKIP_RT:
+            return False
+        self._get_claim_event(channel_id).set()
+        self._rearm(channel_id)
+        self._prune_roll_tasks(channel_id)
+        return True
+
+    async def _handle_roll(self, message: discord.Message, event: RollEvent, decision, received: float) -> None:
+        """
+        Claim and/or kakera handling for one roll; runs as a RollTasks task so on_message
+        returns right away. Calls roll_tasks.commit before it touches channel state or clicks.
+        """
+        char_name = event.name
+        kakera_value = event.kakera
+        # load channel state (timers projected from the last $tu)
+        state = self._get_channel_state(message.channel.id)
+        # if state says claim not available and not in progress, note it (but we may use $rt)
+        if not state.claim_ready() and not state.claim_in_progress:
+            remaining = state.remaining(state.claim_reset_at)
+            claim_log.warning("⚠️ Claim currently not available in #%s per last $tu (claim=%s).", message.channel.name, None if remaining is None else int(remaining), channel=message.channel.name)
+
+        # If the policy says claim, attempt to press a claim emoji
+        button = event.claim_button
+        if decision.claim and button is not None and config.shadow_mode:
+            if await self._shadow_claim(message, event, decision, received):
+                return
+        elif decision.claim and button is not None:
+            try:
+                # re-read channel state under lock
+                lock = await self._get_channel_lock(message.channel.id)
+                async with self.metrics.locked(lock, "claim.lock_wait"):
+                    claim_available_now = state.claim_ready()
+                    rt_available_now = state.rt_ready()
+
+                # $rt is scarce: only spend it on tiers the policy allows
+                if not claim_available_now and rt_available_now and not decision.use_rt:
+                    claim_log.info("🔁 Not spending $rt on %s (%s).", char_name, decision.describe(), channel=message.channel.name, reason=decision.reason, tier=decision.tier)
+
+                # If claim isn't available but $rt is, attempt the $rt flow first
+                elif not claim_available_now and rt_available_now:
+                    self.roll_tasks.commit(message.id)
+                    async with lock:
+                        state.claim_in_progress = True
+                        state.rt_in_progress = True
+                    ev = self._get_claim_event(message.channel.id)
+                    ev.set()
+                    claim_log.info("🔁 $rt available in #%s. Sending $rt to reset claim cooldown before attempting claim for %s...", message.channel.name, char_name, channel=message.channel.name)
+
+                    # small human-like pause
+                    await asyncio.sleep(random.uniform(0.3, 0.9))
+
+                    rt_reply = self.router.expect(message.channel.id, RT)
+                    try:
+                        await self.outbox.send(message.channel, "$rt", priority=CRITICAL)
+                    except Exception as exc:
+                        rt_reply.close()
+                        claim_log.error("❗ Failed to send $rt: %s", exc, channel=message.channel.name)
+                        async with lock:
+                            state.claim_in_progress = False
+                            state.rt_in_progress = False
+                        ev.set()
+                        self._rearm(message.channel.id)
+                        return
+                    async with lock:
+                        state.mark_rt_used()
+
+                    # wait briefly for a Mudae reply to $rt (non-blocking)
+                    try:
+                        with rt_reply, self.metrics.span("rt.reply"):
+                            rt_msg = await rt_reply.wait(8.0)
+                        claim_log.info("📩 Received Mudae reply after $rt: %s", rt_msg.content[:200], channel=message.channel.name)
+                    except asyncio.TimeoutError:
+                        self.metrics.incr("rt.timeout")
+                        claim_log.warning("⚠ Timeout waiting for Mudae response to $rt (will refresh timers).", channel=message.channel.name)
+
+                    # refresh timers so we know if claim became available
+                    try:
+                        await self.fetch_startup_timers(message.channel, include_global=False, fresh=True)
+                    except Exception as exc:
+                        claim_log.error("❗ Error while refreshing timers after $rt: %s", exc, channel=message.channel.name)
+
+                    # re-check state after refresh
+                    async with lock:
+                        became_available = state.claim_available
+                        state.rt_in_progress = False
+
+                    if became_available:
+                        claim_log.info("✅ Claim became available after $rt — attempting claim for %s.", char_name, channel=message.channel.name)
+                        # attempt claim click (resilient); the confirmation is routed by message id
+                        clicked = False
+                        last_exc = None
+                        with self.router.expect_claim(message.channel.id, message.id, char_name) as claim_reply:
+                            with self.metrics.span("claim.click"):
+                                for attempt_i in range(1, config.click_retries + 1):
                                     try:
                                         await button.click()
                                         clicked = True
                                         break
                                     except Exception as exc:
                                         last_exc = exc
-                                        print(f"[#{message.channel.name}] ⚠ Click attempt {attempt}/{CLICK_RETRIES} failed: {exc}")
-                                        await asyncio.sleep(CLICK_RETRY_DELAY)
+                                        self.metrics.incr("claim.click_retry")
+                                        claim_log.warning("⚠ Claim click attempt %s/%s after $rt failed: %s", attempt_i, config.click_retries, exc, channel=message.channel.name)
+                                        await asyncio.sleep(config.click_retry_delay)
+                            if clicked:
+                                self.metrics.observe("claim.total_rt", time.monotonic() - received)
+                                await self._confirm_claim(message, claim_reply, char_name, kakera_value, decision.describe() + ', $rt')
+
+                        async with lock:
+                            state.claim_in_progress = False
+                        ev.set()
+                        self._rearm(message.channel.id)
+                        if not clicked:
+                            self.metrics.incr("claim.click_failed")
+                            claim_log.error("❌ Clicks after $rt all failed. Last error: %s", last_exc, channel=message.channel.name)
+                            # refresh timers to recover
+                            try:
+                                await self.fetch_startup_timers(message.channel, include_global=False, fresh=True)
+                            except Exception as exc:
+                                claim_log.error("❗ Error refreshing timers after failed click: %s", exc, channel=message.channel.name)
+                        return
+                    else:
+                        claim_log.error("❌ $rt did not make claim available for %s. Aborting claim attempt.", char_name, channel=message.channel.name)
+                        async with lock:
+                            state.claim_in_progress = False
+                        ev.set()
+                        self._rearm(message.channel.id)
+                        # refresh timers for correctness
+                        try:
+                            await self.fetch_startup_timers(message.channel, include_global=False)
+                        except Exception as exc:
+                            claim_log.error("❗ Error while refreshing timers after $rt no-op: %s", exc, channel=message.channel.name)
+                        return
 
-                                # after clicking, try to confirm via embed footer
-                                await asyncio.sleep(0.7)
+                # If claim is available normally (no $rt required), proceed with normal claim flow:
+                if claim_available_now:
+                    # mark claim_in_progress immediately
+                    self.roll_tasks.commit(message.id)
+                    async with lock:
+                        state.mark_claimed()
+                        state.claim_in_progress = True
+                    self._prune_roll_tasks(message.channel.id)
+
+                    ev = self._get_claim_event(message.channel.id)
+                    ev.set()
+
+                    # human-like delay before clicking
+                    delay = random.uniform(max(0.5, config.timer - 1), config.timer + 1)
+                    claim_log.info("⏳ Waiting %.2fs before attempting claim for %s in #%s...", delay, char_name, message.channel.name, channel=message.channel.name)
+                    with self.metrics.span("claim.delay"):
+                        await asyncio.sleep(delay)
+
+                    clicked = False
+                    last_exc = None
+                    with self.router.expect_claim(message.channel.id, message.id, char_name) as claim_reply:
+                        with self.metrics.span("claim.click"):
+                            for attempt in range(1, config.click_retries + 1):
                                 try:
-                                    new_msg = await message.channel.fetch_message(message.id)
-                                    new_embed = new_msg.embeds[0] if new_msg.embeds else None
-                                    footer_text = new_embed.footer.text if new_embed and new_embed.footer else ""
-                                    print(f"[#{message.channel.name}] 🔎 Post-claim embed footer: {footer_text!r}")
-                                    if footer_text and "Belongs to" in footer_text:
-                                        print(f"[#{message.channel.name}] ✅ Confirmed claim via embed footer for {char_name}")
-                                    else:
-                                        print(f"[#{message.channel.name}] ⚠ Post-claim embed footer doesn't contain 'Belongs to' (footer: {footer_text!r})")
+                                    await button.click()
+                                    clicked = True
+                                    break
                                 except Exception as exc:
-                                    print(f"[#{message.channel.name}] ⚠ Failed to fetch post-claim message for confirmation: {exc}")
-
-                                if clicked:
-                                    async with lock:
-                                        self.timers_per_channel.setdefault(message.channel.id, {})["claim_in_progress"] = False
-                                        self.timers_per_channel.setdefault(message.channel.id, {})["claim_available"] = False
-                                    ev.set()
-                                    print(f"✅ Character claimed in #{message.channel.name}: {char_name} (reason: {'list' if claim_character else 'kakera'})")
-                                    return
-                                else:
-                                    print(f"[#{message.channel.name}] ❌ All click attempts failed for {char_name}. Refreshing timers to recover. Last error: {last_exc}")
-                                    async with lock:
-                                        self.timers_per_channel.setdefault(message.channel.id, {})["claim_in_progress"] = False
-                                    ev.set()
-                                    try:
-                                        await self.fetch_startup_timers(message.channel, include_global=False)
-                                    except Exception as exc:
-                                        print(f"[#{message.channel.name}] ❗ Error while refreshing timers after failed click: {exc}")
-                                    ev.set()
-                                    return
+                                    last_exc = exc
+                                    self.metrics.incr("claim.click_retry")
+                                    claim_log.warning("⚠ Click attempt %s/%s failed: %s", attempt, config.click_retries, exc, channel=message.channel.name)
+                                    await asyncio.sleep(config.click_retry_delay)
+                        if clicked:
+                            # embed arrival -> claim click landed
+                            self.metrics.observe("claim.total", time.monotonic() - received)
+                            await self._confirm_claim(message, claim_reply, char_name, kakera_value, decision.describe())
+
+                    if clicked:
+                        async with lock:
+                            state.claim_in_progress = False
+                        ev.set()
+                        self._rearm(message.channel.id)
+                        return
+                    else:
+                        self.metrics.incr("claim.click_failed")
+                        claim_log.error("❌ All click attempts failed for %s. Refreshing timers to recover. Last error: %s", char_name, last_exc, channel=message.channel.name)
+                        async with lock:
+                            state.claim_in_progress = False
+                        ev.set()
+                        self._rearm(message.channel.id)
+                        try:
+                            await self.fetch_startup_timers(message.channel, include_global=False)
                         except Exception as exc:
-                            print(f"[#{message.channel.name}] ❗ Unexpected error when trying to claim button: {exc}")
-                            continue
-
-            # If not claimed via character logic, optionally handle kakera-only buttons (stock etc.)
-            if not self.timers_per_channel.get(message.channel.id, {}).get("kakera_available", True):
-                # kakera not available per $tu; skip kakera reactions
-                pass
+                            claim_log.error("❗ Error while refreshing timers after failed click: %s", exc, channel=message.channel.name)
+                        ev.set()
+                        return
+            except Exception as exc:
+                claim_log.error("❗ Unexpected error when trying to claim button: %s", exc, channel=message.channel.name)
+
+        # If not claimed via character logic, react to the best kakera button if the shared power allows
+        self.roll_tasks.switch(message.id, KAKERA_TASK)
+        choice = self._best_kakera(event, config.kakera_list)
+        if choice is None or not self._kakera_ready(message.channel.id):
+            return
+        button, kind = choice
+        pool = self._kakera_pool(message.channel.id)
+        self.kakera.offer(pool, message.id, kind)
+        try:
+            delay = random.uniform(max(0.5, config.timer - 1), config.timer + 1)
+            kakera_log.info("⏳ Waiting %.2fs before claiming kakera button %s in #%s...", delay, kind, message.channel.name, channel=message.channel.name)
+            await asyncio.sleep(delay)
+            # better buttons elsewhere in the pool get the power first; low-value ones wait for a better one
+            verdict = self.kakera.decide(pool, message.id)
+        finally:
+            self.kakera.withdraw(pool, message.id)
+        if verdict != KAKERA_CLICK:
+            self.metrics.incr(f"kakera.skip_{verdict}")
+            kakera_log.info("⏭️ Skipping kakera button %s in #%s (%s)", kind, message.channel.name, verdict, channel=message.channel.name, kind=kind, reason=verdict)
+            return
+        if config.shadow_mode:
+            self.shadow.action(SHADOW_KAKERA_CLICK, message.channel.name, f"{kind} on {char_name}",
+                               latency=time.monotonic() - received, kind=kind, character=char_name)
+            return
+        self.roll_tasks.commit(message.id)
+        try:
+            # --- Confirmation handling for kakera ---
+            with self.router.expect(message.channel.id, KAKERA) as kakera_reply:
+                with self.metrics.span("kakera.click"):
+                    await button.click()
+                kakera_log.info("✅ Kakera reaction clicked in #%s: %s", message.channel.name, kind, channel=message.channel.name)
+                try:
+                    with self.metrics.span("kakera.confirm"):
+                        conf_msg = await kakera_reply.wait(10.0)
+                except asyncio.TimeoutError:
+                    self.metrics.incr("kakera.timeout")
+                    conf_msg = None
+            if conf_msg is not None:
+                snippet = conf_msg.content[:120].replace("\n", " ")
+                kakera_log.info("🔎 Kakera confirmation: %s", snippet, channel=message.channel.name)
+                earned = kakera_earned(conf_msg.content)
+                if earned is not None:
+                    self.kakera.earned(pool, kind, earned)
+                else:
+                    # "can't react": the power projection was too optimistic
+                    self.kakera.refused(pool)
             else:
-                for row in message.components:
-                    for button in row.children:
-                        if not button.emoji:
-                            continue
-                        emoji_str = str(button.emoji).lower()
-                        if any(k in emoji_str for k in KAKERA_LIST):
-                            delay = random.uniform(max(0.5, TIMER - 1), TIMER + 1)
-                            print(f"⏳ Waiting {delay:.2f}s before claiming kakera button {emoji_str} in #{message.channel.name}...")
-                            await asyncio.sleep(delay)
-                            try:
-                                await button.click()
-                                print(f"✅ Kakera reaction clicked in #{message.channel.name}: {emoji_str}")
-
-                                # --- Confirmation handling for kakera ---
-                                def kakera_check(m: discord.Message):
-                                    return (
-                                        m.author.id == MUDAE_ID
-                                        and m.channel.id == message.channel.id
-                                        and "<:kakera" in (m.content or "").lower()
-                                        and str(self.user) in (m.content or "")
-                                    )
-                                try:
-                                    conf_msg = await self.wait_for("message", timeout=10.0, check=kakera_check)
-                                    snippet = conf_msg.content[:120].replace("\n", " ")
-                                    print(f"[#{message.channel.name}] 🔎 Kakera confirmation: {snippet}")
-                                except asyncio.TimeoutError:
-                                    print(f"[#{message.channel.name}] ⚠ No kakera confirmation detected (timeout).")
-
-                            except Exception as exc:
-                                print(f"[#{message.channel.name}] ❗ Failed clicking kakera button: {exc}")
-                            return
+                kakera_log.warning("⚠ No kakera confirmation detected (timeout).", channel=message.channel.name)
 
+        except Exception as exc:
+            kakera_log.error("❗ Failed clicking kakera button: %s", exc, channel=message.channel.name)
 
 # run the client
-client = MyClient()
-client.run(TOKEN)
+if __name__ == "__main__":
+    client = MyClient()
+    client.run(config.token)
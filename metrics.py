@@ -0,0 +1,146 @@
+"""
+Span timing for the claim, roll and `$tu` hot paths.
+
+Each span name gets a fixed-bucket histogram (constant memory no matter how
+long the bot runs), plus a few plain counters for retries and timeouts. The
+numbers are served in Prometheus text format on a localhost port and
+summarised by the `$stats` owner command.
+"""
+import asyncio
+import bisect
+import contextlib
+import time
+
+# upper bucket bounds in seconds: 10µs .. 60s, roughly 1-2.5-5 per decade
+BUCKETS = (
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 25.0, 60.0,
+)
+
+
+class Histogram:
+    __slots__ = ("counts", "count", "sum", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)  # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q: float) -> float | None:
+        """Estimate by linear interpolation inside the bucket holding the q-th sample."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lower = BUCKETS[i - 1] if i > 0 else 0.0
+                upper = BUCKETS[i] if i < len(BUCKETS) else self.max
+                return min(self.max, lower + (upper - lower) * (rank - seen) / n)
+            seen += n
+        return self.max
+
+
+class Metrics:
+    def __init__(self):
+        self.histograms: dict[str, Histogram] = {}
+        self.counters: dict[str, int] = {}
+        self.started_at = time.monotonic()
+
+    def observe(self, name: str, seconds: float) -> None:
+        hist = self.histograms.get(name)
+        if hist is None:
+            hist = self.histograms[name] = Histogram()
+        hist.observe(seconds)
+
+    def incr(self, name: str, amount: int = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    @contextlib.contextmanager
+    def span(self, name: str):
+        """Time the enclosed block into histogram `name` (also when it raises)."""
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(name, time.monotonic() - started)
+
+    @contextlib.asynccontextmanager
+    async def locked(self, lock: asyncio.Lock, name: str):
+        """`async with lock`, recording how long the acquire waited into `name`."""
+        started = time.monotonic()
+        async with lock:
+            self.observe(name, time.monotonic() - started)
+            yield
+
+    # ---- exposition ----
+    def render_prometheus(self) -> str:
+        lines = [
+            "# HELP mudae_span_seconds Time spent in instrumented hot-path stages.",
+            "# TYPE mudae_span_seconds histogram",
+        ]
+        for name, hist in sorted(self.histograms.items()):
+            cumulative = 0
+            for bound, n in zip((*BUCKETS, "+Inf"), hist.counts):
+                cumulative += n
+                lines.append(f'mudae_span_seconds_bucket{{span="{name}",le="{bound}"}} {cumulative}')
+            lines.append(f'mudae_span_seconds_sum{{span="{name}"}} {hist.sum}')
+            lines.append(f'mudae_span_seconds_count{{span="{name}"}} {hist.count}')
+        lines += [
+            "# HELP mudae_events_total Retries, timeouts and other hot-path events.",
+            "# TYPE mudae_events_total counter",
+        ]
+        for name, value in sorted(self.counters.items()):
+            lines.append(f'mudae_events_total{{event="{name}"}} {value}')
+        lines.append(f"mudae_uptime_seconds {time.monotonic() - self.started_at}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> list[str]:
+        """Rows for `$stats`: count, p50, p95 and max per span, in milliseconds."""
+        def ms(value: float | None) -> str:
+            if value is None:
+                return "-"
+            value *= 1000
+            return f"{value:.3f}" if value < 1 else f"{value:.1f}"
+
+        rows = [f"{'span':<20} {'n':>6} {'p50':>9} {'p95':>9} {'max':>9}"]
+        for name, hist in sorted(self.histograms.items()):
+            rows.append(
+                f"{name:<20} {hist.count:>6} {ms(hist.quantile(0.5)):>9} "
+                f"{ms(hist.quantile(0.95)):>9} {ms(hist.max):>9}"
+            )
+        if self.counters:
+            rows.append("")
+            rows += [f"{name:<20} {value:>6}" for name, value in sorted(self.counters.items())]
+        return rows
+
+    async def serve(self, host: str, port: int) -> asyncio.AbstractServer:
+        """Serve GET /metrics in Prometheus text format."""
+        async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+            try:
+                request = await asyncio.wait_for(reader.readline(), timeout=5)
+                path = request.split(b" ")[1] if request.count(b" ") >= 2 else b""
+                if path.split(b"?")[0] == b"/metrics":
+                    status, body = "200 OK", self.render_prometheus().encode()
+                else:
+                    status, body = "404 Not Found", b"not found\n"
+                writer.write(
+                    f"HTTP/1.1 {status}\r\nContent-Type: text/plain; version=0.0.4\r\n"
+                    f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body
+                )
+                await writer.drain()
+            except (asyncio.TimeoutError, ConnectionError):
+                pass
+            finally:
+                writer.close()
+
+        return await asyncio.start_server(handle, host, port)
@@ -0,0 +1,279 @@
+"""
+Outbound command queue.
+
+Every `channel.send` goes through one Outbox so bursts from several channels
+share Discord's rate limits in a controlled order: a global token bucket and
+one bucket per channel gate dispatch, and among sendable requests the lowest
+priority value goes first (a claim-critical `$rt` never waits behind rolls,
+rolls never wait behind `$tu`, and owner output goes last). Each channel has
+its own heap keyed by (priority, seq), so picking the next request only
+compares the heads of channels whose bucket has a token. A channel has at most
+one send in flight, so its messages arrive in the order they were dispatched.
+A queued request with the same dedup key as a new one absorbs it, so redundant
+`$tu` sends collapse into one; a request whose every sender was cancelled is
+dropped before it goes out. 429s and 5xx responses are retried with backoff,
+holding the channel until the request settles; sends carrying files are not
+retried, as discord.py closes the file once it has been sent.
+"""
+import asyncio
+import heapq
+import itertools
+import time
+
+import discord
+
+from logs import get_logger
+
+# priorities, lowest first
+CRITICAL = 0  # $rt before a claim
+ROLL = 1
+REFRESH = 2  # $tu, $daily
+OWNER = 3  # owner command replies, watchlist journal
+
+# shortest pump sleep: a token a few ns away must still let the clock move on
+MIN_WAIT = 0.001
+
+log = get_logger("outbound")
+
+
+class TokenBucket:
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now: float) -> float:
+        """Seconds until a token is available (0 if one is available now)."""
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self, now: float) -> None:
+        self._refill(now)
+        self.tokens -= 1
+
+
+class _Request:
+    __slots__ = ("channel", "content", "kwargs", "priority", "dedup_key", "future", "queued_at", "attempts",
+                 "waiters", "queued")
+
+    def __init__(self, channel, content: str, kwargs: dict, priority: int, dedup_key, future: asyncio.Future):
+        self.channel = channel
+        self.content = content
+        self.kwargs = kwargs
+        self.priority = priority
+        self.dedup_key = dedup_key
+        self.future = future
+        self.queued_at = time.monotonic()
+        self.attempts = 0
+        self.waiters = 0  # senders awaiting the future
+        self.queued = False  # in a heap, not yet handed to a delivery task
+
+
+class Outbox:
+    def __init__(self, rate: float = 2.0, burst: int = 5, channel_rate: float = 1.0, channel_burst: int = 3,
+                 max_retries: int = 3, metrics=None):
+        self.global_bucket = TokenBucket(rate, burst)
+        self.channel_rate = channel_rate
+        self.channel_burst = channel_burst
+        self.max_retries = max_retries
+        self.metrics = metrics
+        self._buckets: dict[int, TokenBucket] = {}
+        # channel id -> heap of (priority, seq, request)
+        self._queues: dict[int, list[tuple[int, int, _Request]]] = {}
+        self._in_flight: set[int] = set()  # channels with a send (or its retries) under way
+        self._size = 0  # queued requests, dropped ones excluded
+        self._seq = itertools.count()
+        self._pending: dict[object, _Request] = {}  # dedup key -> queued request
+        self._wakeup = asyncio.Event()
+        self._pump_task: asyncio.Task | None = None
+        self._deliveries: set[asyncio.Task] = set()
+
+    def configure(self, rate: float, burst: int, channel_rate: float, channel_burst: int) -> None:
+        """New limits; buckets restart full at the new sizes."""
+        self.global_bucket = TokenBucket(rate, burst)
+        self.channel_rate = channel_rate
+        self.channel_burst = channel_burst
+        self._buckets.clear()
+        self._wakeup.set()
+
+    async def send(self, channel, content: str = "", priority: int = ROLL, dedup_key=None, **kwargs):
+        """Queue `channel.send(content, **kwargs)` and return the sent message."""
+        if dedup_key is not None and dedup_key in self._pending:
+            self._count("send.coalesced")
+            request = self._pending[dedup_key]
+        else:
+            request = _Request(channel, content, kwargs, priority, dedup_key,
+                               asyncio.get_running_loop().create_future())
+            if dedup_key is not None:
+                self._pending[dedup_key] = request
+            self._push(request)
+        request.waiters += 1
+        try:
+            return await asyncio.shield(request.future)
+        except asyncio.CancelledError:
+            request.waiters -= 1
+            if request.waiters == 0 and request.queued:
+                self._drop(request)
+            raise
+
+    def sender(self, priority: int):
+        """`send(channel, content, **kwargs)` bound to `priority`, for code that takes a send callable."""
+        async def send(channel, content: str = "", **kwargs):
+            return await self.send(channel, content, priority=priority, **kwargs)
+        return send
+
+    def queued(self) -> int:
+        return self._size
+
+    async def close(self) -> None:
+        """Stop the pump, cancel in-flight deliveries and fail whatever is still queued."""
+        # emptied first: a pump whose cancellation races its wakeup still finds nothing left to send
+        queued = [entry[-1] for heap in self._queues.values() for entry in heap]
+        self._queues.clear()
+        self._pending.clear()
+        self._size = 0
+        tasks = list(self._deliveries)
+        if self._pump_task is not None:
+            tasks.append(self._pump_task)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._pump_task = None
+        for request in queued:
+            request.queued = False
+            request.future.cancel()
+
+    # ---- dispatch ----
+    def _push(self, request: _Request) -> None:
+        request.queued = True
+        self._size += 1
+        heap = self._queues.get(request.channel.id)
+        if heap is None:
+            heap = self._queues[request.channel.id] = []
+        heapq.heappush(heap, (request.priority, next(self._seq), request))
+        self._wakeup.set()
+        if self._pump_task is None or self._pump_task.done():
+            self._pump_task = asyncio.get_running_loop().create_task(self._pump(), name="outbox")
+
+    def _drop(self, request: _Request) -> None:
+        """Nobody waits for a queued request any more: it stays in its heap but is skipped."""
+        request.queued = False
+        self._size -= 1
+        if request.dedup_key is not None and self._pending.get(request.dedup_key) is request:
+            del self._pending[request.dedup_key]
+        request.future.cancel()
+        self._count("send.dropped")
+
+    def _bucket(self, channel_id: int) -> TokenBucket:
+        bucket = self._buckets.get(channel_id)
+        if bucket is None:
+            bucket = self._buckets[channel_id] = TokenBucket(self.channel_rate, self.channel_burst)
+        return bucket
+
+    def _next_ready(self, now: float) -> tuple[_Request | None, float | None]:
+        """
+        Highest-priority request that may go now, else how long until one might
+        (None: only channels with a send in flight are waiting; its end wakes the pump).
+        """
+        wait = self.global_bucket.wait_time(now)
+        if wait > 0:
+            return None, wait
+        wait = None
+        best = None
+        for channel_id, heap in list(self._queues.items()):
+            while heap and not heap[0][2].queued:
+                heapq.heappop(heap)  # dropped
+            if not heap:
+                del self._queues[channel_id]
+                continue
+            if channel_id in self._in_flight:
+                continue
+            channel_wait = self._bucket(channel_id).wait_time(now)
+            if channel_wait > 0:
+                wait = channel_wait if wait is None else min(wait, channel_wait)
+            elif best is None or heap[0] < best[0]:
+                best = heap
+        if best is None:
+            return None, wait
+        request = heapq.heappop(best)[2]
+        if not best:
+            del self._queues[request.channel.id]
+        request.queued = False
+        self._size -= 1
+        return request, 0.0
+
+    async def _pump(self) -> None:
+        while self._queues:
+            self._wakeup.clear()
+            now = time.monotonic()
+            request, wait = self._next_ready(now)
+            if request is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=None if wait is None else max(wait, MIN_WAIT))
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            self.global_bucket.take(now)
+            self._bucket(request.channel.id).take(now)
+            if request.dedup_key is not None:
+                self._pending.pop(request.dedup_key, None)
+            if self.metrics is not None:
+                self.metrics.observe("send.queue_wait", now - request.queued_at)
+            self._in_flight.add(request.channel.id)
+            task = asyncio.get_running_loop().create_task(self._deliver(request))
+            self._deliveries.add(task)
+            task.add_done_callback(self._deliveries.discard)
+
+    async def _deliver(self, request: _Request) -> None:
+        try:
+            message = await self._send_with_retries(request)
+        except asyncio.CancelledError:
+            request.future.cancel()
+            raise
+        except Exception as exc:
+            if request.waiters == 0:  # every sender gave up while it was in flight
+                request.future.cancel()
+            elif not request.future.done():
+                request.future.set_exception(exc)
+        else:
+            if not request.future.done():
+                request.future.set_result(message)
+        finally:
+            self._in_flight.discard(request.channel.id)
+            self._wakeup.set()
+
+    async def _send_with_retries(self, request: _Request):
+        retryable = "file" not in request.kwargs and "files" not in request.kwargs
+        while True:
+            request.attempts += 1
+            try:
+                return await request.channel.send(request.content, **request.kwargs)
+            except Exception as exc:
+                delay = _retry_delay(exc, request.attempts) if retryable else None
+                if delay is None or request.attempts > self.max_retries or request.waiters == 0:
+                    raise
+                self._count("send.retry")
+                log.warning("⏳ Send rate limited/failed, retrying in %.1fs", delay, channel=getattr(request.channel, "name", None),
+                            attempt=request.attempts, error=str(exc))
+                await asyncio.sleep(delay)
+
+    def _count(self, name: str) -> None:
+        if self.metrics is not None:
+            self.metrics.incr(name)
+
+
+def _retry_delay(exc: Exception, attempt: int) -> float | None:
+    """Backoff for retryable send errors (429, 5xx); None if the error is final."""
+    backoff = 0.5 * 2 ** (attempt - 1)
+    if isinstance(exc, discord.RateLimited):
+        return exc.retry_after + backoff
+    if isinstance(exc, discord.HTTPException) and (exc.status == 429 or exc.status >= 500):
+        return float(getattr(exc, "retry_after", 0) or 0) + backoff
+    return None
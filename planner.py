@@ -0,0 +1,201 @@
+"""
+Expected-value roll planner.
+
+For every channel and roll command the planner keeps running statistics of
+our own rolls: how often the claim policy wanted the roll, the value of those
+claims (kakera, with wanted characters counted at least WANTED_VALUE), the
+part of it worth spending `$rt` on, the kakera distribution and how long
+Mudae took to answer. From them it
+
+- ranks channels, so when several are due at once the scheduler services the
+  one with the highest expected claim value per roll first. A channel whose
+  claim is on cooldown only counts rolls worth a `$rt`, and
+- picks the command with the best expected value per roll. Commands with few
+  samples are shrunk towards the channel average and get a UCB bonus, so a
+  rarely used command is still tried now and then.
+
+Statistics are running means that turn into exponential averages after
+WINDOW rolls, so old behaviour fades out. Every decision is O(commands) per
+channel.
+"""
+import math
+import re
+import time
+from collections import deque
+
+from policy import Decision
+
+WANTED_VALUE = 1000  # value of a roll worth a $rt (tier-1) when its kakera is lower
+WINDOW = 200  # rolls after which statistics become exponential averages
+PRIOR_ROLLS = 20  # weight of the channel average in a command's estimate
+EXPLORE = 0.5  # UCB bonus weight, relative to the channel's mean value per roll
+PENDING_TTL = 15.0  # seconds a sent roll waits for its embed before it is forgotten
+
+# any Mudae roll command typed in a channel ($w, $wa, $hg, $ma, ...), by anyone
+_ROLL_COMMAND = re.compile(r"\$[whm][ag]?(?:\s|$)", re.IGNORECASE)
+
+
+class RollStats:
+    __slots__ = ("rolls", "hit_rate", "value", "rt_value", "kakera", "latency")
+
+    def __init__(self, rolls: int = 0, hit_rate: float = 0.0, value: float = 0.0, rt_value: float = 0.0,
+                 kakera: float = 0.0, latency: float = 0.0):
+        self.rolls = rolls
+        self.hit_rate = hit_rate
+        self.value = value  # mean claim value per roll
+        self.rt_value = rt_value  # mean value per roll of claims worth a $rt
+        self.kakera = kakera
+        self.latency = latency
+
+    def add(self, hit: bool, value: float, rt_value: float, kakera: int, latency: float | None) -> None:
+        self.rolls += 1
+        a = 1.0 / min(self.rolls, WINDOW)
+        self.hit_rate += a * (hit - self.hit_rate)
+        self.value += a * (value - self.value)
+        self.rt_value += a * (rt_value - self.rt_value)
+        self.kakera += a * (kakera - self.kakera)
+        if latency is not None:
+            self.latency = latency if self.rolls == 1 else self.latency + a * (latency - self.latency)
+
+    def to_list(self) -> list:
+        return [self.rolls, self.hit_rate, self.value, self.rt_value, self.kakera, self.latency]
+
+
+def roll_value(decision: Decision, kakera: int, owned: bool = False) -> tuple[float, float]:
+    """(claim value, value worth a $rt) of one roll under the claim policy."""
+    if owned or not decision.claim:
+        return 0.0, 0.0
+    if decision.use_rt:
+        value = float(max(kakera, WANTED_VALUE))
+        return value, value
+    return float(kakera), 0.0
+
+
+class RollPlanner:
+    def __init__(self, commands: list[str]):
+        self.commands = list(commands)
+        self.overall = RollStats()
+        self._channels: dict[int, RollStats] = {}
+        self._commands: dict[int, dict[str, RollStats]] = {}
+        self._pending: dict[int, deque] = {}  # channel_id -> (command, sent_at) of rolls awaiting their embed
+        self._last_roller: dict[int, int] = {}  # channel_id -> author of the latest roll command seen
+        self.self_id: int | None = None
+
+    # ---- recording ----
+    def sent(self, channel_id: int, command: str, now: float | None = None) -> None:
+        now = time.monotonic() if now is None else now
+        self._pending.setdefault(channel_id, deque()).append((command, now))
+
+    def command_seen(self, channel_id: int, author_id: int, content: str) -> None:
+        """A message in a roll channel: remember who typed the latest roll command."""
+        if _ROLL_COMMAND.match(content):
+            self._last_roller[channel_id] = author_id
+
+    def observe(self, channel_id: int, kakera: int, decision: Decision, owned: bool = False,
+                now: float | None = None, requester: int | None = None) -> str | None:
+        """
+        Attribute a roll embed to our oldest pending roll in the channel; returns its command (None if not ours).
+        The roll is ours if its slash-command `requester` is us or, for text commands, if we typed the
+        latest roll command in the channel (Mudae answers them in order). Other users' rolls are skipped.
+        """
+        now = time.monotonic() if now is None else now
+        pending = self._pending.get(channel_id)
+        while pending and now - pending[0][1] > PENDING_TTL:
+            pending.popleft()
+        if not pending:
+            return None
+        roller = requester if requester is not None else self._last_roller.get(channel_id)
+        if roller is None or roller != self.self_id:
+            return None
+        command, sent_at = pending.popleft()
+        value, rt_value = roll_value(decision, kakera, owned)
+        latency = now - sent_at
+        for stats in (self.overall, self._channel(channel_id), self._command(channel_id, command)):
+            stats.add(decision.claim and not owned, value, rt_value, kakera, latency)
+        return command
+
+    def _channel(self, channel_id: int) -> RollStats:
+        stats = self._channels.get(channel_id)
+        if stats is None:
+            stats = self._channels[channel_id] = RollStats()
+        return stats
+
+    def _command(self, channel_id: int, command: str) -> RollStats:
+        per_channel = self._commands.setdefault(channel_id, {})
+        stats = per_channel.get(command)
+        if stats is None:
+            stats = per_channel[command] = RollStats()
+        return stats
+
+    # ---- decisions ----
+    def _estimate(self, channel_id: int, command: str, rt_only: bool) -> tuple[float, int]:
+        """(expected value per roll, samples) for `command` in the channel, shrunk towards the channel mean."""
+        channel = self._channels.get(channel_id) or self.overall
+        prior = channel.rt_value if rt_only else channel.value
+        stats = self._commands.get(channel_id, {}).get(command)
+        if stats is None:
+            return prior, 0
+        n = min(stats.rolls, WINDOW)
+        mean = stats.rt_value if rt_only else stats.value
+        return (n * mean + PRIOR_ROLLS * prior) / (n + PRIOR_ROLLS), stats.rolls
+
+    def choose_command(self, channel_id: int, rt_only: bool = False) -> str:
+        """Command with the best expected value per roll plus an exploration bonus."""
+        if len(self.commands) == 1:
+            return self.commands[0]
+        estimates = [(cmd, *self._estimate(channel_id, cmd, rt_only)) for cmd in self.commands]
+        total = sum(n for _, _, n in estimates)
+        if total == 0:
+            return self.commands[0]
+        scale = max(1.0, max(ev for _, ev, _ in estimates))
+        log_total = math.log(total + 1)
+
+        def score(item):
+            _, ev, n = item
+            return ev + EXPLORE * scale * math.sqrt(log_total / (n + 1))
+        return max(estimates, key=score)[0]
+
+    def channel_value(self, channel_id: int, state, now: float | None = None) -> float:
+        """Expected claim value per roll of servicing the channel now (0 if nothing to spend rolls on)."""
+        now = time.monotonic() if now is None else now
+        if state is not None and not state.stale:
+            if state.claim_ready(now):
+                rt_only = False
+            elif state.rt_ready(now):
+                rt_only = True
+            else:
+                return 0.0
+        else:
+            rt_only = False  # unknown: assume a claim is available
+        return max(self._estimate(channel_id, cmd, rt_only)[0] for cmd in self.commands)
+
+    # ---- reporting / persistence ----
+    def summary(self, names: dict[int, str] | None = None) -> list[str]:
+        """Rows for `$planner`: per channel and command, rolls, hit rate, value/roll, mean kakera, latency."""
+        names = names or {}
+        rows = [f"{'channel':<16} {'cmd':<5} {'rolls':>6} {'hit%':>6} {'ev':>7} {'kak':>6} {'lat ms':>7}"]
+        for channel_id, per_command in sorted(self._commands.items()):
+            label = names.get(channel_id, str(channel_id))[:16]
+            for command, s in sorted(per_command.items()):
+                rows.append(
+                    f"{label:<16} {command:<5} {s.rolls:>6} {s.hit_rate * 100:>6.1f} {s.value:>7.1f} "
+                    f"{s.kakera:>6.0f} {s.latency * 1000:>7.0f}"
+                )
+        return rows
+
+    def to_dict(self) -> dict:
+        return {
+            "overall": self.overall.to_list(),
+            "channels": {str(cid): s.to_list() for cid, s in self._channels.items()},
+            "commands": {
+                str(cid): {cmd: s.to_list() for cmd, s in per.items()} for cid, per in self._commands.items()
+            },
+        }
+
+    def load_dict(self, data: dict) -> None:
+        self.overall = RollStats(*data.get("overall", []))
+        self._channels = {int(cid): RollStats(*s) for cid, s in data.get("channels", {}).items()}
+        self._commands = {
+            int(cid): {cmd: RollStats(*s) for cmd, s in per.items()}
+            for cid, per in data.get("commands", {}).items()
+        }
@@ -0,0 +1,213 @@
+"""
+Declarative claim policy.
+
+The rules live in a TOML file (CLAIM_POLICY, default `claim_policy.toml`):
+
+    [default]
+    min_kakera = 200        # claim any roll worth at least this much
+    watchlist_tier = 1      # tier of watchlist characters
+    kakera_tier = 3         # tier of kakera-threshold claims
+    rt_max_tier = 1         # only spend $rt on claims at this tier or better
+
+    [channels.1163895503143043135]
+    min_kakera = 500        # per-channel threshold
+
+    [[series]]
+    name = "Re:Zero"
+    tier = 2                # claim every roll of the series at this tier
+    # min_kakera = 100      # ...or only once it is worth this much
+    # never = true          # never claim it for kakera (watchlist still wins)
+
+    [[characters]]
+    name = "Rem"
+    tier = 1                # tier for one character, watchlisted or not
+
+Every key is optional; a missing file gives the old behaviour (watchlist or
+MIN_KAKERA). The file is compiled once into lookup dicts keyed by normalized
+name plus a per-channel threshold table, so deciding a roll is a couple of
+dict lookups. `$reloadpolicy` recompiles it; a file that fails validation
+leaves the running policy in place.
+"""
+import os
+import tomllib
+from dataclasses import dataclass
+
+from watchlist import WatchMatch, normalize_name
+
+# reason codes
+CHARACTER = "character"  # [[characters]] rule
+WATCHLIST = "watchlist"
+SERIES = "series"  # [[series]] tier
+SERIES_KAKERA = "series_kakera"  # [[series]] min_kakera reached
+KAKERA = "kakera"  # channel/default threshold reached
+BLOCKED = "series_blocked"  # [[series]] never
+BELOW = "below_threshold"
+
+_DEFAULT_KEYS = {"min_kakera", "watchlist_tier", "kakera_tier", "rt_max_tier"}
+_CHANNEL_KEYS = {"min_kakera"}
+_SERIES_KEYS = {"name", "tier", "min_kakera", "never"}
+_CHARACTER_KEYS = {"name", "tier"}
+
+
+class PolicyError(ValueError):
+    """The policy file is malformed; the message names the offending entry."""
+
+
+@dataclass(slots=True, frozen=True)
+class Decision:
+    claim: bool
+    tier: int | None
+    reason: str
+    use_rt: bool = False  # worth spending $rt on when the claim is on cooldown
+    detail: str = ""
+
+    def describe(self) -> str:
+        """'watchlist (alias → Rem), tier 1' for logs and the claim log."""
+        text = f"{self.reason} ({self.detail})" if self.detail else self.reason
+        return text if self.tier is None else f"{text}, tier {self.tier}"
+
+
+_BELOW = Decision(False, None, BELOW)
+_BLOCKED = Decision(False, None, BLOCKED)
+
+
+@dataclass(slots=True, frozen=True)
+class _SeriesRule:
+    tier: int | None
+    min_kakera: int | None
+    never: bool
+
+
+class ClaimPolicy:
+    """A compiled policy; `decide` is the whole per-roll cost."""
+
+    __slots__ = ("min_kakera", "watchlist_tier", "kakera_tier", "rt_max_tier", "channel_min", "series", "characters", "source")
+
+    def __init__(self, min_kakera: int, watchlist_tier: int, kakera_tier: int, rt_max_tier: int,
+                 channel_min: dict[int, int], series: dict[str, _SeriesRule], characters: dict[str, int], source: str = ""):
+        self.min_kakera = min_kakera
+        self.watchlist_tier = watchlist_tier
+        self.kakera_tier = kakera_tier
+        self.rt_max_tier = rt_max_tier
+        self.channel_min = channel_min
+        self.series = series
+        self.characters = characters
+        self.source = source
+
+    def decide(self, channel_id: int, character: str, series: str, kakera: int, watch_hit: WatchMatch | None) -> Decision:
+        if self.characters:
+            tier = self.characters.get(normalize_name(character))
+            if tier is not None:
+                return self._claim(tier, CHARACTER)
+        if watch_hit is not None:
+            return self._claim(self.watchlist_tier, WATCHLIST, watch_hit.describe())
+        rule = self.series.get(normalize_name(series)) if self.series and series else None
+        if rule is not None:
+            if rule.never:
+                return _BLOCKED
+            if rule.tier is not None:
+                return self._claim(rule.tier, SERIES)
+            if rule.min_kakera is not None and kakera >= rule.min_kakera:
+                return self._claim(self.kakera_tier, SERIES_KAKERA, f"{kakera} ≥ {rule.min_kakera}")
+        threshold = self.channel_min.get(channel_id, self.min_kakera)
+        if kakera >= threshold:
+            return self._claim(self.kakera_tier, KAKERA, f"{kakera} ≥ {threshold}")
+        return _BELOW
+
+    def _claim(self, tier: int, reason: str, detail: str = "") -> Decision:
+        return Decision(True, tier, reason, tier <= self.rt_max_tier, detail)
+
+    def summary(self) -> str:
+        return (
+            f"min kakera {self.min_kakera} ({len(self.channel_min)} channel overrides), "
+            f"{len(self.series)} series rules, {len(self.characters)} character rules, "
+            f"$rt for tier ≤ {self.rt_max_tier}"
+        )
+
+
+def _int(table: dict, key: str, where: str, default: int | None = None) -> int | None:
+    value = table.get(key, default)
+    if value is not None and (isinstance(value, bool) or not isinstance(value, int)):
+        raise PolicyError(f"{where}: `{key}` must be an integer, got {value!r}")
+    return value
+
+
+def _check_keys(table, allowed: set[str], where: str) -> None:
+    if not isinstance(table, dict):
+        raise PolicyError(f"{where}: expected a table")
+    unknown = set(table) - allowed
+    if unknown:
+        raise PolicyError(f"{where}: unknown keys {', '.join(sorted(unknown))}")
+
+
+def compile_policy(data: dict, min_kakera: int = 0, source: str = "") -> ClaimPolicy:
+    """Validate parsed TOML and build the lookup tables. `min_kakera` is the default threshold."""
+    _check_keys(data, {"default", "channels", "series", "characters"}, "policy")
+    default = data.get("default", {})
+    _check_keys(default, _DEFAULT_KEYS, "[default]")
+
+    channel_min = {}
+    channels = data.get("channels", {})
+    _check_keys(channels, set(channels), "[channels]")
+    for key, table in channels.items():
+        where = f"[channels.{key}]"
+        if not key.isdigit():
+            raise PolicyError(f"{where}: channel keys must be channel ids")
+        _check_keys(table, _CHANNEL_KEYS, where)
+        if "min_kakera" in table:
+            channel_min[int(key)] = _int(table, "min_kakera", where)
+
+    series = {}
+    for i, table in enumerate(data.get("series", [])):
+        where = f"[[series]] #{i + 1}"
+        _check_keys(table, _SERIES_KEYS, where)
+        name = table.get("name")
+        if not isinstance(name, str) or not name.strip():
+            raise PolicyError(f"{where}: `name` is required")
+        never = table.get("never", False)
+        if not isinstance(never, bool):
+            raise PolicyError(f"{where}: `never` must be true or false")
+        rule = _SeriesRule(_int(table, "tier", where), _int(table, "min_kakera", where), never)
+        if not (rule.never or rule.tier is not None or rule.min_kakera is not None):
+            raise PolicyError(f"{where}: needs `tier`, `min_kakera` or `never`")
+        series[normalize_name(name)] = rule
+
+    characters = {}
+    for i, table in enumerate(data.get("characters", [])):
+        where = f"[[characters]] #{i + 1}"
+        _check_keys(table, _CHARACTER_KEYS, where)
+        name = table.get("name")
+        if not isinstance(name, str) or not name.strip():
+            raise PolicyError(f"{where}: `name` is required")
+        tier = _int(table, "tier", where)
+        if tier is None:
+            raise PolicyError(f"{where}: `tier` is required")
+        characters[normalize_name(name)] = tier
+
+    return ClaimPolicy(
+        min_kakera=_int(default, "min_kakera", "[default]", min_kakera),
+        watchlist_tier=_int(default, "watchlist_tier", "[default]", 1),
+        kakera_tier=_int(default, "kakera_tier", "[default]", 3),
+        rt_max_tier=_int(default, "rt_max_tier", "[default]", 1),
+        channel_min=channel_min,
+        series=series,
+        characters=characters,
+        source=source,
+    )
+
+
+def load_policy(path: str, min_kakera: int = 0) -> ClaimPolicy:
+    """Compile the policy at `path`; a missing file gives the defaults."""
+    if not os.path.exists(path):
+        return compile_policy({}, min_kakera)
+    try:
+        with open(path, "rb") as f:
+            data = tomllib.load(f)
+    except tomllib.TOMLDecodeError as exc:
+        raise PolicyError(f"{path}: {exc}") from None
+    return compile_policy(data, min_kakera, source=path)
+
+
+def roll_series(description: str) -> str:
+    """Series line of a roll embed (the text above the kakera value)."""
+    return description.partition("\n")[0].strip()
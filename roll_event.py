@@ -0,0 +1,108 @@
+"""
+Roll embed extraction.
+
+A Mudae roll arrives as one embed (character name in the author line, series
+and kakera value in the description, "Belongs to X" in the footer when it is
+already married) plus a row of buttons: a heart to claim it and, on owned
+characters, a kakera crystal. `extract` reads all of that in one pass into a
+RollEvent that the claim, planner, history and kakera paths share.
+
+Buttons are classified through lookup tables: claim hearts by their unicode
+emoji, kakera crystals by Mudae's emoji id (falling back to the emoji name
+for ids we don't know yet). Messages without an embed, buttons or a
+character name are rejected before any text is looked at.
+"""
+import re
+from dataclasses import dataclass
+
+from policy import roll_series
+from router import footer_owner
+
+# unicode hearts Mudae puts on claimable rolls
+CLAIM_EMOJIS = frozenset(['❤️', '💕', '💘', '💖', '💓', '💗'])
+
+# Mudae's kakera crystal emoji ids -> kakera type (the KAKERA_LIST names)
+KAKERA_EMOJIS = {
+    469835869059153940: "kakera",
+    609264156347990016: "kakerap",
+    609264180851376132: "kakerat",
+    609264166381027329: "kakerag",
+    605112931168026629: "kakeray",
+    605112954391887888: "kakerao",
+    605112980295647242: "kakerar",
+    608192076286263297: "kakeraw",
+    815961697918779422: "kakeral",
+}
+
+_KAKERA_VALUE = re.compile(r"\*\*([\d,]+)\*\*\s*<:kakera:")
+_WISHED_BY = "Wished by"
+
+
+@dataclass(slots=True)
+class RollEvent:
+    name: str
+    series: str
+    kakera: int
+    owner: str | None  # who the character belongs to, None if unclaimed
+    wished: bool  # someone's wish pinged on the roll
+    wished_by_me: bool
+    claim_button: object | None  # first claim heart, if any
+    kakera_buttons: tuple  # (button, kakera type) per kakera crystal
+    requester: int | None = None  # user id behind a slash-command roll, None for text commands
+
+    @property
+    def owned(self) -> bool:
+        return self.owner is not None
+
+
+def kakera_type(emoji) -> str | None:
+    """Kakera type of a button emoji ("kakerap", ...), None if it isn't a kakera crystal."""
+    kind = KAKERA_EMOJIS.get(emoji.id)
+    if kind is None and emoji.id is not None and emoji.name and emoji.name.lower().startswith("kakera"):
+        kind = emoji.name.lower()
+    return kind
+
+
+def extract(message, self_id: int | None = None) -> RollEvent | None:
+    """RollEvent for a Mudae roll message, None for anything else."""
+    embeds = message.embeds
+    components = message.components
+    if not embeds or not components:
+        return None
+    embed = embeds[0]
+    author = embed.author
+    name = author.name if author else None
+    if not name:
+        return None
+
+    claim_button = None
+    kakera_buttons = []
+    for row in components:
+        for button in getattr(row, "children", ()):
+            emoji = button.emoji
+            if emoji is None:
+                continue
+            if emoji.id is None:
+                if claim_button is None and emoji.name in CLAIM_EMOJIS:
+                    claim_button = button
+                continue
+            kind = kakera_type(emoji)
+            if kind is not None:
+                kakera_buttons.append((button, kind))
+
+    description = embed.description or ""
+    match = _KAKERA_VALUE.search(description)
+    content = message.content or ""
+    wished = _WISHED_BY in content
+    interaction_user = getattr(getattr(message, "interaction", None), "user", None)
+    return RollEvent(
+        name=name,
+        series=roll_series(description),
+        kakera=int(match.group(1).replace(",", "")) if match else 0,
+        owner=footer_owner(embed.footer.text if embed.footer else None),
+        wished=wished,
+        wished_by_me=wished and self_id is not None and f"<@{self_id}>" in content,
+        claim_button=claim_button,
+        kakera_buttons=tuple(kakera_buttons),
+        requester=interaction_user.id if interaction_user is not None else None,
+    )
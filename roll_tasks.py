@@ -0,0 +1,134 @@
+"""
+Registry of in-flight roll handlers.
+
+Every actionable roll embed gets one task, keyed by its message id, so
+`on_message` can return as soon as the roll is recorded. The registry
+
+- drops duplicates: a message id is handled once, even if the gateway
+  delivers it again while (or shortly after) its handler runs;
+- bounds concurrency: at most `limit` handlers at once, extra rolls are
+  skipped and counted (`roll.task_dropped`);
+- cancels stale work: `cancel_channel` stops a channel's claim or kakera
+  handlers that are still waiting (their lock wait or human-like delay)
+  once the channel's timers say they can't act any more. A handler calls
+  `commit` before it changes channel state or clicks, after which it is
+  only cancelled at shutdown;
+- shuts down cleanly: waiting handlers are cancelled, committed ones get a
+  grace period to finish their click and confirmation.
+"""
+import asyncio
+from collections import OrderedDict
+from typing import Coroutine
+
+from logs import get_logger
+
+log = get_logger("roll")
+
+# what a handler may still do
+CLAIM = "claim"
+KAKERA = "kakera"
+
+REMEMBER = 1024  # finished message ids kept for duplicate detection
+
+
+class _Entry:
+    __slots__ = ("task", "channel_id", "kind", "committed")
+
+    def __init__(self, task: asyncio.Task, channel_id: int, kind: str):
+        self.task = task
+        self.channel_id = channel_id
+        self.kind = kind
+        self.committed = False
+
+
+class RollTasks:
+    def __init__(self, limit: int = 32, metrics=None):
+        self.limit = max(1, limit)
+        self.metrics = metrics
+        self._active: dict[int, _Entry] = {}
+        self._seen: OrderedDict[int, None] = OrderedDict()
+        self._closing = False
+
+    def __len__(self) -> int:
+        return len(self._active)
+
+    def _count(self, name: str) -> None:
+        if self.metrics is not None:
+            self.metrics.incr(name)
+
+    def admit(self, message_id: int) -> bool:
+        """True the first time a message id is seen; False for duplicates and while shutting down."""
+        if self._closing or message_id in self._active or message_id in self._seen:
+            self._count("roll.task_duplicate")
+            return False
+        self._seen[message_id] = None
+        if len(self._seen) > REMEMBER:
+            self._seen.popitem(last=False)
+        return True
+
+    def start(self, message_id: int, channel_id: int, kind: str, coro: Coroutine) -> asyncio.Task | None:
+        """Run `coro` as the handler of a roll; None (and `coro` closed) if the registry is full or closing."""
+        if self._closing:
+            coro.close()
+            return None
+        if len(self._active) >= self.limit:
+            coro.close()
+            self._count("roll.task_dropped")
+            log.warning("⚠ Too many roll handlers in flight (%s); skipping message %s", len(self._active), message_id,
+                        channel_id=channel_id, limit=self.limit)
+            return None
+        task = asyncio.get_running_loop().create_task(coro, name=f"roll:{channel_id}:{message_id}")
+        self._active[message_id] = _Entry(task, channel_id, kind)
+        task.add_done_callback(lambda t, mid=message_id: self._done(mid, t))
+        return task
+
+    def _done(self, message_id: int, task: asyncio.Task) -> None:
+        entry = self._active.get(message_id)
+        if entry is not None and entry.task is task:
+            del self._active[message_id]
+        if task.cancelled():
+            return
+        exc = task.exception()
+        if exc is not None:
+            log.error("❗ Roll handler for message %s failed: %s", message_id, exc, message_id=message_id)
+
+    def commit(self, message_id: int) -> None:
+        """The handler is about to change channel state or click: stale-cancellation no longer applies."""
+        entry = self._active.get(message_id)
+        if entry is not None:
+            entry.committed = True
+
+    def switch(self, message_id: int, kind: str) -> None:
+        """The handler moved on (e.g. from its claim to the kakera buttons) and can be cancelled again."""
+        entry = self._active.get(message_id)
+        if entry is not None:
+            entry.kind = kind
+            entry.committed = False
+
+    def cancel_channel(self, channel_id: int, kind: str, keep: int | None = None) -> int:
+        """Cancel the channel's uncommitted `kind` handlers (except `keep`); returns how many."""
+        cancelled = 0
+        for message_id, entry in self._active.items():
+            if (entry.channel_id == channel_id and entry.kind == kind and not entry.committed
+                    and message_id != keep and not entry.task.done()):
+                entry.task.cancel()
+                cancelled += 1
+        if cancelled:
+            self._count("roll.task_cancelled")
+            log.info("🧹 Cancelled %s stale %s handler(s)", cancelled, kind, channel_id=channel_id, kind=kind)
+        return cancelled
+
+    async def shutdown(self, grace: float = 5.0) -> None:
+        """Stop accepting rolls, cancel waiting handlers and give committed ones `grace` seconds."""
+        self._closing = True
+        entries = list(self._active.values())
+        for entry in entries:
+            if not entry.committed:
+                entry.task.cancel()
+        tasks = [entry.task for entry in entries]
+        if not tasks:
+            return
+        _, pending = await asyncio.wait(tasks, timeout=grace)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,237 @@
+"""
+Mudae reply router.
+
+Instead of one `wait_for("message", check=...)` closure per pending request
+(which discord.py evaluates against every message in every guild), waiters
+register a future under (channel_id, reply_kind). Each Mudae message is
+classified once and handed to the oldest matching waiter in O(1); messages
+nobody waits for are dropped after a single dict lookup.
+
+Claim clicks are confirmed the same way, keyed by the roll's message id: the
+embed edit that sets "Belongs to ...", Mudae's "are now married" message or a
+"can't claim" refusal resolves the pending claim without a REST round trip.
+"""
+import asyncio
+import re
+from collections import deque
+from dataclasses import dataclass
+
+# reply kinds a caller can wait for
+TU = "tu"
+RT = "rt"
+KAKERA = "kakera"
+CLAIM = "claim"  # keyed by roll message id instead of channel
+
+# lines only a `$tu` summary has; a bare "can't claim for another" is a claim refusal
+_TU_MARKERS = ("next rolls reset", "rolls left", "next claim reset")
+_MARRIED_MARKER = "are now married"
+_KAKERA_MARKER = "<:kakera"
+_KAKERA_REFUSED_MARKER = "react to kakera"
+_REFUSED_MARKER = "can't claim for another"
+_BELONGS_TO = "Belongs to "
+_MARRIED_RE = re.compile(r"\*\*(.+?)\*\* and \*\*(.+?)\*\* are now married")
+# Mudae opens a reply to someone with their name in bold: "**kudo**, you __can__ claim ..."
+_ADDRESSEE_RE = re.compile(r"\s*\*\*(.+?)\*\*")
+_KAKERA_EARNED_RE = re.compile(r"\+\s*([\d,]+)\s*<:kakera")
+
+# how a claim outcome was learned
+EDIT = "edit"
+MARRIED = "married"
+REFUSED = "refused"
+REST = "rest"
+
+
+@dataclass(slots=True, frozen=True)
+class ClaimOutcome:
+    owner: str | None  # who got the character; None if Mudae refused our claim
+    source: str  # EDIT, MARRIED, REFUSED or REST
+
+
+def footer_owner(footer_text: str | None) -> str | None:
+    """Owner named in a roll embed footer ("Belongs to X" or "Belongs to X ~~ 2/10")."""
+    if not footer_text or _BELONGS_TO not in footer_text:
+        return None
+    owner = footer_text.split(_BELONGS_TO, 1)[1]
+    return owner.split("~~", 1)[0].strip() or None
+
+
+def addressee(content: str) -> str | None:
+    """The bolded name a reply opens with, None if it doesn't open with one."""
+    match = _ADDRESSEE_RE.match(content)
+    return match.group(1) if match else None
+
+
+def kakera_earned(content: str) -> int | None:
+    """Kakera gained in a reaction result ("**me** +175<:kakera:...>"), None if the reaction was refused."""
+    match = _KAKERA_EARNED_RE.search(content)
+    return int(match.group(1).replace(",", "")) if match else None
+
+
+def classify(content: str, self_names: frozenset[str]) -> str | None:
+    """
+    Reply kind of a plain-text Mudae message; `self_names` are our names, casefolded:
+    - TU: a `$tu` timer summary addressed to us
+    - KAKERA: a kakera reaction result addressed to us ("+N" or "can't react")
+    - CLAIM: a marriage announcement, or a claim refusal addressed to us
+    - None: refusals and `$tu` replies addressed to someone else
+    - RT: any other text reply (what `$rt` answers with)
+    """
+    lc = content.lower()
+    name = addressee(content)
+    ours = name is not None and name.casefold() in self_names
+    if any(marker in lc for marker in _TU_MARKERS):
+        return TU if ours else None
+    if _MARRIED_MARKER in lc:
+        return CLAIM
+    if _REFUSED_MARKER in lc:
+        return CLAIM if ours else None
+    if (_KAKERA_MARKER in lc or _KAKERA_REFUSED_MARKER in lc) and ours:
+        return KAKERA
+    return RT
+
+
+class PendingReply:
+    """
+    Handle for one expected reply. Use it as a context manager so the waiter
+    is unregistered however the request ends:
+
+        with router.expect(channel.id, TU) as reply:
+            await channel.send("$tu")
+            msg = await reply.wait(15)
+    """
+
+    __slots__ = ("_router", "key", "future", "_closed")
+
+    def __init__(self, router: "ReplyRouter", key: tuple[int, str], future: asyncio.Future):
+        self._router = router
+        self.key = key
+        self.future = future
+        self._closed = False
+
+    async def wait(self, timeout: float):
+        """Return the matching message or raise asyncio.TimeoutError."""
+        return await asyncio.wait_for(asyncio.shield(self.future), timeout=timeout)
+
+    def close(self) -> None:
+        if not self._closed:
+            self._closed = True
+            self.future.cancel()
+            self._router._discard(self)
+
+    def __enter__(self) -> "PendingReply":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class ReplyRouter:
+    def __init__(self, author_id: int):
+        self.author_id = author_id
+        # names Mudae may address us by (casefolded), to pick out replies meant for us
+        self.self_names: frozenset[str] = frozenset()
+        self._waiters: dict[tuple[int, str], deque[asyncio.Future]] = {}
+        # roll message_id -> (channel_id, character, future) for clicked claims
+        self._claims: dict[int, tuple[int, str, asyncio.Future]] = {}
+        # channel_id -> number of pending waiters, for the cheap early drop
+        self._channels: dict[int, int] = {}
+
+    def set_names(self, *names: str | None) -> None:
+        """USERNAME, account name, display name, ...: any name Mudae may address us by; blanks are skipped."""
+        self.self_names = frozenset(name.casefold() for name in names if name)
+
+    def is_me(self, name: str) -> bool:
+        return name.casefold() in self.self_names
+
+    def expect(self, channel_id: int, kind: str) -> PendingReply:
+        """
+        Register interest in the next `kind` reply in `channel_id`.
+        Call this *before* sending the command so a fast reply can't slip past.
+        """
+        future = asyncio.get_running_loop().create_future()
+        key = (channel_id, kind)
+        self._waiters.setdefault(key, deque()).append(future)
+        self._channels[channel_id] = self._channels.get(channel_id, 0) + 1
+        return PendingReply(self, key, future)
+
+    def expect_claim(self, channel_id: int, message_id: int, character: str) -> PendingReply:
+        """
+        Register a claim click on roll `message_id`; the future gets a ClaimOutcome.
+        Call this *before* clicking so the embed edit can't slip past.
+        """
+        future = asyncio.get_running_loop().create_future()
+        previous = self._claims.get(message_id)
+        if previous is not None:
+            self._release_channel(previous[0])  # its handle no longer owns the entry
+        self._claims[message_id] = (channel_id, character, future)
+        self._channels[channel_id] = self._channels.get(channel_id, 0) + 1
+        return PendingReply(self, (message_id, CLAIM), future)
+
+    def feed(self, message) -> bool:
+        """Route a gateway message; True if it resolved a waiter."""
+        if message.author.id != self.author_id:
+            return False
+        channel_id = message.channel.id
+        if channel_id not in self._channels or message.embeds:
+            return False
+        content = message.content or ""
+        kind = classify(content, self.self_names)
+        if kind == CLAIM:
+            married = _MARRIED_RE.search(content)
+            if married is None:
+                return self._resolve_claim(channel_id, None, ClaimOutcome(None, REFUSED))
+            return self._resolve_claim(channel_id, married.group(2), ClaimOutcome(married.group(1), MARRIED))
+        waiters = self._waiters.get((channel_id, kind))
+        while waiters:
+            future = waiters.popleft()
+            if not future.done():
+                future.set_result(message)
+                return True
+        return False
+
+    def feed_edit(self, message_id: int, author_id: int, footer_text: str | None) -> bool:
+        """Route a roll embed edit (cached or raw); True if it resolved a pending claim."""
+        entry = self._claims.get(message_id)
+        if entry is None or author_id != self.author_id:
+            return False
+        owner = footer_owner(footer_text)
+        if owner is None or entry[2].done():
+            return False
+        entry[2].set_result(ClaimOutcome(owner, EDIT))
+        return True
+
+    def _resolve_claim(self, channel_id: int, character: str | None, outcome: ClaimOutcome) -> bool:
+        """Resolve the pending claim in `channel_id` on `character` (the oldest one if None)."""
+        wanted = character.casefold() if character is not None else None
+        for cid, name, future in self._claims.values():
+            if cid == channel_id and not future.done() and (wanted is None or name.casefold() == wanted):
+                future.set_result(outcome)
+                return True
+        return False
+
+    def pending(self) -> int:
+        return sum(self._channels.values())
+
+    def _discard(self, pending: PendingReply) -> None:
+        if pending.key[1] == CLAIM:
+            entry = self._claims.get(pending.key[0])
+            if entry is not None and entry[2] is pending.future:
+                del self._claims[pending.key[0]]
+                self._release_channel(entry[0])
+            return
+        waiters = self._waiters.get(pending.key)
+        if waiters is not None:
+            try:
+                waiters.remove(pending.future)
+            except ValueError:
+                pass  # already popped by feed()
+            if not waiters:
+                del self._waiters[pending.key]
+        self._release_channel(pending.key[0])
+
+    def _release_channel(self, channel_id: int) -> None:
+        count = self._channels.get(channel_id, 0) - 1
+        if count > 0:
+            self._channels[channel_id] = count
+        else:
+            self._channels.pop(channel_id, None)
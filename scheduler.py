@@ -0,0 +1,178 @@
+"""
+Heap-based per-channel event scheduler.
+
+Each channel has at most one armed entry (ready_at, channel_id, kind) in a
+priority queue. A dispatcher pops due entries and runs the channel's handler
+in a bounded pool of workers; a channel never has two workers at once, but
+different channels no longer wait for each other. Re-arming a channel (e.g.
+after a claim or a `$tu`) keeps the earlier of the old and new times and
+wakes the dispatcher if the head of the queue moved. A worker re-arming its
+own channel is ignored, since its result re-arms the channel when it ends;
+otherwise the entry would be deferred and run a second session right after.
+
+With a `rank` function, a free worker goes to the best-ranked of all entries
+that are due rather than simply the earliest one.
+"""
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Awaitable, Callable
+
+from logs import get_logger
+
+log = get_logger("scheduler")
+
+# handler(channel_id, kind) -> (next ready_at, next kind) or None to disarm
+Handler = Callable[[int, str], Awaitable[tuple[float, str] | None]]
+# rank(channel_id, kind) -> higher runs first among due entries
+Rank = Callable[[int, str], float]
+
+# shortest dispatcher sleep: an entry a few ns away must still let the clock move on
+MIN_WAIT = 0.001
+
+
+class Scheduler:
+    def __init__(self, max_workers: int = 3, retry_delay: float = 30.0, rank: Rank | None = None):
+        self.max_workers = max(1, max_workers)
+        self.retry_delay = retry_delay
+        self.rank = rank
+        self._heap: list[tuple[float, int, int, str]] = []
+        self._seq = itertools.count()
+        # channel_id -> seq of its live heap entry (older entries are skipped lazily)
+        self._armed: dict[int, tuple[float, int]] = {}
+        self._running: dict[int, asyncio.Task] = {}
+        # entries that came due while their channel was busy: run right after
+        self._deferred: dict[int, str] = {}
+        self._wakeup = asyncio.Event()
+        self._slots = asyncio.Semaphore(self.max_workers)
+        self._stopped = False
+
+    # ---- arming ----
+    def arm(self, channel_id: int, ready_at: float, kind: str) -> None:
+        """
+        Schedule `kind` for `channel_id` at `ready_at` unless something earlier is armed.
+        Ignored when it comes from the channel's own worker: the handler's result re-arms it.
+        """
+        running = self._running.get(channel_id)
+        if running is not None and running is asyncio.current_task():
+            return
+        current = self._armed.get(channel_id)
+        if current is not None and current[0] <= ready_at:
+            return
+        seq = next(self._seq)
+        self._armed[channel_id] = (ready_at, seq)
+        heapq.heappush(self._heap, (ready_at, seq, channel_id, kind))
+        self._wakeup.set()
+
+    def arm_now(self, channel_id: int, kind: str) -> None:
+        self.arm(channel_id, time.monotonic(), kind)
+
+    def disarm(self, channel_id: int) -> None:
+        self._armed.pop(channel_id, None)
+
+    def next_ready(self) -> tuple[float, int, str] | None:
+        """(ready_at, channel_id, kind) of the earliest live entry, if any."""
+        self._drop_stale()
+        if not self._heap:
+            return None
+        ready_at, _, channel_id, kind = self._heap[0]
+        return ready_at, channel_id, kind
+
+    def busy(self, channel_id: int) -> bool:
+        return channel_id in self._running
+
+    def _drop_stale(self) -> None:
+        heap = self._heap
+        while heap:
+            ready_at, seq, channel_id, _ = heap[0]
+            if self._armed.get(channel_id, (None, None))[1] == seq:
+                return
+            heapq.heappop(heap)
+
+    def _pop_due(self, now: float) -> tuple[float, int, int, str] | None:
+        """Pop the entry to run next: the earliest due one, or the best-ranked of all due ones."""
+        self._drop_stale()
+        heap = self._heap
+        if not heap or heap[0][0] > now:
+            return None
+        first = heapq.heappop(heap)
+        if self.rank is None or not heap or heap[0][0] > now:
+            return first
+        due = [first]
+        while heap and heap[0][0] <= now:
+            entry = heapq.heappop(heap)
+            if self._armed.get(entry[2], (None, None))[1] == entry[1]:
+                due.append(entry)
+        best = max(due, key=lambda e: self.rank(e[2], e[3]))
+        for entry in due:
+            if entry is not best:
+                heapq.heappush(heap, entry)
+        return best
+
+    # ---- dispatch ----
+    async def run(self, handler: Handler, should_stop: Callable[[], bool] = lambda: False) -> None:
+        """Dispatch due entries to `handler` until stop() or `should_stop()`."""
+        self._stopped = False
+        try:
+            while not self._stopped and not should_stop():
+                head = self.next_ready()
+                now = time.monotonic()
+                if head is None or head[0] > now:
+                    self._wakeup.clear()
+                    timeout = None if head is None else max(head[0] - now, MIN_WAIT)
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+
+                # wait for a free worker first, so the pick sees everything due by then
+                await self._slots.acquire()
+                entry = self._pop_due(time.monotonic())
+                if entry is None:
+                    self._slots.release()
+                    continue
+                ready_at, _, channel_id, kind = entry
+                self._armed.pop(channel_id, None)
+                if channel_id in self._running:
+                    # one worker per channel: run again as soon as it finishes
+                    self._deferred[channel_id] = kind
+                    self._slots.release()
+                    continue
+
+                self._running[channel_id] = asyncio.create_task(
+                    self._work(handler, channel_id, kind), name=f"scheduler:{channel_id}:{kind}"
+                )
+        finally:
+            await self.stop()
+
+    async def _work(self, handler: Handler, channel_id: int, kind: str) -> None:
+        result = None
+        try:
+            result = await handler(channel_id, kind)
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            log.error("❗ Scheduler worker for channel %s (%s) failed: %s", channel_id, kind, exc, channel_id=channel_id, kind=kind)
+            result = (time.monotonic() + self.retry_delay, "refresh")
+        finally:
+            self._running.pop(channel_id, None)
+            self._slots.release()
+            if not self._stopped:
+                deferred = self._deferred.pop(channel_id, None)
+                if deferred is not None:
+                    self.arm_now(channel_id, deferred)
+                if result is not None:
+                    self.arm(channel_id, *result)
+            self._wakeup.set()
+
+    async def stop(self) -> None:
+        """Stop dispatching and cancel in-flight workers."""
+        self._stopped = True
+        self._wakeup.set()
+        workers = list(self._running.values())
+        for task in workers:
+            task.cancel()
+        if workers:
+            await asyncio.gather(*workers, return_exceptions=True)
@@ -0,0 +1,233 @@
+"""
+Shadow decisions: what the bot would do, recorded instead of (or next to) doing it.
+
+- Dry run (SHADOW_MODE=true): `on_message` and `auto_roll` run the whole
+  pipeline (claim policy, `$rt` choice, kakera ranking and power rationing,
+  planner and scheduler) but never roll, claim, spend `$rt`, send `$daily`
+  or click a kakera button. Each of those is recorded as an action instead.
+  `$tu` is still sent: it spends nothing and keeps cooldowns real. Since
+  Mudae never sees the pretended claims and rolls, they are laid over every
+  `$tu` (`overlay`) until the reset that would have given them back; a
+  pretended `$rt` stays spent until the dry run ends, as its cooldown is only
+  known by using it.
+- Candidate policy (SHADOW_POLICY, optionally SHADOW_KAKERA_LIST): every roll
+  is also decided by the candidate, live or dry run, and the rolls where the
+  two disagree (claim or not, `$rt` or not, kakera button) are recorded as
+  differences. Decision time of the candidate goes to `shadow.decide`.
+
+Records go to the `shadow` logger, the latest RECENT of each kind stay in
+memory for `$shadow`. Dry-run rolls are only counted (and logged at debug).
+"""
+import os
+import time
+from collections import Counter, deque
+from dataclasses import dataclass
+
+from logs import get_logger
+from policy import ClaimPolicy, Decision, PolicyError, load_policy
+from roll_event import RollEvent
+from watchlist import WatchMatch
+
+log = get_logger("shadow")
+
+RECENT = 50  # actions and differences kept for $shadow
+
+# dry-run actions
+ROLL = "roll"
+CLAIM = "claim"
+RT_CLAIM = "rt_claim"  # $rt, then claim
+SKIP_RT = "skip_rt"  # claim on cooldown, $rt not spent on this tier
+DAILY = "daily"
+KAKERA_CLICK = "kakera_click"
+
+# difference kinds
+DIFF_CLAIM = "claim"
+DIFF_RT = "rt"
+DIFF_KAKERA = "kakera"
+
+
+@dataclass(slots=True)
+class Action:
+    at: float  # wall time of the decision
+    channel: str
+    action: str
+    detail: str
+    latency: float | None  # roll received -> decided, seconds
+
+
+@dataclass(slots=True)
+class Difference:
+    at: float
+    channel: str
+    character: str
+    kakera: int
+    kind: str
+    live: str
+    candidate: str
+
+
+class _Spent:
+    __slots__ = ("claim", "claim_until", "rolls", "rolls_until", "rt")
+
+    def __init__(self):
+        self.claim = False
+        self.claim_until: float | None = None
+        self.rolls = 0
+        self.rolls_until: float | None = None
+        self.rt = False
+
+
+def load_candidate(path: str, min_kakera: int = 0) -> ClaimPolicy | None:
+    """The SHADOW_POLICY candidate, None if unset. Unlike the live policy, a missing file is an error."""
+    if not path:
+        return None
+    if not os.path.exists(path):
+        raise PolicyError(f"{path}: no such file")
+    return load_policy(path, min_kakera)
+
+
+def _verdict(decision: Decision) -> str:
+    return f"claim: {decision.describe()}" if decision.claim else f"skip: {decision.describe()}"
+
+
+class Shadow:
+    def __init__(self, candidate: ClaimPolicy | None = None, metrics=None):
+        self.candidate = candidate
+        self.metrics = metrics
+        self.actions: deque = deque(maxlen=RECENT)
+        self.differences: deque = deque(maxlen=RECENT)
+        self.action_counts: Counter = Counter()
+        self.diff_counts: Counter = Counter()
+        self.compared = 0
+        # claims each policy made on the compared rolls, and the kakera they were worth
+        self.claims = Counter()
+        self.claimed_kakera = Counter()
+        self._spent: dict[int, _Spent] = {}
+
+    # ---- dry run ----
+    def action(self, action: str, channel: str, detail: str = "", latency: float | None = None, **fields) -> None:
+        """Record something the dry run would have done."""
+        self.action_counts[action] += 1
+        if latency is not None:
+            fields["latency_ms"] = round(latency * 1000, 3)
+        if action == ROLL:
+            log.debug("👻 Would roll in #%s: %s", channel, detail, channel=channel, action=action, **fields)
+            return
+        self.actions.append(Action(time.time(), channel, action, detail, latency))
+        log.info("👻 Would %s in #%s%s", action.replace("_", " "), channel, f": {detail}" if detail else "",
+                 channel=channel, action=action, **fields)
+
+    def _ledger(self, channel_id: int) -> _Spent:
+        spent = self._spent.get(channel_id)
+        if spent is None:
+            spent = self._spent[channel_id] = _Spent()
+        return spent
+
+    def spend_claim(self, channel_id: int, claim_reset_at: float | None, now: float | None = None) -> None:
+        """A pretended claim; it is back at `claim_reset_at` (learned from the next `$tu` if unknown or past)."""
+        now = time.monotonic() if now is None else now
+        spent = self._ledger(channel_id)
+        spent.claim = True
+        spent.claim_until = claim_reset_at if claim_reset_at is not None and claim_reset_at > now else None
+
+    def spend_rt(self, channel_id: int) -> None:
+        self._ledger(channel_id).rt = True
+
+    def spend_roll(self, channel_id: int, rolls_reset_at: float | None, now: float | None = None) -> None:
+        """A pretended roll, counted against the rolls until `rolls_reset_at`."""
+        now = time.monotonic() if now is None else now
+        spent = self._ledger(channel_id)
+        if spent.rolls_until is not None and now >= spent.rolls_until:
+            spent.rolls, spent.rolls_until = 0, None  # the rolls reset since
+        if spent.rolls_until is None and rolls_reset_at is not None and rolls_reset_at > now:
+            spent.rolls_until = rolls_reset_at
+        spent.rolls += 1
+
+    def overlay(self, channel_id: int, state, now: float | None = None) -> None:
+        """Re-apply the dry run's pretended spends to a state fresh from `$tu`."""
+        spent = self._spent.get(channel_id)
+        if spent is None:
+            return
+        now = time.monotonic() if now is None else now
+        if spent.claim:
+            if spent.claim_until is None:
+                spent.claim_until = state.claim_reset_at
+            if spent.claim_until is not None and now >= spent.claim_until:
+                spent.claim, spent.claim_until = False, None
+            else:
+                state.claim_available = False
+                state.claim_reset_at = spent.claim_until
+        if spent.rolls:
+            if spent.rolls_until is None:
+                spent.rolls_until = state.rolls_reset_at
+            if spent.rolls_until is not None and now >= spent.rolls_until:
+                spent.rolls, spent.rolls_until = 0, None
+            else:
+                state.rolls_left = max(0, state.rolls_left - spent.rolls)
+        if spent.rt:
+            state.rt_available = False
+            state.rt_ready_at = None
+
+    def reset(self) -> None:
+        """The dry run ended: Mudae's timers are the truth again."""
+        self._spent.clear()
+
+    # ---- candidate policy ----
+    def compare(self, channel_id: int, channel: str, event: RollEvent, watch_hit: WatchMatch | None,
+                live: Decision, live_kakera: str | None = None, candidate_kakera: str | None = None) -> Decision | None:
+        """Decide the roll with the candidate policy and record where it differs from the live decision."""
+        if self.candidate is None:
+            return None
+        started = time.perf_counter()
+        candidate = self.candidate.decide(channel_id, event.name, event.series, event.kakera, watch_hit)
+        if self.metrics is not None:
+            self.metrics.observe("shadow.decide", time.perf_counter() - started)
+        self.compared += 1
+        for side, decision in (("live", live), ("candidate", candidate)):
+            if decision.claim:
+                self.claims[side] += 1
+                self.claimed_kakera[side] += event.kakera
+
+        if live.claim != candidate.claim:
+            self._differ(channel, event, DIFF_CLAIM, _verdict(live), _verdict(candidate))
+        elif live.claim and live.use_rt != candidate.use_rt:
+            self._differ(channel, event, DIFF_RT, f"$rt {'yes' if live.use_rt else 'no'}, tier {live.tier}",
+                         f"$rt {'yes' if candidate.use_rt else 'no'}, tier {candidate.tier}")
+        if live_kakera != candidate_kakera:
+            self._differ(channel, event, DIFF_KAKERA, live_kakera or "no button", candidate_kakera or "no button")
+        return candidate
+
+    def _differ(self, channel: str, event: RollEvent, kind: str, live: str, candidate: str) -> None:
+        self.differences.append(Difference(time.time(), channel, event.name, event.kakera, kind, live, candidate))
+        self.diff_counts[kind] += 1
+        log.info("👻 Policies differ on %s in #%s (%s)", event.name, channel, kind, channel=channel, character=event.name,
+                 kakera=event.kakera, kind=kind, live=live, candidate=candidate)
+
+    # ---- reporting ----
+    def summary(self, dry_run: bool, decide_p50: tuple[float | None, float | None] = (None, None)) -> list[str]:
+        """Rows for `$shadow`: dry-run actions, candidate comparison and the latest records."""
+        clock = lambda at: time.strftime("%H:%M:%S", time.localtime(at))
+        rows = [f"dry run: {'on' if dry_run else 'off'}"]
+        if self.action_counts:
+            rows.append("would have: " + ", ".join(f"{name} {n}" for name, n in sorted(self.action_counts.items())))
+        if self.candidate is None:
+            rows.append("candidate policy: none (SHADOW_POLICY)")
+        else:
+            rows.append(f"candidate policy: {self.candidate.summary()}")
+            rows.append(f"rolls compared {self.compared}, differing: "
+                        + (", ".join(f"{kind} {n}" for kind, n in sorted(self.diff_counts.items())) or "none"))
+            rows.append(f"claims: live {self.claims['live']} ({self.claimed_kakera['live']} kakera), "
+                        f"candidate {self.claims['candidate']} ({self.claimed_kakera['candidate']} kakera)")
+            us = lambda s: "?" if s is None else f"{s * 1e6:.1f}"
+            rows.append(f"decide µs p50: live {us(decide_p50[0])} (with watchlist lookup), candidate {us(decide_p50[1])}")
+        if self.differences:
+            rows.append("latest differences:")
+            for d in list(self.differences)[-10:]:
+                rows.append(f"{clock(d.at)} #{d.channel[:12]} {d.character[:20]} ({d.kakera}) {d.kind}: "
+                            f"live {d.live} | candidate {d.candidate}")
+        if self.actions:
+            rows.append("latest dry-run actions:")
+            for a in list(self.actions)[-10:]:
+                latency = "" if a.latency is None else f" [{a.latency * 1000:.2f} ms]"
+                rows.append(f"{clock(a.at)} #{a.channel[:12]} {a.action} {a.detail}{latency}")
+        return rows
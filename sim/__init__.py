@@ -0,0 +1 @@
+"""Offline Mudae simulator: fake gateway, scripted Mudae and a virtual clock."""
@@ -0,0 +1,58 @@
+"""
+Offline Mudae simulation.
+
+    python -m sim --channels 5 --hours 3 --set TIMER=2 --set DELAY_BETWEEN_ROLLS=1.5
+
+Runs the real MyClient against a scripted Mudae on a virtual clock and prints
+throughput and claim-latency numbers (JSON with --json). No network needed.
+"""
+import argparse
+import json
+import sys
+
+from sim.mudae import SimConfig
+from sim.runner import run
+
+
+def _parse_set(values: list[str]) -> dict[str, str]:
+    overrides = {}
+    for item in values:
+        key, sep, value = item.partition("=")
+        if not sep:
+            raise SystemExit(f"--set expects KEY=VALUE, got {item!r}")
+        overrides[key.strip()] = value.strip()
+    return overrides
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m sim", description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--channels", type=int, default=3)
+    parser.add_argument("--hours", type=float, default=3.0, help="virtual hours to simulate")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--watchlist", type=int, default=200, help="watchlist size")
+    parser.add_argument("--wish-rate", type=float, default=0.05)
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=VALUE",
+                        help="override a main.py env setting (repeatable)")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    parser.add_argument("--verbose", action="store_true", help="show the bot's console output")
+    args = parser.parse_args(argv)
+
+    config = SimConfig(channels=args.channels, hours=args.hours, seed=args.seed,
+                       watchlist_size=args.watchlist, wish_rate=args.wish_rate)
+    report = run(config, _parse_set(args.set), verbose=args.verbose)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print("📊 Simulation report")
+        for key, value in report.items():
+            if key == "error_details":
+                continue
+            print(f"   • {key}: {value}")
+        for detail in report["error_details"]:
+            print(f"❗ {detail}")
+    return 1 if report["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,75 @@
+"""
+Virtual clock for the offline simulator.
+
+`VirtualClockLoop` is a selector event loop whose `time()` is a counter that
+jumps straight to the next scheduled callback whenever nothing is ready, so
+`asyncio.sleep(3600)` completes instantly in wall time while every timeout,
+`wait_for` and `call_later` keeps its relative ordering.
+"""
+import asyncio
+import contextlib
+import selectors
+import time
+from unittest import mock
+
+
+class VirtualClock:
+    """Monotonic virtual seconds plus a fixed wall-clock epoch for time.time()."""
+
+    def __init__(self, epoch: float = 1_700_000_000.0):
+        self.now = 0.0
+        self.epoch = epoch
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def wall(self) -> float:
+        return self.epoch + self.now
+
+
+class _VirtualSelector(selectors.BaseSelector):
+    """Delegates fd bookkeeping to a real selector but never sleeps on timeouts."""
+
+    def __init__(self, clock: VirtualClock):
+        self._clock = clock
+        self._real = selectors.DefaultSelector()
+
+    def register(self, fileobj, events, data=None):
+        return self._real.register(fileobj, events, data)
+
+    def unregister(self, fileobj):
+        return self._real.unregister(fileobj)
+
+    def modify(self, fileobj, events, data=None):
+        return self._real.modify(fileobj, events, data)
+
+    def get_map(self):
+        return self._real.get_map()
+
+    def close(self):
+        self._real.close()
+
+    def select(self, timeout=None):
+        if timeout is None:
+            # nothing scheduled: only another thread can wake us, so really wait
+            return self._real.select(None)
+        ready = self._real.select(0)
+        if not ready and timeout > 0:
+            self._clock.now += timeout
+        return ready
+
+
+class VirtualClockLoop(asyncio.SelectorEventLoop):
+    def __init__(self, clock: VirtualClock):
+        self.clock = clock
+        super().__init__(selector=_VirtualSelector(clock))
+
+    def time(self) -> float:
+        return self.clock.now
+
+
+@contextlib.contextmanager
+def patched_time(clock: VirtualClock):
+    """Point time.time()/time.monotonic() at the virtual clock while active."""
+    with mock.patch.object(time, "time", clock.wall), mock.patch.object(time, "monotonic", clock.monotonic):
+        yield clock
@@ -0,0 +1,129 @@
+"""
+Duck-typed stand-ins for the discord objects MyClient touches.
+
+Only the attributes and coroutines main.py actually uses are implemented.
+Embeds and emojis are real `discord.Embed` / `discord.PartialEmoji` objects so
+`str(button.emoji)`, `embed.author.name` and `embed.footer.text` behave
+exactly as they do on the gateway.
+"""
+import itertools
+
+import discord
+
+_snowflakes = itertools.count(1_300_000_000_000_000_000)
+
+
+def next_id() -> int:
+    return next(_snowflakes)
+
+
+class FakeUser:
+    def __init__(self, user_id: int, name: str):
+        self.id = user_id
+        self.name = name
+        self.bot = False
+
+    def __str__(self) -> str:
+        return self.name
+
+
+class FakeButton:
+    def __init__(self, sim, message: "FakeMessage", emoji: discord.PartialEmoji):
+        self._sim = sim
+        self.message = message
+        self.emoji = emoji
+        self.custom_id = str(next_id())
+
+    async def click(self):
+        return await self._sim.on_click(self)
+
+
+class FakeActionRow:
+    def __init__(self, children: list[FakeButton]):
+        self.children = children
+
+
+class FakeAttachment:
+    def __init__(self, filename: str, data: bytes):
+        self.filename = filename
+        self._data = data
+
+    async def read(self) -> bytes:
+        return self._data
+
+
+class FakeMessage:
+    def __init__(self, channel: "FakeChannel", author: FakeUser, content: str = "",
+                 embeds: list[discord.Embed] | None = None):
+        self.id = next_id()
+        self.channel = channel
+        self.author = author
+        self.content = content
+        self.embeds = embeds or []
+        self.components: list[FakeActionRow] = []
+        self.attachments: list[FakeAttachment] = []
+        self.guild = None
+
+    def __repr__(self) -> str:
+        return f"<FakeMessage id={self.id} channel={self.channel.name} author={self.author}>"
+
+
+class FakeChannel:
+    """Text channel whose sends are routed to the simulator instead of Discord."""
+
+    def __init__(self, sim, channel_id: int, name: str):
+        self._sim = sim
+        self.id = channel_id
+        self.name = name
+        self.guild = None
+        self.messages: dict[int, FakeMessage] = {}
+        self.last_message_id: int | None = None
+
+    def __repr__(self) -> str:
+        return f"<FakeChannel #{self.name}>"
+
+    def store(self, message: FakeMessage) -> FakeMessage:
+        self.messages[message.id] = message
+        self.last_message_id = message.id
+        return message
+
+    async def send(self, content: str = "", **kwargs) -> FakeMessage:
+        return await self._sim.on_send(self, content, **kwargs)
+
+    async def fetch_message(self, message_id: int) -> FakeMessage:
+        await self._sim.rest_delay()
+        try:
+            return self.messages[message_id]
+        except KeyError:
+            raise discord.NotFound(_FakeResponse(404), "Unknown Message") from None
+
+    async def purge(self, limit: int = 100, **kwargs) -> list[FakeMessage]:
+        newest = sorted(self.messages, reverse=True)[:limit]
+        removed = [self.messages.pop(mid) for mid in newest]
+        self._sim.stats["api_calls"] += 1 + len(removed) // 100
+        return removed
+
+    async def history(self, limit: int | None = 100, before=None, after=None, oldest_first=None, **kwargs):
+        if oldest_first is None:
+            oldest_first = after is not None  # discord.py's default
+        ids = sorted(self.messages, reverse=not oldest_first)
+        if before is not None:
+            before_id = getattr(before, "id", before)
+            ids = [mid for mid in ids if mid < before_id]
+        if after is not None:
+            after_id = getattr(after, "id", after)
+            ids = [mid for mid in ids if mid > after_id]
+        for count, mid in enumerate(ids):
+            if limit is not None and count >= limit:
+                break
+            if count % 100 == 0:
+                await self._sim.rest_delay()
+            yield self.messages[mid]
+
+
+class _FakeResponse:
+    """Minimal aiohttp-like response so discord.HTTPException can be built."""
+
+    def __init__(self, status: int):
+        self.status = status
+        self.reason = "simulated"
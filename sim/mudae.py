@@ -0,0 +1,362 @@
+"""
+A scripted Mudae: per-channel claim/roll/kakera/$rt state driven by the
+virtual clock, replying to the commands MyClient sends with the same text and
+embed shapes the real bot produces.
+"""
+import asyncio
+import math
+import random
+from collections import Counter
+from dataclasses import dataclass, field
+
+import discord
+
+from sim.fakes import FakeActionRow, FakeAttachment, FakeButton, FakeChannel, FakeMessage, FakeUser
+
+MUDAE_ID = 432610292342587392
+SELF_ID = 1_100_000_000_000_000_001
+KAKERA_ICON = "<:kakera:469835869059153940>"
+
+CLAIM_PERIOD = 3 * 3600
+ROLL_PERIOD = 3600
+RT_COOLDOWN = 20 * 3600
+DAILY_PERIOD = 20 * 3600
+POWER_REGEN_SECONDS = 180  # 1% reaction power every 3 minutes
+
+HEARTS = ["❤️", "💕", "💘", "💖", "💓", "💗"]
+# name -> (emoji id, base value)
+KAKERA_BUTTONS = {
+    "kakeraP": (609264156347990016, 100),
+    "kakera": (469835869059153940, 100),
+    "kakeraT": (609264180851376132, 175),
+    "kakeraG": (609264166381027329, 250),
+    "kakeraY": (605112931168026629, 400),
+    "kakeraO": (605112954391887888, 700),
+    "kakeraR": (605112980295647242, 1000),
+    "kakeraW": (608192076286263297, 2000),
+    "kakeraL": (815961697918779422, 5000),
+}
+_KAKERA_WEIGHTS = [30, 25, 18, 12, 8, 4, 2, 0.7, 0.3]
+
+_SYLLABLES = ["ka", "ri", "mo", "na", "shi", "ro", "yu", "ki", "a", "e", "to", "ma", "su", "ne", "ha",
+              "ru", "ko", "ji", "sa", "chi", "ta", "mi", "ho", "ya", "ze", "ga", "ra", "n", "ku", "se"]
+_SERIES = ["Re:Zero", "Sword Art Online", "Steins;Gate", "Konosuba", "Bocchi the Rock!", "Frieren", "Naruto"]
+
+
+@dataclass
+class SimConfig:
+    channels: int = 3
+    hours: float = 3.0
+    seed: int = 1
+    watchlist_size: int = 200
+    wish_rate: float = 0.05  # share of rolls that land on a watchlist name
+    owned_rate: float = 0.3  # share of rolls already claimed by someone else
+    rolls_per_reset: int = 10
+    consumption: int = 36
+    mudae_latency: tuple[float, float] = (0.3, 1.2)
+    click_latency: tuple[float, float] = (0.1, 0.4)
+    rest_latency: tuple[float, float] = (0.1, 0.3)
+    username: str = "simuser"
+    first_channel_id: int = 1_200_000_000_000_000_001
+    character_channel_id: int = 1_200_000_000_000_000_900
+    commands_channel_id: int = 1_200_000_000_000_000_901
+    owner_id: int = 1_100_000_000_000_000_002
+
+
+@dataclass
+class ChannelState:
+    """What Mudae knows about one channel (treated as its own server)."""
+    claim_available: bool
+    next_claim_reset: float
+    rolls_left: int
+    next_rolls_reset: float
+    rt_ready_at: float
+    power: float = 100.0
+    power_at: float = 0.0
+    stock: int = 0
+    next_daily: float = 0.0
+    vote_at: float = 0.0
+
+
+@dataclass
+class RollRecord:
+    rolled_at: float
+    name: str
+    wanted: bool
+    owned: bool
+    kakera: int
+    claimed_by: str | None = None
+    kakera_taken: bool = False
+
+
+def _fmt(seconds: float) -> str:
+    """Mudae-style duration: '1h 18' or '18' (minutes rounded up)."""
+    minutes = max(0, math.ceil(seconds / 60))
+    h, m = divmod(minutes, 60)
+    return f"{h}h {m:02d}" if h else f"{m}"
+
+
+def percentile(values: list[float], pct: float) -> float | None:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+class MudaeSim:
+    def __init__(self, config: SimConfig):
+        self.config = config
+        self.rng = random.Random(config.seed)
+        self.client = None
+        self.mudae = FakeUser(MUDAE_ID, "Mudae")
+        self.mudae.bot = True
+        self.me = FakeUser(SELF_ID, config.username)
+        self.owner = FakeUser(config.owner_id, "owner")
+
+        self.channels: dict[int, FakeChannel] = {}
+        self.state: dict[int, ChannelState] = {}
+        for i in range(config.channels):
+            cid = config.first_channel_id + i
+            self.channels[cid] = FakeChannel(self, cid, f"roll-{i + 1}")
+            self.state[cid] = ChannelState(
+                claim_available=True,
+                next_claim_reset=self.rng.uniform(0, CLAIM_PERIOD),
+                rolls_left=config.rolls_per_reset,
+                next_rolls_reset=self.rng.uniform(0, ROLL_PERIOD),
+                rt_ready_at=0.0,
+                stock=self.rng.randint(0, 20000),
+            )
+        self.character_channel = FakeChannel(self, config.character_channel_id, "watchlist")
+        self.commands_channel = FakeChannel(self, config.commands_channel_id, "bot-commands")
+        self.channels[config.character_channel_id] = self.character_channel
+        self.channels[config.commands_channel_id] = self.commands_channel
+
+        self.watchlist = [self._random_name() for _ in range(config.watchlist_size)]
+        for start in range(0, len(self.watchlist), 50):
+            self.character_channel.store(FakeMessage(self.character_channel, self.owner,
+                                                     "\n".join(self.watchlist[start:start + 50])))
+
+        self.rolls: dict[int, RollRecord] = {}
+        self.stats: Counter = Counter()
+        self.claim_latencies: list[float] = []
+        self.kakera_latencies: list[float] = []
+        self.errors: list[str] = []
+
+    # ---- plumbing ----
+    def attach(self, client) -> None:
+        self.client = client
+
+    @property
+    def now(self) -> float:
+        return asyncio.get_running_loop().time()
+
+    def roll_channel_ids(self) -> list[int]:
+        return [cid for cid in self.state]
+
+    async def rest_delay(self) -> None:
+        self.stats["api_calls"] += 1
+        await asyncio.sleep(self.rng.uniform(*self.config.rest_latency))
+
+    def _dispatch_later(self, delay: float, event: str, *args) -> None:
+        asyncio.get_running_loop().call_later(delay, self.client.dispatch, event, *args)
+
+    def _reply(self, channel: FakeChannel, content: str = "", embeds=None, components=None) -> FakeMessage:
+        msg = channel.store(FakeMessage(channel, self.mudae, content, embeds))
+        if components:
+            msg.components = components
+        self.stats["mudae_messages"] += 1
+        self._dispatch_later(self.rng.uniform(*self.config.mudae_latency), "message", msg)
+        return msg
+
+    def _random_name(self) -> str:
+        parts = ("".join(self.rng.choice(_SYLLABLES) for _ in range(self.rng.randint(2, 4))) for _ in range(2))
+        return " ".join(p.capitalize() for p in parts)
+
+    def _tick(self, cid: int) -> ChannelState:
+        """Apply every reset that happened since the state was last touched."""
+        st = self.state[cid]
+        now = self.now
+        if now >= st.next_rolls_reset:
+            st.rolls_left = self.config.rolls_per_reset
+            st.next_rolls_reset += ROLL_PERIOD * (1 + (now - st.next_rolls_reset) // ROLL_PERIOD)
+        if now >= st.next_claim_reset:
+            st.claim_available = True
+            st.next_claim_reset += CLAIM_PERIOD * (1 + (now - st.next_claim_reset) // CLAIM_PERIOD)
+        st.power = min(100.0, st.power + (now - st.power_at) / POWER_REGEN_SECONDS)
+        st.power_at = now
+        return st
+
+    # ---- outbound from MyClient ----
+    async def on_send(self, channel: FakeChannel, content: str, **kwargs) -> FakeMessage:
+        self.stats["api_calls"] += 1
+        self.stats["sends"] += 1
+        await asyncio.sleep(self.rng.uniform(*self.config.rest_latency))
+        msg = FakeMessage(channel, self.me, content)
+        if kwargs.get("file") is not None:
+            file = kwargs["file"]
+            msg.attachments.append(FakeAttachment(file.filename, file.fp.read()))
+        channel.store(msg)
+        self.client.dispatch("message", msg)
+        if channel.id in self.state:
+            self._handle_command(channel, content.strip())
+        return msg
+
+    def _handle_command(self, channel: FakeChannel, content: str) -> None:
+        cmd = content.split(maxsplit=1)[0].lower() if content else ""
+        st = self._tick(channel.id)
+        if cmd == "$tu":
+            self.stats["tu"] += 1
+            self._reply(channel, self._tu_text(st))
+        elif cmd == "$rt":
+            self.stats["rt"] += 1
+            if self.now >= st.rt_ready_at:
+                st.rt_ready_at = self.now + RT_COOLDOWN
+                st.claim_available = True
+                self._reply(channel, f"✅ **{self.me}**, your claim timer has been reset! You can claim right now.")
+            else:
+                self._reply(channel, f"**{self.me}**, the cooldown of $rt is not over. "
+                                     f"Time left: **{_fmt(st.rt_ready_at - self.now)}** min. ($rtu)")
+        elif cmd == "$daily":
+            self.stats["daily"] += 1
+            st.next_daily = self.now + DAILY_PERIOD
+            self._reply(channel, f"✅ **{self.me}**, daily claimed! +1 roll.")
+        elif cmd.startswith("$") and cmd[1:2] in {"w", "h", "m"} and len(cmd) <= 3:
+            self.stats["rolls_sent"] += 1
+            if st.rolls_left <= 0:
+                self.stats["rolls_refused"] += 1
+                self._reply(channel, f"**{self.me}**, the roulette is limited to {self.config.rolls_per_reset} uses per hour. "
+                                     f"**{_fmt(st.next_rolls_reset - self.now)}** min left.")
+                return
+            st.rolls_left -= 1
+            self._roll(channel)
+
+    def _tu_text(self, st: ChannelState) -> str:
+        now = self.now
+        lines = []
+        if st.claim_available:
+            lines.append(f"**{self.me}**, you __can__ claim right now! The next claim reset is in "
+                         f"**{_fmt(st.next_claim_reset - now)}** min.")
+        else:
+            lines.append(f"**{self.me}**, you can't claim for another **{_fmt(st.next_claim_reset - now)}** min.")
+        lines.append(f"You have **{st.rolls_left}** rolls left. Next rolls reset in **{_fmt(st.next_rolls_reset - now)}** min.")
+        if now >= st.next_daily:
+            lines.append("$daily is available!")
+        else:
+            lines.append(f"Next $daily reset in **{_fmt(st.next_daily - now)}** min.")
+        if st.power >= self.config.consumption:
+            lines.append("You __can__ react to kakera right now!")
+        else:
+            wait = (self.config.consumption - st.power) * POWER_REGEN_SECONDS
+            lines.append(f"You can't react to kakera for **{_fmt(wait)}** min.")
+        lines.append(f"Power: **{int(st.power)}%**")
+        lines.append(f"Each kakera button consumes {self.config.consumption}% of your reaction power.")
+        lines.append(f"Stock: **{st.stock:,}**{KAKERA_ICON}")
+        if now >= st.rt_ready_at:
+            lines.append("$rt is available!")
+        else:
+            lines.append(f"The cooldown of $rt is not over. Time left: **{_fmt(st.rt_ready_at - now)}** min. ($rtu)")
+        if now >= st.vote_at:
+            lines.append("You may vote right now! $vote")
+        else:
+            lines.append(f"You may vote again in **{_fmt(st.vote_at - now)}** min.")
+        return "\n".join(lines)
+
+    def _roll(self, channel: FakeChannel) -> None:
+        wanted = self.rng.random() < self.config.wish_rate
+        name = self.rng.choice(self.watchlist) if wanted else self._random_name()
+        owned = self.rng.random() < self.config.owned_rate
+        kakera = int(30 + self.rng.paretovariate(1.6) * 25)
+
+        embed = discord.Embed(description=f"{self.rng.choice(_SERIES)}\n**{kakera:,}**{KAKERA_ICON}")
+        embed.set_author(name=name)
+        if owned:
+            embed.set_footer(text="Belongs to someone_else")
+        msg = self._reply(channel, embeds=[embed])
+
+        if owned:
+            kind = self.rng.choices(list(KAKERA_BUTTONS), weights=_KAKERA_WEIGHTS)[0]
+            emoji = discord.PartialEmoji(name=kind, id=KAKERA_BUTTONS[kind][0])
+        else:
+            emoji = discord.PartialEmoji(name=self.rng.choice(HEARTS))
+        msg.components = [FakeActionRow([FakeButton(self, msg, emoji)])]
+
+        self.rolls[msg.id] = RollRecord(self.now, name, wanted, owned, kakera)
+        self.stats["rolls"] += 1
+        if wanted and not owned:
+            self.stats["wanted_rolled"] += 1
+
+    # ---- button clicks ----
+    async def on_click(self, button: FakeButton):
+        clicked_at = self.now
+        self.stats["clicks"] += 1
+        self.stats["api_calls"] += 1
+        await asyncio.sleep(self.rng.uniform(*self.config.click_latency))
+        msg = button.message
+        record = self.rolls.get(msg.id)
+        if record is None:
+            return None
+        channel = msg.channel
+        st = self._tick(channel.id)
+        emoji_name = button.emoji.name
+
+        if emoji_name in KAKERA_BUTTONS:
+            if record.kakera_taken or st.power < self.config.consumption:
+                self._reply(channel, f"**{self.me}**, you can't react to kakera right now.")
+                return None
+            record.kakera_taken = True
+            st.power -= self.config.consumption
+            value = KAKERA_BUTTONS[emoji_name][1]
+            st.stock += value
+            self.stats["kakera_clicks"] += 1
+            self.stats["kakera_earned"] += value
+            self.kakera_latencies.append(clicked_at - record.rolled_at)
+            self._reply(channel, f"**{self.me}** +{value}{KAKERA_ICON} ($k)")
+            return None
+
+        if record.claimed_by is not None or record.owned:
+            return None
+        if not st.claim_available:
+            self.stats["claims_refused"] += 1
+            self._reply(channel, f"**{self.me}**, you can't claim for another **{_fmt(st.next_claim_reset - self.now)}** min.")
+            return None
+        st.claim_available = False
+        record.claimed_by = self.me.name
+        self.stats["claims"] += 1
+        if record.wanted:
+            self.stats["wanted_claimed"] += 1
+        self.claim_latencies.append(clicked_at - record.rolled_at)
+
+        embed = msg.embeds[0]
+        embed.set_footer(text=f"Belongs to {self.me}")
+        self.client.dispatch("message_edit", msg, msg)
+        self._reply(channel, f"💖 **{self.me}** and **{record.name}** are now married! 💖")
+        return None
+
+    # ---- report ----
+    def report(self, wall_seconds: float) -> dict:
+        hours = self.config.hours
+        stats = self.stats
+        return {
+            "channels": self.config.channels,
+            "virtual_hours": hours,
+            "wall_seconds": round(wall_seconds, 3),
+            "speedup": round(hours * 3600 / wall_seconds, 1) if wall_seconds else None,
+            "mudae_messages": stats["mudae_messages"],
+            "rolls": stats["rolls"],
+            "rolls_per_channel_hour": round(stats["rolls"] / (hours * self.config.channels), 2),
+            "rolls_refused": stats["rolls_refused"],
+            "tu": stats["tu"],
+            "rt": stats["rt"],
+            "claims": stats["claims"],
+            "claims_refused": stats["claims_refused"],
+            "wanted_rolled": stats["wanted_rolled"],
+            "wanted_claimed": stats["wanted_claimed"],
+            "kakera_clicks": stats["kakera_clicks"],
+            "kakera_earned": stats["kakera_earned"],
+            "api_calls": stats["api_calls"],
+            "sends": stats["sends"],
+            "claim_latency_p50": percentile(self.claim_latencies, 50),
+            "claim_latency_p95": percentile(self.claim_latencies, 95),
+            "kakera_latency_p50": percentile(self.kakera_latencies, 50),
+            "errors": len(self.errors),
+        }
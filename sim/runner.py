@@ -0,0 +1,126 @@
+"""
+Drive the real MyClient from main.py against MudaeSim on a virtual clock.
+
+main.py reads its configuration from the environment at import time, so the
+simulator fills the environment first and only then imports it.
+"""
+import asyncio
+import contextlib
+import io
+import os
+import random
+import tempfile
+import time
+import traceback
+
+from logs import pipeline as log_pipeline
+from sim.clock import VirtualClock, VirtualClockLoop, patched_time
+from sim.mudae import MudaeSim, SimConfig
+
+# Tunables the simulator pins so runs don't depend on the local .env.
+DEFAULT_ENV = {
+    "TIMER": "5",
+    "MIN_KAKERA": "200",
+    "FUZZY_THRESHOLD": "0",
+    "STATE_DB": ":memory:",
+    "CLICK_RETRIES": "3",
+    "CLICK_RETRY_DELAY": "0.8",
+    "ROLL_WAIT_EVENT_TIMEOUT": "6.0",
+    "DELAY_BETWEEN_ROLLS": "3",
+    "ROLLING_COMMANDS": "$wa,$ha,$ma",
+    "LOOP_LAG_INTERVAL": "0",  # lag on a virtual clock means nothing; sampling it only costs wall time
+    "KAKERA_LIST": '["kakera","kakeraT","kakeraG","kakeraY","kakeraO","kakeraR","kakeraW","kakeraL"]',
+}
+
+
+def build_env(config: SimConfig, overrides: dict[str, str] | None = None) -> dict[str, str]:
+    roll_ids = [config.first_channel_id + i for i in range(config.channels)]
+    env = dict(DEFAULT_ENV)
+    env.update({
+        "DISCORD_TOKEN": "simulated",
+        "CHARACTER_CHANNEL_ID": str(config.character_channel_id),
+        "COMMANDS_CHANNEL_ID": str(config.commands_channel_id),
+        "OWNER_ID": str(config.owner_id),
+        "USERNAME": config.username,
+        "ALLOWED_CHANNELS": ",".join(str(cid) for cid in roll_ids),
+    })
+    env.update(overrides or {})
+    return env
+
+
+def _make_client(bot, sim: MudaeSim):
+    class SimClient(bot.MyClient):
+        """MyClient with the gateway and REST layer replaced by MudaeSim."""
+
+        def __init__(self):
+            super().__init__()
+            self._sim = sim
+            self._sim_closed = False
+
+        @property
+        def user(self):
+            return self._sim.me
+
+        def get_channel(self, channel_id):
+            return self._sim.channels.get(channel_id)
+
+        def is_closed(self) -> bool:
+            return self._sim_closed
+
+        async def on_error(self, event_method, /, *args, **kwargs):
+            self._sim.errors.append(f"{event_method}: {traceback.format_exc()}")
+
+    return SimClient()
+
+
+async def _simulate(config: SimConfig) -> dict:
+    import main as bot
+
+    # main.py is imported once per process: later runs re-read the environment they were given
+    for name, (_, value) in bot.config.diff(bot.load_config()).items():
+        setattr(bot.config, name, value)
+
+    sim = MudaeSim(config)
+    client = _make_client(bot, sim)
+    await client._async_setup_hook()
+    sim.attach(client)
+
+    started = time.perf_counter()
+    client._ready.set()
+    client.dispatch("ready")
+    await asyncio.sleep(config.hours * 3600)
+    client._sim_closed = True
+
+    current = asyncio.current_task()
+    pending = [t for t in asyncio.all_tasks() if t is not current]
+    for task in pending:
+        task.cancel()
+    await asyncio.gather(*pending, return_exceptions=True)
+    return sim.report(time.perf_counter() - started) | {"error_details": sim.errors[:5]}
+
+
+def run(config: SimConfig, env_overrides: dict[str, str] | None = None, verbose: bool = False) -> dict:
+    """Run one simulation and return its report."""
+    with tempfile.TemporaryDirectory(prefix="mudae-sim-") as scratch:
+        overrides = {"HISTORY_DIR": os.path.join(scratch, "history"), **(env_overrides or {})}
+        return _run(config, overrides, verbose)
+
+
+def _run(config: SimConfig, env_overrides: dict[str, str], verbose: bool) -> dict:
+    saved_env = dict(os.environ)
+    os.environ.update(build_env(config, env_overrides))
+    random.seed(config.seed)  # main.py draws its human-like delays from the global RNG
+
+    clock = VirtualClock()
+    loop = VirtualClockLoop(clock)
+    out = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+    try:
+        with patched_time(clock), out:
+            try:
+                return loop.run_until_complete(_simulate(config))
+            finally:
+                log_pipeline.flush()  # the bot logs from a writer thread
+    finally:
+        loop.close()
+        os.environ.clear()
+        os.environ.update(saved_env)
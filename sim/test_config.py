@@ -0,0 +1,81 @@
+"""Config parsing and range checks."""
+import os
+
+import pytest
+
+from config import ConfigError, files_stamp, load_config, watched_files
+
+REQUIRED = {
+    "DISCORD_TOKEN": "token",
+    "CHARACTER_CHANNEL_ID": "1",
+    "OWNER_ID": "2",
+    "COMMANDS_CHANNEL_ID": "3",
+    "ALLOWED_CHANNELS": "10, 11",
+}
+
+
+def load(tmp_path, **overrides):
+    """load_config with only `REQUIRED` plus `overrides`: no .env, no CONFIG_FILE, no process environment."""
+    environ = {"CONFIG_FILE": os.path.join(tmp_path, "missing.toml"), **REQUIRED, **overrides}
+    return load_config(os.path.join(tmp_path, ".env"), environ=environ)
+
+
+def test_defaults_and_parsing(tmp_path):
+    config = load(tmp_path, ROLLING_COMMANDS="['$wa', '$ha']", KAKERA_LIST="KakeraP, kakeraY")
+    assert config.allowed_channels == frozenset({10, 11})
+    assert config.rolling_commands == ("$wa", "$ha")
+    assert config.kakera_list == ("kakerap", "kakeray")
+    assert config.timer == 10.0
+    assert config.lean_mode is False
+    assert load(tmp_path, LEAN_MODE="yes").lean_mode is True
+
+
+def test_missing_required(tmp_path):
+    environ = {"CONFIG_FILE": os.path.join(tmp_path, "missing.toml"), "DISCORD_TOKEN": "token"}
+    with pytest.raises(ConfigError) as error:
+        load_config(os.path.join(tmp_path, ".env"), environ=environ)
+    assert "CHARACTER_CHANNEL_ID: is required" in error.value.problems
+    assert "ALLOWED_CHANNELS: is required" in error.value.problems
+
+
+def test_every_problem_is_reported(tmp_path):
+    with pytest.raises(ConfigError) as error:
+        load(tmp_path, FUZZY_THRESHOLD="1.5", SEND_RATE="0", TIMER="soon", ALLOWED_CHANNELS="general",
+             LOG_LEVEL="loud")
+    problems = error.value.problems
+    assert "FUZZY_THRESHOLD: must be between 0 and 1" in problems
+    assert "SEND_RATE: must be > 0" in problems
+    assert "TIMER: expected a number, got 'soon'" in problems
+    assert "ALLOWED_CHANNELS: not channel ids: general" in problems
+    assert "LOG_LEVEL: must be debug, info, warning or error" in problems
+
+
+def test_config_file_and_environment_order(tmp_path):
+    env_file = os.path.join(tmp_path, ".env")
+    toml_file = os.path.join(tmp_path, "mudae.toml")
+    with open(env_file, "w") as f:
+        f.write("TIMER=1\nMIN_KAKERA=5\nSEND_BURST=2\n")
+    with open(toml_file, "w") as f:
+        f.write("min_kakera = 50\nsend_burst = 4\n")
+    config = load_config(env_file, environ={"CONFIG_FILE": toml_file, **REQUIRED, "SEND_BURST": "8"})
+    assert (config.timer, config.min_kakera, config.send_burst) == (1.0, 50, 8)
+
+
+def test_diff(tmp_path):
+    old, new = load(tmp_path), load(tmp_path, TIMER="2", ALLOWED_CHANNELS="10")
+    assert old.diff(new) == {"timer": (10.0, 2.0), "allowed_channels": (frozenset({10, 11}), frozenset({10}))}
+
+
+def test_watched_files_and_stamp(tmp_path, monkeypatch):
+    monkeypatch.delenv("CONFIG_FILE", raising=False)
+    env_file = os.path.join(tmp_path, ".env")
+    toml_file = os.path.join(tmp_path, "mudae.toml")
+    with open(env_file, "w") as f:
+        f.write(f"CONFIG_FILE={toml_file}\n")
+    paths = watched_files(env_file)
+    assert paths == [env_file, toml_file]
+    before = files_stamp(paths)
+    assert before[1] is None  # missing CONFIG_FILE
+    with open(toml_file, "w") as f:
+        f.write("timer = 3\n")
+    assert files_stamp(paths) != before
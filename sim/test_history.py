@@ -0,0 +1,92 @@
+"""Columnar roll history: buffering, segment flushes, memmap reloads and stats."""
+import os
+
+import numpy as np
+import pytest
+
+import history
+from history import CLAIM_CONFIRMED, CLAIM_NONE, CLAIM_REFUSED, RollHistory, parse_window
+
+
+@pytest.mark.parametrize("text, seconds", [
+    ("", 86400.0), ("30m", 1800.0), ("12h", 43200.0), ("7d", 604800.0), ("1w", 604800.0),
+    ("90s", 90.0), ("2", 172800.0), ("1.5h", 5400.0), (" 7D ", 604800.0),
+    ("abc", None), ("d", None), ("0d", None), ("-1h", None),
+])
+def test_parse_window(text, seconds):
+    assert parse_window(text) == seconds
+
+
+def record(hist, i, channel=1, ts=None, kakera=None, wanted=False):
+    hist.record(i, channel, f"char {i % 7}", i if kakera is None else kakera, wanted, 0.001 * i,
+                "watchlist" if wanted else "below_threshold", ts=1000.0 + i if ts is None else ts)
+
+
+def test_claim_outcome_is_set_while_buffered(tmp_path):
+    hist = RollHistory(str(tmp_path))
+    record(hist, 1)
+    record(hist, 2, wanted=True)
+    hist.set_claim(2, "confirmed")
+    hist.set_claim(99, "confirmed")  # unknown roll: ignored
+    assert hist.flush() == 2
+    hist.set_claim(1, "refused")  # already on disk: ignored
+    assert list(hist.columns(["claimed"])["claimed"]) == [CLAIM_NONE, CLAIM_CONFIRMED]
+
+
+def test_old_rows_flush_once_settled(tmp_path):
+    hist = RollHistory(str(tmp_path))
+    record(hist, 0, ts=0.0)
+    hist.set_claim(0, "refused")
+    record(hist, 1, ts=history.SETTLE)
+    assert not os.listdir(tmp_path)  # still buffered
+    record(hist, 2, ts=3 * history.SETTLE)
+    assert len(hist._buffer["ts"]) == 1  # rows older than SETTLE went to disk
+    assert list(hist.columns(["claimed"])["claimed"]) == [CLAIM_REFUSED, CLAIM_NONE, CLAIM_NONE]
+
+
+def test_segments_and_reload(tmp_path, monkeypatch):
+    monkeypatch.setattr(history, "SEGMENT_ROWS", 4)
+    hist = RollHistory(str(tmp_path))
+    for i in range(10):
+        record(hist, i, channel=1 + i % 2, wanted=i % 3 == 0)
+    hist.close()
+    assert sorted(d for d in os.listdir(tmp_path) if d.startswith("seg-")) == ["seg-000001", "seg-000002", "seg-000003"]
+
+    reloaded = RollHistory(str(tmp_path))
+    cols = reloaded.columns(["ts", "channel", "name", "kakera", "wanted"])
+    assert list(cols["kakera"]) == list(range(10))
+    assert [reloaded.string(sid) for sid in cols["name"][:3]] == ["char 0", "char 1", "char 2"]
+    # a window starting mid-way skips the older segments and cuts the first one it reads
+    assert list(reloaded.columns(["kakera"], since=1005.0)["kakera"]) == [5, 6, 7, 8, 9]
+    # appending after a reload continues the last segment and keeps string ids stable
+    record(reloaded, 10)
+    reloaded.close()
+    again = RollHistory(str(tmp_path))
+    assert again.string(int(again.columns(["name"], since=1010.0)["name"][0])) == "char 3"
+    assert len(again.columns(["ts"])["ts"]) == 11
+
+
+def test_uneven_columns_are_repaired(tmp_path):
+    hist = RollHistory(str(tmp_path))
+    for i in range(3):
+        record(hist, i)
+    hist.close()
+    with open(tmp_path / "seg-000001" / "kakera.i4", "ab") as f:
+        np.asarray([7], dtype="<i4").tofile(f)  # a crash left one column a row ahead
+    assert len(RollHistory(str(tmp_path)).columns(["kakera"])["kakera"]) == 3
+
+
+def test_stats(tmp_path):
+    hist = RollHistory(str(tmp_path))
+    for i in range(1, 11):
+        record(hist, i, channel=1, kakera=i * 10, wanted=i <= 5)
+    for i in range(11, 14):
+        record(hist, i, channel=2, kakera=100)
+    hist.set_claim(1, "confirmed")
+    hist.set_claim(2, "lost")
+    hist.flush(1006.0)  # half on disk, half buffered
+    busiest, quiet = hist.stats(since=0.0)
+    assert (busiest["channel"], busiest["rolls"], busiest["hit_rate"], busiest["claimed"]) == (1, 10, 0.5, 1)
+    assert busiest["kakera_total"] == 550 and busiest["kakera_p50"] == pytest.approx(55.0)
+    assert (quiet["channel"], quiet["rolls"], quiet["kakera_total"]) == (2, 3, 300)
+    assert hist.stats(since=2000.0) == []
@@ -0,0 +1,129 @@
+"""WatchlistJournal load / catch_up over an in-memory channel."""
+import asyncio
+import itertools
+
+import discord
+
+from journal import ADD, REMOVE, SNAPSHOT_FILENAME, SNAPSHOT_MARKER, WatchlistJournal
+
+_ids = itertools.count(1000)
+
+
+class Attachment:
+    def __init__(self, data: bytes | None):
+        self.filename = SNAPSHOT_FILENAME
+        self._data = data
+
+    async def read(self) -> bytes:
+        if self._data is None:
+            raise discord.HTTPException(_Response(), "gone")
+        return self._data
+
+
+class _Response:
+    status = 404
+    reason = "gone"
+
+
+class Message:
+    def __init__(self, content: str, attachments=()):
+        self.id = next(_ids)
+        self.content = content
+        self.attachments = list(attachments)
+
+
+class Channel:
+    def __init__(self):
+        self.messages: list[Message] = []
+
+    def post(self, content: str, attachments=()) -> Message:
+        self.messages.append(Message(content, attachments))
+        return self.messages[-1]
+
+    def snapshot(self, entries: list[str] | None) -> Message:
+        data = None if entries is None else "\n".join(entries).encode()
+        return self.post(f"{SNAPSHOT_MARKER} (n entries)", [Attachment(data)])
+
+    async def send(self, content: str = "", file=None) -> Message:
+        return self.post(content, [Attachment(file.fp.read())] if file else [])
+
+    async def history(self, limit=None, after=None, oldest_first=None):
+        if oldest_first is None:
+            oldest_first = after is not None
+        messages = self.messages if oldest_first else self.messages[::-1]
+        for msg in messages:
+            if after is None or msg.id > after.id:
+                yield msg
+
+
+def load(channel):
+    journal = WatchlistJournal()
+    watchlist, newest = asyncio.run(journal.load(channel))
+    return journal, watchlist, newest
+
+
+def test_load_replays_records_after_the_latest_snapshot():
+    channel = Channel()
+    channel.post("Old One")  # legacy plain line, before the snapshot: not read
+    channel.snapshot(["Rem", "Emilia"])
+    channel.post("+ Ram\n+ Beatrice")
+    last = channel.post("- Emilia")
+    journal, watchlist, newest = load(channel)
+    assert watchlist.entries() == ["Rem", "Ram", "Beatrice"]
+    assert newest == last.id
+    assert journal.records == 2
+
+
+def test_legacy_channel_loads_as_adds():
+    channel = Channel()
+    channel.post("Rem | Remu")
+    channel.post("Emilia")
+    _, watchlist, _ = load(channel)
+    assert watchlist.entries() == ["Rem | Remu", "Emilia"]
+
+
+def test_unreadable_snapshot_falls_back_to_the_previous_one():
+    for broken in (None, "missing"):
+        channel = Channel()
+        channel.snapshot(["Rem"])
+        channel.post("+ Emilia")
+        if broken == "missing":
+            channel.post(f"{SNAPSHOT_MARKER} (2 entries)")
+        else:
+            channel.snapshot(None)
+        channel.post("+ Ram")
+        journal, watchlist, _ = load(channel)
+        assert watchlist.entries() == ["Rem", "Emilia", "Ram"]
+        assert journal.records == 2
+
+
+def test_unreadable_only_snapshot_replays_the_whole_channel():
+    channel = Channel()
+    channel.post("+ Rem")
+    channel.snapshot(None)
+    channel.post("+ Ram")
+    _, watchlist, _ = load(channel)
+    assert watchlist.entries() == ["Rem", "Ram"]
+
+
+def test_catch_up_applies_newer_messages():
+    async def run():
+        channel = Channel()
+        journal = WatchlistJournal()
+        await journal.append(channel, ADD, ["Rem", "Emilia"])
+        watchlist, synced = await journal.load(channel)
+
+        await journal.append(channel, REMOVE, ["Emilia"])
+        await journal.append(channel, ADD, ["Ram"])
+        synced = await journal.catch_up(channel, watchlist, synced)
+        assert watchlist.entries() == ["Rem", "Ram"]
+        assert synced == channel.messages[-1].id
+
+        await journal.snapshot(channel, watchlist)
+        channel.snapshot(None)  # a broken snapshot keeps the replayed list
+        channel.post("+ Beatrice")
+        synced = await journal.catch_up(channel, watchlist, synced)
+        assert watchlist.entries() == ["Rem", "Ram", "Beatrice"]
+        assert synced == channel.messages[-1].id
+        assert (await journal.load(channel))[0].entries() == watchlist.entries()
+    asyncio.run(run())
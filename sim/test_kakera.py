@@ -0,0 +1,95 @@
+"""Kakera reaction engine: power projection, value threshold and click decisions."""
+from kakera import CLICK, DEFAULT_VALUES, LOW_VALUE, NO_POWER, OUTBID, POWER_REGEN, KakeraEngine, PowerPool
+
+POOL = 1
+
+
+def busy_engine(power: float, consumption: float = 40, now: float = 1140.0) -> KakeraEngine:
+    """A pool that saw 20 buttons a minute apart: 19 purple ones and one light."""
+    engine = KakeraEngine()
+    for i in range(20):
+        engine.seen(POOL, "kakeral" if i == 7 else "kakerap", now=i * 60.0)
+    engine.sync(POOL, power, consumption, now=now)
+    return engine
+
+
+def test_power_projection_regenerates_to_cap():
+    pool = PowerPool()
+    assert not pool.known
+    pool.consumption = 40.0
+    pool.set(10.0, now=0.0)
+    assert pool.project(POWER_REGEN * 5) == 15.0
+    assert pool.project(POWER_REGEN * 500) == 100.0
+
+
+def test_can_react_needs_a_tu_reading():
+    engine = KakeraEngine()
+    assert engine.can_react(POOL, now=0.0) is None
+    engine.sync(POOL, 30, 40, now=0.0)
+    assert engine.can_react(POOL, now=0.0) is False
+    assert engine.can_react(POOL, now=POWER_REGEN * 10) is True
+    engine.sync(POOL, None, 20, now=0.0)  # consumption only: power is kept
+    assert engine.can_react(POOL, now=0.0) is True
+
+
+def test_decide_without_power_reading_clicks():
+    engine = KakeraEngine()
+    engine.offer(POOL, 1, "kakerap")
+    assert engine.decide(POOL, 1, now=0.0) == CLICK
+
+
+def test_decide_spends_power_locally():
+    engine = KakeraEngine()
+    engine.sync(POOL, 90, 40, now=0.0)
+    for mid in (1, 2, 3):
+        engine.offer(POOL, mid, "kakerap")
+    assert [engine.decide(POOL, mid, now=0.0) for mid in (1, 2, 3)] == [CLICK, CLICK, NO_POWER]
+    assert engine.can_react(POOL, now=0.0) is False
+
+
+def test_better_pending_button_outbids():
+    engine = KakeraEngine()
+    engine.sync(POOL, 50, 40, now=0.0)
+    engine.offer(POOL, 1, "kakerap")
+    engine.offer(POOL, 2, "kakeraw")
+    assert engine.decide(POOL, 1, now=0.0) == OUTBID
+    assert engine.decide(POOL, 2, now=0.0) == CLICK
+
+
+def test_threshold_needs_samples_and_power_reading():
+    engine = KakeraEngine()
+    assert engine.threshold(POOL, now=0.0) == 0.0
+    engine.sync(POOL, 50, 40, now=0.0)
+    engine.seen(POOL, "kakerap", now=0.0)
+    assert engine.threshold(POOL, now=0.0) == 0.0
+
+
+def test_threshold_saves_scarce_power_for_the_best_buttons():
+    engine = busy_engine(power=50)
+    assert engine.threshold(POOL, now=1140.0) == DEFAULT_VALUES["kakeral"]
+    engine.offer(POOL, 1, "kakerap")
+    assert engine.decide(POOL, 1, now=1140.0) == LOW_VALUE
+    engine.offer(POOL, 2, "kakeral")
+    assert engine.decide(POOL, 2, now=1140.0) == CLICK
+
+
+def test_threshold_takes_anything_near_the_cap():
+    engine = busy_engine(power=99.9)
+    assert engine.threshold(POOL, now=1140.0) == 0.0
+
+
+def test_refused_and_earned_update_the_pool():
+    engine = KakeraEngine()
+    engine.sync(POOL, 80, 40, now=0.0)
+    engine.refused(POOL, now=0.0)
+    assert engine.can_react(POOL, now=0.0) is False
+    engine.earned(POOL, "kakerap", 200)
+    assert engine.value("kakerap") == 120.0
+    engine.earned(POOL, "kakeranew", 50)
+    assert engine.value("kakeranew") == 50.0
+
+
+def test_best_picks_most_valuable_button():
+    engine = KakeraEngine()
+    assert engine.best([]) is None
+    assert engine.best([("a", "kakerap"), ("b", "kakeraw"), ("c", "kakerao")]) == ("b", "kakeraw")
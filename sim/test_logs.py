@@ -0,0 +1,37 @@
+"""Log pipeline queue handling and lazy message formatting."""
+import io
+import json
+
+from logs import DEBUG, INFO, Logger, LogPipeline, pipeline as shared
+
+
+def test_resize_after_start_keeps_writing():
+    pipeline = LogPipeline(maxsize=100)
+    pipeline.stream = io.StringIO()
+    pipeline.emit("test", INFO, "before", (), {})
+    pipeline.flush(1)
+    pipeline.configure(maxsize=3)  # the writer thread is running
+    for i in range(3):
+        pipeline.emit("test", INFO, "after %d", (i,), {})
+    pipeline.flush(1)
+    assert pipeline._queue.unfinished_tasks == 0
+    lines = pipeline.stream.getvalue()
+    assert "before" in lines and "after 2" in lines
+
+
+def test_format_applies_args_and_fields():
+    pipeline = LogPipeline()
+    record = json.loads(pipeline._format(0.0, INFO, "roll", "rolled %s (%d)", ("Rem", 120), {"channel": "a"}))
+    assert (record["msg"], record["channel"]) == ("rolled Rem (120)", "a")
+    assert json.loads(pipeline._format(0.0, INFO, "roll", "100%", (), {}))["msg"] == "100%"
+    assert "'x'" in json.loads(pipeline._format(0.0, INFO, "roll", "%d", ("x",), {}))["msg"]
+
+
+def test_disabled_level_is_not_queued(monkeypatch):
+    emitted = []
+    monkeypatch.setattr(shared, "emit", lambda *record: emitted.append(record))
+    monkeypatch.setattr(shared, "levels", {"test": INFO})
+    logger = Logger("test")
+    logger.debug("%s", object())
+    logger.info("rolled %s", "Rem", channel="a")
+    assert emitted == [("test", INFO, "rolled %s", ("Rem",), {"channel": "a"})]
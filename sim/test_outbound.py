@@ -0,0 +1,137 @@
+"""Outbox ordering, dedup, retries, cancellation and shutdown."""
+import asyncio
+import io
+import random
+
+import discord
+import pytest
+
+import outbound
+from outbound import CRITICAL, OWNER, REFRESH, ROLL, Outbox
+
+
+class Channel:
+    def __init__(self, channel_id: int, delay: float = 0.0, failures: int = 0):
+        self.id = channel_id
+        self.name = str(channel_id)
+        self.delay = delay
+        self.failures = failures  # sends answered with a 429 first
+        self.attempts = 0
+        self.sent = []
+
+    async def send(self, content: str, **kwargs):
+        self.attempts += 1
+        await asyncio.sleep(self.delay() if callable(self.delay) else self.delay)
+        if self.failures:
+            self.failures -= 1
+            raise discord.HTTPException(_Response(429), "rate limited")
+        self.sent.append(content)
+        return content
+
+
+class _Response:
+    def __init__(self, status: int):
+        self.status = status
+        self.reason = "test"
+
+
+def test_priority_order_within_a_channel():
+    async def run():
+        outbox = Outbox(rate=1000, burst=1000, channel_rate=1000, channel_burst=1)
+        channel = Channel(1)
+        sends = [asyncio.create_task(outbox.send(channel, content, priority=priority))
+                 for content, priority in (("owner", OWNER), ("$wa", ROLL), ("$tu", REFRESH), ("$rt", CRITICAL))]
+        await asyncio.gather(*sends)
+        return channel.sent
+    assert asyncio.run(run()) == ["$rt", "$wa", "$tu", "owner"]
+
+
+def test_one_send_in_flight_per_channel_keeps_the_order():
+    async def run():
+        outbox = Outbox(rate=1000, burst=1000, channel_rate=1000, channel_burst=100)
+        rng = random.Random(1)
+        channel = Channel(1, delay=lambda: rng.uniform(0, 0.005))
+        await asyncio.gather(*(outbox.send(channel, f"$wa {i}") for i in range(20)))
+        return channel.sent
+    assert asyncio.run(run()) == [f"$wa {i}" for i in range(20)]
+
+
+def test_rate_limited_send_is_retried_before_the_next_one(monkeypatch):
+    monkeypatch.setattr(outbound, "_retry_delay", lambda exc, attempt: 0.001)
+
+    async def run():
+        outbox = Outbox(rate=1000, burst=1000, channel_rate=1000, channel_burst=100)
+        channel = Channel(1, failures=2)
+        await asyncio.gather(outbox.send(channel, "$rt", priority=CRITICAL), outbox.send(channel, "$wa"))
+        return channel
+    channel = asyncio.run(run())
+    assert channel.sent == ["$rt", "$wa"]
+    assert channel.attempts == 4
+
+
+def test_file_sends_are_not_retried(monkeypatch):
+    monkeypatch.setattr(outbound, "_retry_delay", lambda exc, attempt: 0.001)
+
+    async def run():
+        outbox = Outbox(rate=1000, burst=1000, channel_rate=1000, channel_burst=100)
+        channel = Channel(1, failures=1)
+        with pytest.raises(discord.HTTPException):
+            await outbox.send(channel, "snapshot", priority=OWNER, file=discord.File(io.BytesIO(b"Rem"), filename="w.txt"))
+        assert await outbox.send(channel, "after") == "after"
+        return channel
+    assert asyncio.run(run()).attempts == 2
+
+
+def test_blocked_channel_does_not_hold_up_others():
+    async def run():
+        outbox = Outbox(rate=1000, burst=1000, channel_rate=0.01, channel_burst=1)
+        slow, fast = Channel(1), Channel(2)
+        await outbox.send(slow, "first")
+        blocked = asyncio.create_task(outbox.send(slow, "second", priority=CRITICAL))
+        assert await asyncio.wait_for(outbox.send(fast, "other", priority=OWNER), 1) == "other"
+        assert not blocked.done()
+        await outbox.close()
+        with pytest.raises(asyncio.CancelledError):
+            await blocked
+    asyncio.run(run())
+
+
+def test_dedup_coalesces_and_drops_only_when_every_sender_is_gone():
+    async def run():
+        outbox = Outbox(rate=1000, burst=1000, channel_rate=0.01, channel_burst=1)
+        channel = Channel(1)
+        await outbox.send(channel, "$wa")  # empties the channel bucket
+        first = asyncio.create_task(outbox.send(channel, "$tu", priority=REFRESH, dedup_key="tu"))
+        second = asyncio.create_task(outbox.send(channel, "$tu", priority=REFRESH, dedup_key="tu"))
+        await asyncio.sleep(0)
+        assert outbox.queued() == 1
+        first.cancel()
+        await asyncio.sleep(0)
+        assert outbox.queued() == 1  # `second` still waits for it
+        second.cancel()
+        await asyncio.sleep(0)
+        assert outbox.queued() == 0
+        # a new request with the key is queued afresh, not merged into the dropped one
+        third = asyncio.create_task(outbox.send(channel, "$tu", priority=REFRESH, dedup_key="tu"))
+        await asyncio.sleep(0)
+        assert outbox.queued() == 1
+        await outbox.close()
+        with pytest.raises(asyncio.CancelledError):
+            await third
+        assert channel.sent == ["$wa"]
+    asyncio.run(run())
+
+
+def test_close_cancels_deliveries_and_the_pump():
+    async def run():
+        outbox = Outbox(rate=1000, burst=1000, channel_rate=1000, channel_burst=10)
+        channel = Channel(1, delay=60)
+        sends = [asyncio.create_task(outbox.send(channel, f"$wa {i}")) for i in range(3)]
+        await asyncio.sleep(0.01)
+        assert len(outbox._deliveries) == 1 and outbox.queued() == 2  # one send in flight per channel
+        await outbox.close()
+        results = await asyncio.gather(*sends, return_exceptions=True)
+        assert all(isinstance(result, asyncio.CancelledError) for result in results)
+        assert not outbox._deliveries and outbox._pump_task is None
+        assert channel.sent == []
+    asyncio.run(run())
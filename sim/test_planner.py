@@ -0,0 +1,83 @@
+"""Which roll embeds the planner credits to our roll commands."""
+from planner import PENDING_TTL, WANTED_VALUE, RollPlanner, roll_value
+from policy import Decision
+from state import ChannelState
+
+ME, OTHER = 1, 2
+CHANNEL = 10
+CLAIM = Decision(True, 1, "watchlist", use_rt=True)
+SKIP = Decision(False, None, "below")
+
+
+def planner() -> RollPlanner:
+    planner = RollPlanner(["$wa", "$ha"])
+    planner.self_id = ME
+    return planner
+
+
+def test_our_text_roll_is_credited():
+    p = planner()
+    p.sent(CHANNEL, "$ha", now=0.0)
+    p.command_seen(CHANNEL, ME, "$ha")
+    assert p.observe(CHANNEL, 120, CLAIM, now=1.5) == "$ha"
+    stats = p._command(CHANNEL, "$ha")
+    assert (stats.rolls, stats.hit_rate, stats.latency) == (1, 1.0, 1.5)
+
+
+def test_other_users_roll_is_skipped():
+    p = planner()
+    p.sent(CHANNEL, "$wa", now=0.0)
+    p.command_seen(CHANNEL, ME, "$wa")
+    p.command_seen(CHANNEL, OTHER, "$wa")
+    p.command_seen(CHANNEL, OTHER, "hello")  # chat is not a roll command
+    assert p.observe(CHANNEL, 500, CLAIM, now=1.0) is None
+    assert p.overall.rolls == 0
+    p.command_seen(CHANNEL, ME, "$wa")
+    assert p.observe(CHANNEL, 50, SKIP, now=2.0) == "$wa"  # our pending command is still there
+
+
+def test_slash_roll_uses_the_interaction_user():
+    p = planner()
+    p.sent(CHANNEL, "$wa", now=0.0)
+    p.command_seen(CHANNEL, ME, "$wa")
+    assert p.observe(CHANNEL, 50, SKIP, now=1.0, requester=OTHER) is None
+    assert p.observe(CHANNEL, 50, SKIP, now=1.0, requester=ME) == "$wa"
+
+
+def test_nothing_pending_or_expired():
+    p = planner()
+    p.command_seen(CHANNEL, ME, "$wa")
+    assert p.observe(CHANNEL, 50, SKIP, now=0.0) is None
+    p.sent(CHANNEL, "$wa", now=0.0)
+    assert p.observe(CHANNEL, 50, SKIP, now=PENDING_TTL + 1) is None
+
+
+def test_roll_value():
+    assert roll_value(Decision(True, 1, "watchlist", use_rt=True), 120) == (WANTED_VALUE, WANTED_VALUE)
+    assert roll_value(Decision(True, 3, "kakera"), 300) == (300, 0)
+    assert roll_value(Decision(True, 3, "kakera"), 300, owned=True) == (0, 0)
+    assert roll_value(SKIP, 300) == (0, 0)
+
+
+def test_choose_command_prefers_the_better_one():
+    p = planner()
+    for i in range(200):
+        for command, kakera in (("$wa", 400), ("$ha", 40)):
+            p.sent(CHANNEL, command, now=i)
+            p.command_seen(CHANNEL, ME, command)
+            p.observe(CHANNEL, kakera, Decision(True, 3, "kakera"), now=i + 0.5)
+    assert p.choose_command(CHANNEL) == "$wa"
+    assert p.channel_value(CHANNEL, None) > 0  # unknown state: assume a claim is available
+    assert p.channel_value(CHANNEL, ChannelState()) == 0  # claim and $rt both on cooldown
+    # nothing was worth a $rt, so a channel that can only $rt has nothing to roll for
+    assert p.channel_value(CHANNEL, ChannelState(rt_available=True)) == 0
+
+
+def test_persisted_statistics_round_trip():
+    p = planner()
+    p.sent(CHANNEL, "$wa", now=0.0)
+    p.command_seen(CHANNEL, ME, "$wa")
+    p.observe(CHANNEL, 120, CLAIM, now=1.0)
+    restored = RollPlanner(["$wa", "$ha"])
+    restored.load_dict(p.to_dict())
+    assert restored.to_dict() == p.to_dict()
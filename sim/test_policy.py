@@ -0,0 +1,88 @@
+"""Claim policy compilation and per-roll decisions."""
+from pathlib import Path
+
+import pytest
+
+from policy import (BELOW, BLOCKED, CHARACTER, KAKERA, SERIES, SERIES_KAKERA, WATCHLIST, PolicyError,
+                    compile_policy, load_policy, roll_series)
+from watchlist import WatchMatch
+
+CHANNEL, OTHER = 1163895503143043135, 42
+
+POLICY = compile_policy({
+    "default": {"min_kakera": 200, "watchlist_tier": 1, "kakera_tier": 3, "rt_max_tier": 2},
+    "channels": {str(CHANNEL): {"min_kakera": 500}},
+    "series": [
+        {"name": "Re:Zero", "tier": 2},
+        {"name": "Naruto", "min_kakera": 100},
+        {"name": "Boku no Hero Academia", "never": True},
+    ],
+    "characters": [{"name": "Rem", "tier": 1}, {"name": "Subaru", "tier": 4}],
+})
+HIT = WatchMatch("Emilia", "alias")
+
+
+@pytest.mark.parametrize("channel, character, series, kakera, hit, claim, tier, reason, use_rt", [
+    # character rules win over everything, watchlisted or not
+    (OTHER, "Rem", "Re:Zero", 0, None, True, 1, CHARACTER, True),
+    (OTHER, "subaru", "Re:Zero", 0, HIT, True, 4, CHARACTER, False),
+    # then the watchlist, even for a blocked series
+    (OTHER, "Emilia", "Boku no Hero Academia", 0, HIT, True, 1, WATCHLIST, True),
+    # series rules
+    (OTHER, "Ram", "Re:Zero", 0, None, True, 2, SERIES, True),
+    (OTHER, "Naruto", "Naruto", 100, None, True, 3, SERIES_KAKERA, False),
+    (OTHER, "Sakura", "Naruto", 99, None, False, None, BELOW, False),
+    (OTHER, "Deku", "Boku no Hero Academia", 10_000, None, False, None, BLOCKED, False),
+    # channel threshold, then the default one
+    (CHANNEL, "Nobody", "Unknown", 499, None, False, None, BELOW, False),
+    (CHANNEL, "Nobody", "Unknown", 500, None, True, 3, KAKERA, False),
+    (OTHER, "Nobody", "Unknown", 200, None, True, 3, KAKERA, False),
+    (OTHER, "Nobody", "", 199, None, False, None, BELOW, False),
+])
+def test_decide(channel, character, series, kakera, hit, claim, tier, reason, use_rt):
+    decision = POLICY.decide(channel, character, series, kakera, hit)
+    assert (decision.claim, decision.tier, decision.reason, decision.use_rt) == (claim, tier, reason, use_rt)
+
+
+@pytest.mark.parametrize("rt_max_tier, tier, use_rt", [(1, 1, True), (1, 2, False), (3, 3, True), (0, 1, False)])
+def test_rt_max_tier_gates_rt(rt_max_tier, tier, use_rt):
+    policy = compile_policy({"default": {"rt_max_tier": rt_max_tier}, "characters": [{"name": "Rem", "tier": tier}]})
+    assert policy.decide(OTHER, "Rem", "", 0, None).use_rt is use_rt
+
+
+def test_defaults_keep_the_old_behaviour():
+    policy = compile_policy({}, min_kakera=300)
+    assert policy.decide(OTHER, "Emilia", "", 0, HIT).use_rt
+    assert policy.decide(OTHER, "x", "", 300, None).reason == KAKERA
+    assert not policy.decide(OTHER, "x", "", 300, None).use_rt
+    assert policy.decide(OTHER, "x", "", 299, None).reason == BELOW
+
+
+def test_describe():
+    assert POLICY.decide(OTHER, "Emilia", "", 0, HIT).describe() == "watchlist (alias → Emilia), tier 1"
+    assert POLICY.decide(OTHER, "x", "", 250, None).describe() == "kakera (250 ≥ 200), tier 3"
+    assert POLICY.decide(OTHER, "x", "", 0, None).describe() == BELOW
+
+
+@pytest.mark.parametrize("data, message", [
+    ({"bogus": {}}, "unknown keys bogus"),
+    ({"default": {"min_kakera": "a lot"}}, "must be an integer"),
+    ({"default": {"rt_max_tier": True}}, "must be an integer"),
+    ({"channels": {"general": {"min_kakera": 1}}}, "channel ids"),
+    ({"series": [{"name": "Naruto"}]}, "needs `tier`"),
+    ({"series": [{"tier": 1}]}, "`name` is required"),
+    ({"series": [{"name": "Naruto", "never": "yes"}]}, "true or false"),
+    ({"characters": [{"name": "Rem"}]}, "`tier` is required"),
+])
+def test_invalid_policy(data, message):
+    with pytest.raises(PolicyError, match=message):
+        compile_policy(data)
+
+
+def test_shipped_policy_file_compiles():
+    assert load_policy(str(Path(__file__).parent.parent / "claim_policy.toml"), min_kakera=200).min_kakera == 200
+
+
+def test_roll_series():
+    assert roll_series("Re:Zero\n**120**<:kakera:469835869059153940>") == "Re:Zero"
+    assert roll_series("") == ""
@@ -0,0 +1,88 @@
+"""Roll embed extraction."""
+from types import SimpleNamespace
+
+from roll_event import extract, kakera_type
+
+ME = 42
+
+
+def emoji(name: str, id: int | None = None):
+    return SimpleNamespace(name=name, id=id)
+
+
+def button(e):
+    return SimpleNamespace(emoji=e)
+
+
+def roll(name: str | None = "Rem", description: str = "Re:Zero\n**175**<:kakera:469835869059153940>",
+         footer: str | None = None, buttons=None, content: str = "", interaction=None, embeds=True):
+    embed = SimpleNamespace(
+        author=SimpleNamespace(name=name) if name is not None else None,
+        description=description,
+        footer=SimpleNamespace(text=footer) if footer else None,
+    )
+    if buttons is None:
+        buttons = [button(emoji("💖"))]
+    return SimpleNamespace(
+        embeds=[embed] if embeds else [],
+        components=[SimpleNamespace(children=buttons)] if buttons else [],
+        content=content,
+        interaction=interaction,
+    )
+
+
+def test_unclaimed_roll():
+    heart = button(emoji("💖"))
+    event = extract(roll(buttons=[heart]))
+    assert event.name == "Rem"
+    assert event.series == "Re:Zero"
+    assert event.kakera == 175
+    assert event.owner is None and not event.owned
+    assert event.claim_button is heart
+    assert event.kakera_buttons == ()
+    assert event.requester is None
+
+
+def test_kakera_value_with_thousands_separator():
+    event = extract(roll(description="Re:Zero\n**1,204**<:kakera:469835869059153940>"))
+    assert event.kakera == 1204
+
+
+def test_owned_roll_with_kakera_crystal():
+    crystal = button(emoji("kakeraP", 609264156347990016))
+    event = extract(roll(footer="Belongs to someone", buttons=[crystal]))
+    assert event.owner == "someone" and event.owned
+    assert event.claim_button is None
+    assert event.kakera_buttons == ((crystal, "kakerap"),)
+
+
+def test_kakera_type_by_id_then_name():
+    assert kakera_type(emoji("whatever", 815961697918779422)) == "kakeral"
+    assert kakera_type(emoji("kakeraX", 1)) == "kakerax"
+    assert kakera_type(emoji("heart", 1)) is None
+    assert kakera_type(emoji("kakera")) is None  # unicode emoji never count as crystals
+
+
+def test_non_rolls_rejected():
+    assert extract(roll(embeds=False)) is None
+    assert extract(roll(buttons=[])) is None
+    assert extract(roll(name=None)) is None
+    assert extract(roll(name="")) is None
+
+
+def test_only_first_claim_heart_kept():
+    first, second = button(emoji("❤️")), button(emoji("💘"))
+    assert extract(roll(buttons=[button(None), first, second])).claim_button is first
+
+
+def test_wishes():
+    event = extract(roll(content="Wished by <@7>"), self_id=ME)
+    assert event.wished and not event.wished_by_me
+    event = extract(roll(content=f"Wished by <@7>, <@{ME}>"), self_id=ME)
+    assert event.wished and event.wished_by_me
+    assert not extract(roll(content=f"Wished by <@{ME}>")).wished_by_me  # self id unknown
+
+
+def test_requester_from_slash_command():
+    interaction = SimpleNamespace(user=SimpleNamespace(id=7))
+    assert extract(roll(interaction=interaction)).requester == 7
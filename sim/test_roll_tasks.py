@@ -0,0 +1,87 @@
+"""Roll handler registry: dedup, concurrency limit, stale cancellation and shutdown."""
+import asyncio
+
+from metrics import Metrics
+from roll_tasks import CLAIM, KAKERA, RollTasks
+
+
+def test_admit_dedups_message_ids():
+    tasks = RollTasks()
+    assert tasks.admit(1)
+    assert not tasks.admit(1)
+    assert tasks.admit(2)
+
+
+def test_limit_drops_extra_handlers():
+    async def run():
+        metrics = Metrics()
+        tasks = RollTasks(limit=2, metrics=metrics)
+        gate = asyncio.Event()
+        started = [tasks.start(mid, 1, CLAIM, gate.wait()) for mid in (1, 2, 3)]
+        assert started[0] is not None and started[1] is not None
+        assert started[2] is None
+        assert len(tasks) == 2
+        gate.set()
+        await asyncio.gather(*started[:2])
+        await asyncio.sleep(0)
+        assert len(tasks) == 0
+        return metrics.counters["roll.task_dropped"]
+
+    assert asyncio.run(run()) == 1
+
+
+def test_cancel_channel_spares_committed_and_other_kinds():
+    async def run():
+        tasks = RollTasks()
+        gate = asyncio.Event()
+        waiting = tasks.start(1, 10, CLAIM, gate.wait())
+        committed = tasks.start(2, 10, CLAIM, gate.wait())
+        kakera = tasks.start(3, 10, KAKERA, gate.wait())
+        other = tasks.start(4, 20, CLAIM, gate.wait())
+        kept = tasks.start(5, 10, CLAIM, gate.wait())
+        tasks.commit(2)
+        assert tasks.cancel_channel(10, CLAIM, keep=5) == 1
+        await asyncio.sleep(0)
+        assert waiting.cancelled()
+        assert not any(t.done() for t in (committed, kakera, other, kept))
+        gate.set()
+        await asyncio.gather(committed, kakera, other, kept)
+
+    asyncio.run(run())
+
+
+def test_switch_makes_handler_cancellable_again():
+    async def run():
+        tasks = RollTasks()
+        gate = asyncio.Event()
+        task = tasks.start(1, 10, CLAIM, gate.wait())
+        tasks.commit(1)
+        assert tasks.cancel_channel(10, CLAIM) == 0
+        tasks.switch(1, KAKERA)
+        assert tasks.cancel_channel(10, CLAIM) == 0
+        assert tasks.cancel_channel(10, KAKERA) == 1
+        await asyncio.sleep(0)
+        assert task.cancelled()
+
+    asyncio.run(run())
+
+
+def test_shutdown_cancels_waiting_and_lets_committed_finish():
+    async def run():
+        tasks = RollTasks()
+        finished = []
+
+        async def handler(mid):
+            await asyncio.sleep(0.01)
+            finished.append(mid)
+
+        waiting = tasks.start(1, 10, CLAIM, handler(1))
+        tasks.start(2, 10, CLAIM, handler(2))
+        tasks.commit(2)
+        await tasks.shutdown(grace=1.0)
+        assert waiting.cancelled()
+        assert finished == [2]
+        assert not tasks.admit(3)
+        assert tasks.start(3, 10, CLAIM, handler(3)) is None
+
+    asyncio.run(run())
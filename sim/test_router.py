@@ -0,0 +1,124 @@
+"""Reply classification and routing of Mudae text replies."""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from router import (CLAIM, EDIT, KAKERA, MARRIED, REFUSED, RT, TU, ReplyRouter, addressee, classify, footer_owner,
+                    kakera_earned)
+
+MUDAE = 432610292342587392
+ME = "kudo"
+NAMES = frozenset({"kudo", "kudo#0001", "kudosan"})  # USERNAME, account name, server nickname
+CHANNEL = 1
+
+
+def message(content: str, author: int = MUDAE, channel: int = CHANNEL):
+    return SimpleNamespace(author=SimpleNamespace(id=author), channel=SimpleNamespace(id=channel),
+                           content=content, embeds=[])
+
+
+def router() -> ReplyRouter:
+    router = ReplyRouter(MUDAE)
+    router.set_names("Kudo", "kudo#0001", "KudoSan", None)
+    return router
+
+
+@pytest.mark.parametrize("content, kind", [
+    (f"**{ME}**, you __can__ claim right now! The next claim reset is in **1h 18** min.", TU),
+    (f"**{ME}**, you can't claim for another **1h 18** min.\nYou have **10** rolls left.", TU),
+    ("**KudoSan**, you can't claim for another **1h 18** min.\nYou have **10** rolls left.", TU),
+    ("**someone**, you can't claim for another **1h 18** min.\nYou have **3** rolls left.", None),
+    (f"**{ME}2**, you have **3** rolls left. Next rolls reset in **18** min.", None),
+    (f"**someone**, you have **3** rolls left (asked by **{ME}**).", None),
+    (f"**{ME}**, you can't claim for another **1h 18** min.", CLAIM),
+    ("**someone**, you can't claim for another **1h 18** min.", None),
+    (f"**{ME}2**, you can't claim for another **1h 18** min.", None),
+    (f"💖 **{ME}** and **Rem** are now married! 💖", CLAIM),
+    (f"**{ME}** +175<:kakera:469835869059153940>", KAKERA),
+    (f"**{ME}2** +175<:kakera:469835869059153940>", RT),
+    (f"**{ME}**, you can't react to kakera for **1h 05** min.", KAKERA),
+    ("**someone**, you can't react to kakera for **1h 05** min.", RT),
+    (f"✅ **{ME}**, your claim timer has been reset! You can claim right now.", RT),
+    (f"**{ME}**, the cooldown of $rt is not over. Time left: **5h 02** min. ($rtu)", RT),
+])
+def test_classify(content, kind):
+    assert classify(content, NAMES) == kind
+
+
+def test_addressee():
+    assert addressee("**kudo**, you __can__ claim") == "kudo"
+    assert addressee("✅ **kudo**, your claim timer") is None
+    assert addressee("no name here") is None
+
+
+def test_kakera_earned():
+    assert kakera_earned("**kudo** +1,204<:kakera:469835869059153940>") == 1204
+    assert kakera_earned("**kudo**, you can't react to kakera for **1h 05** min.") is None
+
+
+def test_footer_owner():
+    assert footer_owner("Belongs to kudo") == "kudo"
+    assert footer_owner("Belongs to kudo ~~ 2/10") == "kudo"
+    assert footer_owner("1/10") is None
+    assert footer_owner(None) is None
+
+
+def test_refusal_goes_to_the_claim_not_a_tu_waiter():
+    async def run():
+        r = router()
+        with r.expect(CHANNEL, TU) as tu, r.expect_claim(CHANNEL, 99, "Rem") as claim:
+            assert not r.feed(message("**someone**, you can't claim for another **1h 18** min."))
+            assert not claim.future.done()
+            assert r.feed(message("**KudoSan**, you can't claim for another **1h 18** min."))
+            assert not tu.future.done()
+            outcome = claim.future.result()
+            assert (outcome.owner, outcome.source) == (None, REFUSED)
+    asyncio.run(run())
+
+
+def test_marriage_settles_the_claim_on_that_character():
+    async def run():
+        r = router()
+        with r.expect_claim(CHANNEL, 1, "Emilia") as other, r.expect_claim(CHANNEL, 2, "Rem") as claim:
+            assert r.feed(message(f"💖 **someone** and **Rem** are now married! 💖"))
+            assert (claim.future.result().owner, claim.future.result().source) == ("someone", MARRIED)
+            assert not other.future.done()
+        assert r.pending() == 0
+    asyncio.run(run())
+
+
+def test_embed_edit_settles_the_claim_by_message_id():
+    async def run():
+        r = router()
+        with r.expect_claim(CHANNEL, 7, "Rem") as claim:
+            assert not r.feed_edit(8, MUDAE, "Belongs to kudo")
+            assert not r.feed_edit(7, 123, "Belongs to kudo")
+            assert not r.feed_edit(7, MUDAE, "1/10")
+            assert r.feed_edit(7, MUDAE, "Belongs to KudoSan ~~ 1/10")
+            outcome = claim.future.result()
+            assert r.is_me(outcome.owner) and outcome.source == EDIT
+    asyncio.run(run())
+
+
+def test_tu_waiter_takes_only_our_tu():
+    async def run():
+        r = router()
+        with r.expect(CHANNEL, TU) as tu:
+            assert not r.feed(message("**someone**, you have **3** rolls left. Next rolls reset in **18** min."))
+            assert not r.feed(message(f"**{ME}2**, you have **3** rolls left. Next rolls reset in **18** min."))
+            assert not tu.future.done()
+            ours = message("**KudoSan**, you have **10** rolls left. Next rolls reset in **18** min.")
+            assert r.feed(ours)
+            assert await tu.wait(1) is ours
+        assert r.pending() == 0
+    asyncio.run(run())
+
+
+def test_other_authors_and_channels_are_ignored():
+    async def run():
+        r = router()
+        with r.expect(CHANNEL, RT):
+            assert not r.feed(message("hello", author=123))
+            assert not r.feed(message("hello", channel=CHANNEL + 1))
+    asyncio.run(run())
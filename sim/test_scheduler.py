@@ -0,0 +1,111 @@
+"""Dispatch order of the per-channel scheduler."""
+import asyncio
+import time
+
+from scheduler import Scheduler
+
+
+def dispatch(scheduler: Scheduler, arm, expected: int) -> list[tuple[int, str]]:
+    """Arm entries, run the scheduler until `expected` handler calls, return them in order."""
+    calls = []
+
+    async def handler(channel_id, kind):
+        calls.append((channel_id, kind))
+        return None
+
+    async def run():
+        arm(time.monotonic())
+        task = asyncio.create_task(scheduler.run(handler, should_stop=lambda: len(calls) >= expected))
+        for _ in range(200):
+            if len(calls) >= expected:
+                break
+            await asyncio.sleep(0.005)
+        await scheduler.stop()
+        await task
+    asyncio.run(run())
+    return calls
+
+
+def test_earliest_entry_runs_first():
+    scheduler = Scheduler(max_workers=1)
+
+    def arm(now):
+        scheduler.arm(3, now - 1, "roll")
+        scheduler.arm(1, now - 3, "roll")
+        scheduler.arm(2, now - 2, "refresh")
+    assert dispatch(scheduler, arm, 3) == [(1, "roll"), (2, "refresh"), (3, "roll")]
+
+
+def test_rearm_keeps_the_earlier_time():
+    scheduler = Scheduler(max_workers=1)
+
+    def arm(now):
+        scheduler.arm(1, now - 1, "roll")
+        scheduler.arm(2, now - 2, "roll")
+        scheduler.arm(1, now - 3, "refresh")  # earlier: replaces
+        scheduler.arm(2, now + 60, "refresh")  # later: ignored
+    assert dispatch(scheduler, arm, 2) == [(1, "refresh"), (2, "roll")]
+
+
+def test_rank_picks_the_best_due_entry():
+    ranks = {1: 1.0, 2: 5.0, 3: 3.0}
+    scheduler = Scheduler(max_workers=1, rank=lambda channel_id, kind: ranks[channel_id])
+
+    def arm(now):
+        for channel_id in ranks:
+            scheduler.arm(channel_id, now - channel_id, "roll")
+    assert [channel_id for channel_id, _ in dispatch(scheduler, arm, 3)] == [2, 3, 1]
+
+
+def test_disarmed_channel_does_not_run():
+    scheduler = Scheduler(max_workers=1)
+
+    def arm(now):
+        scheduler.arm(1, now - 2, "roll")
+        scheduler.arm(2, now - 1, "roll")
+        scheduler.disarm(1)
+    assert dispatch(scheduler, arm, 1) == [(2, "roll")]
+    assert scheduler.next_ready() is None
+
+
+def test_own_session_rearm_does_not_run_it_again():
+    scheduler = Scheduler(max_workers=2)
+    calls = []
+
+    async def handler(channel_id, kind):
+        calls.append((channel_id, kind))
+        if len(calls) == 1:
+            scheduler.arm_now(channel_id, "roll")  # e.g. a $tu inside the session
+            await asyncio.sleep(0.02)
+        return None
+
+    async def run():
+        scheduler.arm_now(1, "refresh")
+        task = asyncio.create_task(scheduler.run(handler))
+        await asyncio.sleep(0.1)
+        await scheduler.stop()
+        await task
+    asyncio.run(run())
+    assert calls == [(1, "refresh")]
+
+
+def test_rearm_from_elsewhere_runs_after_the_session():
+    scheduler = Scheduler(max_workers=2)
+    calls = []
+
+    async def handler(channel_id, kind):
+        calls.append((channel_id, kind))
+        if len(calls) == 1:
+            await asyncio.sleep(0.02)
+        return None
+
+    async def run():
+        scheduler.arm_now(1, "refresh")
+        task = asyncio.create_task(scheduler.run(handler))
+        await asyncio.sleep(0.005)
+        scheduler.arm_now(1, "roll")  # e.g. a claim handler while the session runs
+        await asyncio.sleep(0.1)
+        await scheduler.stop()
+        await task
+    asyncio.run(run())
+    assert calls == [(1, "refresh"), (1, "roll")]
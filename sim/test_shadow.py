@@ -0,0 +1,120 @@
+"""Shadow mode: pretended spends laid over `$tu`, candidate comparison, and a dry run that sends nothing."""
+import pytest
+
+from policy import PolicyError, compile_policy
+from roll_event import RollEvent
+from shadow import CLAIM, DIFF_CLAIM, DIFF_KAKERA, DIFF_RT, ROLL, Shadow, load_candidate
+from sim.mudae import SimConfig
+from sim.runner import run
+from state import ChannelState
+
+CHANNEL = 1
+LIVE = compile_policy({"default": {"min_kakera": 200, "kakera_tier": 3, "rt_max_tier": 3}})
+CANDIDATE = compile_policy({"default": {"min_kakera": 500, "kakera_tier": 3, "rt_max_tier": 2}})
+
+
+def fresh_state(**timers) -> ChannelState:
+    """A state as a `$tu` reports it: claim and $rt ready, 10 rolls."""
+    values = {"claim_available": True, "claim_reset_at": 3600.0, "rolls_left": 10, "rolls_reset_at": 1800.0,
+              "rt_available": True}
+    return ChannelState(fetched_at=0.0, **(values | timers))
+
+
+def event(kakera: int, name: str = "Nobody") -> RollEvent:
+    return RollEvent(name=name, series="Unknown", kakera=kakera, owner=None, wished=False, wished_by_me=False,
+                     claim_button=object(), kakera_buttons=())
+
+
+def test_overlay_keeps_pretended_claim_until_its_reset():
+    shadow = Shadow()
+    shadow.spend_claim(CHANNEL, claim_reset_at=3600.0, now=0.0)
+    state = fresh_state()
+    shadow.overlay(CHANNEL, state, now=10.0)
+    assert not state.claim_available and state.claim_reset_at == 3600.0
+    state = fresh_state(claim_reset_at=7200.0)
+    shadow.overlay(CHANNEL, state, now=3600.0)
+    assert state.claim_available  # Mudae's reset gave it back
+
+
+def test_overlay_learns_unknown_claim_reset_from_tu():
+    shadow = Shadow()
+    shadow.spend_claim(CHANNEL, claim_reset_at=None, now=0.0)
+    state = fresh_state(claim_reset_at=900.0)
+    shadow.overlay(CHANNEL, state, now=10.0)
+    assert not state.claim_available and state.claim_reset_at == 900.0
+
+
+def test_overlay_counts_pretended_rolls_until_reset():
+    shadow = Shadow()
+    for _ in range(3):
+        shadow.spend_roll(CHANNEL, rolls_reset_at=1800.0, now=0.0)
+    state = fresh_state()
+    shadow.overlay(CHANNEL, state, now=10.0)
+    assert state.rolls_left == 7
+    shadow.spend_roll(CHANNEL, rolls_reset_at=3600.0, now=1800.0)  # the rolls reset in between
+    state = fresh_state()
+    shadow.overlay(CHANNEL, state, now=1810.0)
+    assert state.rolls_left == 9
+
+
+def test_overlay_keeps_rt_spent_until_reset():
+    shadow = Shadow()
+    shadow.spend_rt(CHANNEL)
+    state = fresh_state()
+    shadow.overlay(CHANNEL, state, now=10 ** 6)
+    assert not state.rt_available and state.rt_ready_at is None
+    shadow.reset()
+    state = fresh_state()
+    shadow.overlay(CHANNEL, state, now=10.0)
+    assert state.rt_available and state.claim_available and state.rolls_left == 10
+
+
+def test_overlay_without_spends_changes_nothing():
+    state = fresh_state()
+    Shadow().overlay(CHANNEL, state, now=10.0)
+    assert state == fresh_state()
+
+
+def test_compare_records_differences():
+    shadow = Shadow(candidate=CANDIDATE)
+    roll = event(300)
+    live = LIVE.decide(CHANNEL, roll.name, roll.series, roll.kakera, None)
+    candidate = shadow.compare(CHANNEL, "general", roll, None, live, "kakerap", "kakerap")
+    assert live.claim and not candidate.claim
+    roll = event(600)
+    live = LIVE.decide(CHANNEL, roll.name, roll.series, roll.kakera, None)
+    shadow.compare(CHANNEL, "general", roll, None, live, "kakerap", None)
+    assert shadow.compared == 2
+    assert shadow.diff_counts == {DIFF_CLAIM: 1, DIFF_RT: 1, DIFF_KAKERA: 1}
+    assert shadow.claims == {"live": 2, "candidate": 1}
+    assert shadow.claimed_kakera == {"live": 900, "candidate": 600}
+    assert [d.kind for d in shadow.differences] == [DIFF_CLAIM, DIFF_RT, DIFF_KAKERA]
+
+
+def test_compare_without_candidate_is_a_no_op():
+    shadow = Shadow()
+    roll = event(300)
+    assert shadow.compare(CHANNEL, "general", roll, None, LIVE.decide(CHANNEL, roll.name, "", 300, None)) is None
+    assert shadow.compared == 0
+
+
+def test_actions_are_recorded_but_rolls_only_counted():
+    shadow = Shadow()
+    shadow.action(ROLL, "general", "$wa")
+    shadow.action(CLAIM, "general", "Rem", latency=0.002)
+    assert shadow.action_counts == {ROLL: 1, CLAIM: 1}
+    assert [a.action for a in shadow.actions] == [CLAIM]
+
+
+def test_missing_candidate_file_is_an_error(tmp_path):
+    assert load_candidate("") is None
+    with pytest.raises(PolicyError, match="no such file"):
+        load_candidate(str(tmp_path / "missing.toml"))
+
+
+def test_dry_run_never_acts():
+    report = run(SimConfig(channels=2, hours=2, seed=3), {"SHADOW_MODE": "true"})
+    assert report["errors"] == 0, report["error_details"]
+    assert report["tu"] > 0
+    assert report["rolls"] == report["rt"] == report["claims"] == report["kakera_clicks"] == 0
+    assert report["sends"] == report["tu"]  # nothing but $tu went out
@@ -0,0 +1,18 @@
+"""End-to-end: the real client against the scripted Mudae."""
+from sim.mudae import SimConfig
+from sim.runner import run
+
+
+def test_simulated_hours_run_clean():
+    report = run(SimConfig(channels=2, hours=2, seed=3))
+    assert report["errors"] == 0, report["error_details"]
+    assert report["rolls"] > 0
+    assert report["wanted_rolled"] == 0 or report["wanted_claimed"] <= report["wanted_rolled"]
+
+
+def test_same_seed_same_run():
+    config = SimConfig(channels=2, hours=1, seed=5)
+    first, second = run(config), run(config)
+    for report in (first, second):
+        report.pop("wall_seconds"), report.pop("speedup")
+    assert first == second
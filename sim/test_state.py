@@ -0,0 +1,83 @@
+"""ChannelState: deadlines from a `$tu` report and what they project."""
+import json
+import os
+
+import pytest
+
+from state import ChannelState
+from tu_parser import parse_tu
+
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "bench", "tu_corpus.json")
+
+with open(CORPUS_PATH, encoding="utf-8") as f:
+    REPORTS = {entry["name"]: parse_tu(entry["raw"]) for entry in json.load(f)}
+
+
+def state(name: str, now: float = 1000.0) -> ChannelState:
+    return ChannelState.from_report(REPORTS[name], now=now)
+
+
+def test_deadlines_from_report():
+    s = state("claim_cooldown")
+    assert not s.claim_available and s.claim_reset_at == 1000 + 7500
+    assert (s.rolls_left, s.rolls_reset_at) == (3, 1000 + 2460)
+    assert s.kakera_ready_at == 1000 + 3840
+    assert s.rt_ready_at == 1000 + 18120
+    assert (s.power, s.consumption, s.stock) == (28, 36, 987)
+
+
+def test_claim_and_rt_come_off_cooldown():
+    s = state("claim_cooldown")
+    assert not s.claim_ready(now=1000 + 7499)
+    assert s.claim_ready(now=1000 + 7500)
+    assert not s.rt_ready(now=1000 + 18119)
+    assert s.rt_ready(now=1000 + 18120)
+    assert s.kakera_ready(now=1000 + 3840)
+
+
+def test_can_roll():
+    assert state("claim_ready_full").can_roll(now=1000)
+    assert not state("no_rolls_daily_ready").can_roll(now=1000)
+    s = state("claim_cooldown")
+    assert not s.can_roll(now=1001)  # rolls left, but neither claim nor $rt is ready
+    assert s.can_roll(now=1000 + 7500)
+    s = state("claim_ready_full")
+    s.claim_in_progress = True
+    assert not s.can_roll(now=1000)
+
+
+def test_next_event_and_refresh():
+    s = state("claim_cooldown")
+    assert s.next_event_at() == 1000 + 2460  # rolls refill first
+    assert not s.needs_refresh(now=1000 + 2459)
+    assert s.needs_refresh(now=1000 + 2460)
+    assert state("empty").next_event_at() is None
+    assert not state("empty").needs_refresh(now=1e9)
+
+
+def test_mark_claimed_and_rt_used():
+    s = state("claim_ready_full")
+    s.mark_claimed(now=1001)
+    assert not s.claim_available and s.claim_reset_at == 1000 + 4680 and not s.stale
+    s = state("claim_cooldown")
+    s.mark_claimed(now=1000 + 8000)  # only projected available: the next reset is unknown
+    assert s.claim_reset_at is None and s.stale
+    s = state("claim_ready_full")
+    s.mark_rt_used()
+    assert not s.rt_ready(now=1e9) and s.stale and s.needs_refresh(now=1000)
+
+
+def test_apply_report_keeps_in_progress_flags():
+    s = state("claim_ready_full")
+    s.claim_in_progress = True
+    s.stale = True
+    s.apply_report(REPORTS["claim_cooldown"], now=2000)
+    assert s.claim_in_progress and not s.stale
+    assert s.claim_reset_at == 2000 + 7500
+
+
+def test_summary_durations():
+    summary = state("claim_cooldown").summary(now=1000 + 60)
+    assert summary["claim"] == pytest.approx(7440)
+    assert summary["rolls"] == pytest.approx(2400)
+    assert summary["claim_available"] is False
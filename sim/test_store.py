@@ -0,0 +1,57 @@
+"""StateStore round trips (in-memory SQLite)."""
+import time
+
+import pytest
+
+from state import ChannelState
+from store import StateStore
+
+
+@pytest.fixture
+def store():
+    store = StateStore(":memory:")
+    yield store
+    store.close()
+
+
+def test_channel_state_round_trip(store):
+    now = time.monotonic()
+    state = ChannelState(fetched_at=now, claim_available=True, claim_in_progress=True, claim_reset_at=now + 600,
+                         rolls_left=7, rolls_reset_at=now + 1200, power=80, consumption=36, stock=1234,
+                         rt_available=True, rt_ready_at=None, dk_ready=True)
+    store.save_channel(42, state)
+    loaded = store.load_channels()[42]
+    assert loaded.claim_available and loaded.rt_available and loaded.dk_ready
+    assert (loaded.rolls_left, loaded.power, loaded.consumption, loaded.stock) == (7, 80, 36, 1234)
+    assert loaded.claim_reset_at == pytest.approx(now + 600, abs=0.5)
+    assert loaded.rolls_reset_at == pytest.approx(now + 1200, abs=0.5)
+    assert loaded.rt_ready_at is None
+    assert not loaded.claim_in_progress  # transient, not restored
+
+
+def test_watchlist_round_trip(store):
+    assert store.load_watchlist() is None
+    store.save_watchlist(["Rem | Remu", "Emilia"], 123, 4)
+    assert store.load_watchlist() == (["Rem | Remu", "Emilia"], 123, 4)
+    store.save_watchlist(["Ram"], None, 0)
+    assert store.load_watchlist() == (["Ram"], None, 0)
+
+
+def test_global_timers_round_trip(store):
+    store.save_global_timers({"daily": 3600, "vote": 0})
+    timers = store.load_global_timers()
+    assert timers["vote"] == 0
+    assert 3590 <= timers["daily"] <= 3600
+
+
+def test_claim_log(store):
+    store.log_claim(1, "Rem", 120, "watchlist")
+    store.log_claim(1, "Ram", 80, "kakera", status="lost")
+    rows = store._conn.execute("SELECT kind, channel_id, name, kakera, reason FROM events ORDER BY id").fetchall()
+    assert rows == [("claim", 1, "Rem", 120, "watchlist"), ("claim_lost", 1, "Ram", 80, "kakera")]
+
+
+def test_planner_round_trip(store):
+    assert store.load_planner() is None
+    store.save_planner({"overall": [3, 0.5, 10.0, 0.0, 50.0, 1.2]})
+    assert store.load_planner() == {"overall": [3, 0.5, 10.0, 0.0, 50.0, 1.2]}
@@ -0,0 +1,30 @@
+"""`$tu` parsing against the golden corpus in bench/tu_corpus.json."""
+import json
+import os
+
+import pytest
+
+from tu_parser import parse_time_segment, parse_tu
+
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "bench", "tu_corpus.json")
+
+with open(CORPUS_PATH, encoding="utf-8") as f:
+    CORPUS = json.load(f)
+
+
+@pytest.mark.parametrize("entry", CORPUS, ids=[entry["name"] for entry in CORPUS])
+def test_corpus(entry):
+    assert parse_tu(entry["raw"]).as_dict() == entry["expected"]
+
+
+@pytest.mark.parametrize("segment, seconds", [
+    ("1h 18", 4680),
+    ("1h 18 min", 4680),
+    ("28", 1680),
+    ("28 min", 1680),
+    ("49 m", 2940),
+    ("**2h 05**", 7500),
+    ("", 0),
+])
+def test_time_segment(segment, seconds):
+    assert parse_time_segment(segment) == seconds
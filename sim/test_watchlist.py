@@ -0,0 +1,68 @@
+"""Watchlist matching: normalization, aliases and the bounded fuzzy search."""
+import random
+
+import pytest
+
+from watchlist import Watchlist, normalize_name, trigrams
+
+
+def test_normalize_name():
+    assert normalize_name("Rém  (Re:Zero)") == "rem re zero"
+    assert normalize_name("  ÉMILIA ") == "emilia"
+    assert normalize_name("???") == "???"
+
+
+def test_add_match_remove():
+    watchlist = Watchlist(["Rem", "Émilia"])
+    assert watchlist.match("  REM ") == "Rem"
+    assert watchlist.match("emilia") == "Émilia"
+    assert watchlist.match("Ram") is None
+    assert not watchlist.add("rem")  # same key
+    assert not watchlist.add("   ")
+    assert watchlist.remove("EMILIA")
+    assert not watchlist.remove("Emilia")
+    assert "emilia" not in watchlist and "rem" in watchlist
+
+
+def test_insertion_order():
+    watchlist = Watchlist(["Rem", "Ram", "Emilia"])
+    watchlist.remove("Ram")
+    watchlist.add("Beatrice")
+    assert watchlist.names() == ["Rem", "Emilia", "Beatrice"]
+    assert len(watchlist) == 3
+
+
+def test_exact_and_alias():
+    watchlist = Watchlist(["Rem | Rem (Re:Zero) | Remu", "Émilia"])
+    assert watchlist.lookup("  REM ").reason == "exact"
+    hit = watchlist.lookup("remu")
+    assert (hit.name, hit.reason) == ("Rem", "alias")
+    assert watchlist.match("emilia") == "Émilia"
+    assert watchlist.lookup("Ram") is None
+
+
+def brute_force(watchlist: Watchlist, name: str):
+    """Best Dice score over every indexed term, as the trigram index should find it."""
+    query = trigrams(normalize_name(name))
+    best = max(((2 * len(query & grams) / (len(query) + len(grams)), term)
+                for term, grams in watchlist._grams.items()), default=(0.0, None))
+    return best if best[0] >= watchlist.fuzzy_threshold else None
+
+
+@pytest.mark.parametrize("threshold", [0.6, 0.85])
+def test_fuzzy_matches_brute_force(threshold):
+    rng = random.Random(7)
+    syllables = ["ka", "ri", "to", "mi", "ne", "su", "ha", "ru", "yo", "shi", "ra", "n"]
+    names = {" ".join("".join(rng.choice(syllables) for _ in range(rng.randint(2, 4))) for _ in range(2))
+             for _ in range(1000)}
+    watchlist = Watchlist(sorted(names), fuzzy_threshold=threshold)
+    queries = [name[:-1] + "x" for name in rng.sample(sorted(names), 100)]
+    queries += ["".join(rng.choice(syllables) for _ in range(6)) for _ in range(100)]
+    for query in queries:
+        expected = brute_force(watchlist, query)
+        hit = watchlist.lookup(query)
+        if expected is None:
+            assert hit is None, query
+        else:
+            assert hit is not None and hit.reason in ("fuzzy", "exact"), query
+            assert hit.score == pytest.approx(expected[0]) or hit.reason == "exact", query
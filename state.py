@@ -0,0 +1,159 @@
+"""
+Per-channel Mudae state with locally projected timers.
+
+A `$tu` reply gives durations; ChannelState turns them into deadlines on the
+monotonic clock so claim, rolls, kakera and `$rt` availability can be
+projected forward without asking Mudae again. A refresh is only due once one
+of those deadlines passes (or the state is explicitly marked stale).
+"""
+import time
+from dataclasses import dataclass, field
+
+from tu_parser import TuReport
+
+
+def _deadline(seconds: int | None, now: float) -> float | None:
+    return None if seconds is None else now + seconds
+
+
+@dataclass(slots=True)
+class ChannelState:
+    fetched_at: float = field(default_factory=time.monotonic)
+    claim_available: bool = False
+    claim_in_progress: bool = False
+    claim_reset_at: float | None = None
+    rolls_left: int = 0
+    rolls_reset_at: float | None = None
+    kakera_available: bool = True
+    kakera_ready_at: float | None = None
+    power: int | None = None
+    consumption: int | None = None
+    stock: int | None = None
+    rt_available: bool = False
+    rt_in_progress: bool = False
+    rt_ready_at: float | None = None
+    dk_ready: bool = False
+    # set when local bookkeeping can't be trusted (failed $tu, $rt used, ...)
+    stale: bool = False
+
+    @classmethod
+    def from_report(cls, report: TuReport, now: float | None = None) -> "ChannelState":
+        state = cls()
+        state.apply_report(report, now)
+        return state
+
+    def apply_report(self, report: TuReport, now: float | None = None) -> None:
+        """Overwrite timers from a fresh `$tu`; in-progress flags are kept."""
+        now = time.monotonic() if now is None else now
+        self.fetched_at = now
+        self.stale = False
+        self.claim_available = bool(report.claim_available)
+        self.claim_reset_at = _deadline(report.claim, now)
+        if report.rolls_left is not None and report.rolls is not None:
+            self.rolls_left = report.rolls_left
+            self.rolls_reset_at = _deadline(report.rolls, now)
+        else:
+            self.rolls_left = 0
+            self.rolls_reset_at = None
+        if report.kakera_available is not None:
+            self.kakera_available = report.kakera_available
+            self.kakera_ready_at = _deadline(report.kakera, now)
+        self.power = report.power
+        self.consumption = report.consumption
+        self.stock = report.stock
+        self.rt_available = report.rt_available
+        self.rt_ready_at = _deadline(report.rt, now)
+        self.dk_ready = report.dk_ready
+
+    def mark_claimed(self, now: float | None = None) -> None:
+        """Our claim is spent; if it was only projected, the next reset is unknown."""
+        now = time.monotonic() if now is None else now
+        self.claim_available = False
+        if self._passed(self.claim_reset_at, now):
+            self.claim_reset_at = None
+            self.stale = True
+
+    def mark_rt_used(self) -> None:
+        """`$rt` was sent; its new cooldown is only known after the next `$tu`."""
+        self.rt_available = False
+        self.rt_ready_at = None
+        self.stale = True
+
+    # ---- projections ----
+    @staticmethod
+    def _passed(deadline: float | None, now: float) -> bool:
+        return deadline is not None and now >= deadline
+
+    def claim_ready(self, now: float | None = None) -> bool:
+        now = time.monotonic() if now is None else now
+        return self.claim_available or self._passed(self.claim_reset_at, now)
+
+    def rt_ready(self, now: float | None = None) -> bool:
+        now = time.monotonic() if now is None else now
+        return self.rt_available or self._passed(self.rt_ready_at, now)
+
+    def kakera_ready(self, now: float | None = None) -> bool:
+        now = time.monotonic() if now is None else now
+        return self.kakera_available or self._passed(self.kakera_ready_at, now)
+
+    def rolls_reset(self, now: float | None = None) -> bool:
+        now = time.monotonic() if now is None else now
+        return self._passed(self.rolls_reset_at, now)
+
+    def can_roll(self, now: float | None = None) -> bool:
+        """Rolls left and something to spend them on (claim or $rt), per the last $tu."""
+        now = time.monotonic() if now is None else now
+        return (
+            self.rolls_left > 0
+            and not self.claim_in_progress
+            and (self.claim_ready(now) or self.rt_ready(now))
+        )
+
+    def next_event_at(self) -> float | None:
+        """
+        Earliest deadline that changes what we can do here: rolls refilling,
+        or claim/$rt/kakera coming off cooldown. None if nothing is pending.
+        """
+        deadlines = [self.rolls_reset_at]
+        if not self.claim_available:
+            deadlines.append(self.claim_reset_at)
+        if not self.rt_available:
+            deadlines.append(self.rt_ready_at)
+        if not self.kakera_available:
+            deadlines.append(self.kakera_ready_at)
+        pending = [d for d in deadlines if d is not None]
+        return min(pending) if pending else None
+
+    def needs_refresh(self, now: float | None = None) -> bool:
+        """True once a projected event has fired (or the state is stale)."""
+        now = time.monotonic() if now is None else now
+        if self.stale:
+            return True
+        event_at = self.next_event_at()
+        return event_at is not None and now >= event_at
+
+    def remaining(self, deadline: float | None, now: float | None = None) -> float | None:
+        """Seconds until `deadline` (never negative), or None if unknown."""
+        if deadline is None:
+            return None
+        now = time.monotonic() if now is None else now
+        return max(0.0, deadline - now)
+
+    def summary(self, now: float | None = None) -> dict:
+        """Snapshot for the console timer summary (durations in seconds)."""
+        now = time.monotonic() if now is None else now
+        return {
+            "claim_available": self.claim_ready(now),
+            "claim_in_progress": self.claim_in_progress,
+            "claim": self.remaining(self.claim_reset_at, now),
+            "rolls_left": self.rolls_left,
+            "rolls": self.remaining(self.rolls_reset_at, now),
+            "kakera_available": self.kakera_ready(now),
+            "kakera": self.remaining(self.kakera_ready_at, now),
+            "power": self.power,
+            "consumption": self.consumption,
+            "stock": self.stock,
+            "rt_available": self.rt_ready(now),
+            "rt": self.remaining(self.rt_ready_at, now),
+            "dk_ready": self.dk_ready,
+        }
@@ -0,0 +1,156 @@
+"""
+Embedded SQLite store for warm restarts.
+
+Keeps the last known ChannelState of every channel, the watchlist, the global
+daily/vote timers, the roll planner's statistics and an append-only claim log in one WAL-mode database,
+so a restart can resume from projected timers instead of re-sending `$tu`
+everywhere. ChannelState deadlines live on the monotonic clock, which resets
+with the process, so they are stored as wall-clock times and converted back
+on load. Writes are small autocommitted statements; replacing the watchlist
+is one transaction.
+"""
+import json
+import sqlite3
+import time
+from dataclasses import asdict
+
+from state import ChannelState
+
+# ChannelState fields holding time.monotonic() values
+_MONOTONIC_FIELDS = ("fetched_at", "claim_reset_at", "rolls_reset_at", "kakera_ready_at", "rt_ready_at")
+# only meaningful while the process that set them is alive
+_TRANSIENT_FIELDS = ("claim_in_progress", "rt_in_progress")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS channel_state (
+    channel_id INTEGER PRIMARY KEY,
+    saved_at   REAL NOT NULL,
+    data       TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS watchlist (
+    position INTEGER PRIMARY KEY,
+    entry    TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS global_timers (
+    name     TEXT PRIMARY KEY,
+    ready_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS events (
+    id         INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts         REAL NOT NULL,
+    kind       TEXT NOT NULL,
+    channel_id INTEGER NOT NULL,
+    name       TEXT NOT NULL,
+    kakera     INTEGER,
+    reason     TEXT
+);
+CREATE INDEX IF NOT EXISTS events_kind_ts ON events (kind, ts);
+"""
+
+
+class StateStore:
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = sqlite3.connect(path, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    # ---- channel state ----
+    def save_channel(self, channel_id: int, state: ChannelState) -> None:
+        wall, mono = time.time(), time.monotonic()
+        data = asdict(state)
+        for name in _MONOTONIC_FIELDS:
+            if data[name] is not None:
+                data[name] = wall + (data[name] - mono)
+        for name in _TRANSIENT_FIELDS:
+            data.pop(name)
+        self._conn.execute(
+            "INSERT OR REPLACE INTO channel_state (channel_id, saved_at, data) VALUES (?, ?, ?)",
+            (channel_id, wall, json.dumps(data)),
+        )
+
+    def load_channels(self) -> dict[int, ChannelState]:
+        """Saved channel states with deadlines projected onto this process's monotonic clock."""
+        wall, mono = time.time(), time.monotonic()
+        states = {}
+        for channel_id, saved_at, data in self._conn.execute("SELECT channel_id, saved_at, data FROM channel_state"):
+            if saved_at > wall:
+                continue  # wall clock went backwards; the projection can't be trusted
+            fields = json.loads(data)
+            for name in _MONOTONIC_FIELDS:
+                if fields.get(name) is not None:
+                    fields[name] = mono + (fields[name] - wall)
+            known = {k: v for k, v in fields.items() if k in ChannelState.__dataclass_fields__}
+            states[channel_id] = ChannelState(**known)
+        return states
+
+    # ---- watchlist ----
+    def save_watchlist(self, entries: list[str], last_message_id: int | None, records: int) -> None:
+        """
+        Replace the cached watchlist. `last_message_id` is the newest journal message
+        it reflects and `records` the journal records since the latest snapshot.
+        """
+        with self._conn:
+            self._conn.execute("BEGIN")
+            self._conn.execute("DELETE FROM watchlist")
+            self._conn.executemany(
+                "INSERT INTO watchlist (position, entry) VALUES (?, ?)", enumerate(entries)
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                [("watchlist_last_id", last_message_id), ("watchlist_records", records)],
+            )
+
+    def load_watchlist(self) -> tuple[list[str], int | None, int] | None:
+        """(entries, last_message_id, records) as saved, or None if never saved."""
+        meta = dict(self._conn.execute(
+            "SELECT key, value FROM meta WHERE key IN ('watchlist_last_id', 'watchlist_records')"
+        ))
+        if "watchlist_records" not in meta:
+            return None
+        rows = self._conn.execute("SELECT entry FROM watchlist ORDER BY position").fetchall()
+        last_id = meta.get("watchlist_last_id")
+        return [entry for (entry,) in rows], None if last_id is None else int(last_id), int(meta["watchlist_records"])
+
+    # ---- global timers (daily / vote) ----
+    def save_global_timers(self, timers: dict[str, int]) -> None:
+        """`timers` maps name -> seconds until ready, as parsed from `$tu`."""
+        now = time.time()
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO global_timers (name, ready_at) VALUES (?, ?)",
+            [(name, now + seconds) for name, seconds in timers.items()],
+        )
+
+    def load_global_timers(self) -> dict[str, int]:
+        now = time.time()
+        return {
+            name: max(0, int(ready_at - now))
+            for name, ready_at in self._conn.execute("SELECT name, ready_at FROM global_timers")
+        }
+
+    # ---- roll planner statistics ----
+    def save_planner(self, data: dict) -> None:
+        self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('planner', ?)", (json.dumps(data),))
+
+    def load_planner(self) -> dict | None:
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'planner'").fetchone()
+        return None if row is None else json.loads(row[0])
+
+    # ---- claim log ----
+    def log_claim(self, channel_id: int, name: str, kakera: int, reason: str, status: str = "confirmed") -> None:
+        """`status` other than confirmed ("unconfirmed", "refused", "lost") is logged as kind claim_<status>."""
+        self._log("claim" if status == "confirmed" else f"claim_{status}", channel_id, name, kakera, reason)
+
+    def _log(self, kind: str, channel_id: int, name: str, kakera: int | None, reason: str | None) -> None:
+        self._conn.execute(
+            "INSERT INTO events (ts, kind, channel_id, name, kakera, reason) VALUES (?, ?, ?, ?, ?, ?)",
+            (time.time(), kind, channel_id, name, kakera, reason),
+        )
@@ -0,0 +1,166 @@
+"""
+Pure parser for Mudae `$tu` replies.
+
+Everything here is independent of discord so it can be imported, benchmarked
+and checked against the golden corpus in `bench/tu_corpus.json` without a
+live session. All patterns are compiled once at import and the reply text is
+scanned a single time with one alternation regex.
+"""
+import re
+from dataclasses import dataclass
+
+# -------------------------
+# Time segments ("1h 18", "28 min", "49 m")
+# -------------------------
+_SEGMENT_TOKEN_RE = re.compile(r"(\d+)\s*(h|m(?:in(?:ute)?s?)?)?")
+
+
+def parse_time_segment(seg: str) -> int:
+    """
+    Parse a time segment from Mudae $tu lines.
+    Accepts examples: '1h 18', '1h 18 min', '28', '28 min', '49 m'.
+    Returns seconds.
+    """
+    if not seg:
+        return 0
+    hours = None
+    minutes = None
+    nums = []
+    for num, unit in _SEGMENT_TOKEN_RE.findall(seg.replace("*", "").lower()):
+        value = int(num)
+        nums.append(value)
+        if not unit:
+            continue
+        if unit == "h":
+            if hours is None:
+                hours = value
+        elif minutes is None:
+            minutes = value
+
+    if minutes is None:
+        if hours is not None and len(nums) >= 2:
+            minutes = nums[1]
+        elif hours is None and nums:
+            minutes = nums[0]
+    return (hours or 0) * 3600 + (minutes or 0) * 60
+
+
+# -------------------------
+# $tu reply
+# -------------------------
+# One alternation, one scan. Each branch owns a named group; `lastgroup`
+# tells us which line we hit. Order matters only where branches overlap
+# (the $rt cooldown line must win over the bare "time left" fallback).
+# The leading guard rejects mid-word positions and letters no branch starts
+# with before the alternation is tried, which is most of the text.
+_TU_RE = re.compile(
+    r"""
+    (?<![a-z])(?=[ynrpcst$m])
+    (?:
+      (?P<claim_now>you\s+__can__\s+claim\s+right\s+now)
+    | next\s+claim\s+reset\s+is\s+in\s+\*\*(?P<claim_reset>.+?)\*\*
+    | you\s+can'?t\s+claim\s+for\s+another\s+\*\*(?P<claim_wait>.+?)\*\*
+    | you\s+have\s+\*\*(?P<rolls_left>\d+)\*\*\s+rolls?
+    | next\s+rolls\s+reset\s+in\s+\*\*(?P<rolls_reset>.+?)\*\*
+    | (?P<kakera_now>you\s+__can__\s+react\s+to\s+kakera\s+right\s+now)
+    | react\s+to\s+kakera\s+for\s+\*\*(?P<kakera_wait>.+?)\*\*
+    | power:\s*\*\*(?P<power>\d+)%\*\*
+    | consumes\s*(?P<consumption>\d+)%\s*of\s+your\s+reaction\s+power
+    | stock:\s*\*\*(?P<stock>[\d,]+)\*\*<:kakera
+    | (?P<rt_now>\$rt\s+is\s+available)
+    | the\s+cooldown\s+of\s+\$rt\s+is\s+not\s+over.*?time\s+left[:\s]*\*\*(?P<rt_wait>.+?)\*\*
+    | time\s+left[:\s]*(?P<rt_wait_bare>[\dhm\s:]+)
+    | (?P<dk_now>\$dk\s+is\s+ready)
+    | (?P<daily_now>\$daily\s+is\s+available)
+    | next\s+\$daily\s+reset\s+in\s+\*\*(?P<daily_wait>.+?)\*\*
+    | (?P<vote_now>you\s+may\s+vote\s+right\s+now)
+    | may\s+vote\s+again\s+in\s+\*\*(?P<vote_wait>.+?)\*\*
+    )
+    """,
+    re.I | re.X,
+)
+
+
+@dataclass(slots=True)
+class TuReport:
+    """
+    Typed result of one `$tu` reply. Durations are seconds until the
+    corresponding reset; `None` means the line was absent from the reply.
+    """
+    claim_available: bool | None = None
+    claim: int | None = None
+    rolls_left: int | None = None
+    rolls: int | None = None
+    kakera_available: bool | None = None
+    kakera: int | None = None
+    power: int | None = None
+    consumption: int | None = None
+    stock: int | None = None
+    rt_available: bool = False
+    rt: int | None = None
+    dk_ready: bool = False
+    daily_available: bool = False
+    daily: int | None = None
+    vote_available: bool = False
+    vote: int | None = None
+
+    def as_dict(self) -> dict:
+        """Plain dict of every field (used by the corpus and benchmarks)."""
+        return {name: getattr(self, name) for name in self.__dataclass_fields__}
+
+
+def parse_tu(raw: str) -> TuReport:
+    """Parse a raw Mudae `$tu` reply into a TuReport in a single scan."""
+    report = TuReport()
+    if not raw:
+        return report
+
+    for m in _TU_RE.finditer(raw):
+        kind = m.lastgroup
+        value = m.group(kind)
+        if kind == "claim_now":
+            report.claim_available = True
+        elif kind == "claim_reset":
+            report.claim = parse_time_segment(value)
+        elif kind == "claim_wait":
+            report.claim = parse_time_segment(value)
+            report.claim_available = False
+        elif kind == "rolls_left":
+            report.rolls_left = int(value)
+        elif kind == "rolls_reset":
+            report.rolls = parse_time_segment(value)
+        elif kind == "kakera_now":
+            report.kakera_available = True
+            report.kakera = 0
+        elif kind == "kakera_wait":
+            report.kakera_available = False
+            report.kakera = parse_time_segment(value)
+        elif kind == "power":
+            report.power = int(value)
+        elif kind == "consumption":
+            report.consumption = int(value)
+        elif kind == "stock":
+            report.stock = int(value.replace(",", ""))
+        elif kind == "rt_now":
+            report.rt_available = True
+            report.rt = 0
+        elif kind in ("rt_wait", "rt_wait_bare"):
+            if not report.rt_available:
+                report.rt = parse_time_segment(value)
+        elif kind == "dk_now":
+            report.dk_ready = True
+        elif kind == "daily_now":
+            report.daily_available = True
+            report.daily = 0
+        elif kind == "daily_wait":
+            report.daily = parse_time_segment(value)
+        elif kind == "vote_now":
+            report.vote_available = True
+            report.vote = 0
+        elif kind == "vote_wait":
+            report.vote = parse_time_segment(value)
+
+    # a claimable reply without a reset line still needs a numeric timer
+    if report.claim_available and report.claim is None:
+        report.claim = 0
+    return report
@@ -0,0 +1,235 @@
+"""
+Watchlist index for character names.
+
+Names are normalized once when they are inserted (case, accents, punctuation
+and whitespace), so a roll only costs one normalization plus a dict lookup no
+matter how long the list is. Insertion order is kept for `$listchars` and for
+reposting the list to CHARACTER_CHANNEL_ID.
+
+A watchlist line may carry aliases separated by `|`:
+
+    Rem | Rem (Re:Zero) | Remu
+
+Optional fuzzy matching uses a trigram index built at insert time, so a roll
+is only scored against names sharing its rarest trigrams instead of the whole
+list.
+"""
+import math
+import re
+import unicodedata
+from collections import Counter
+from dataclasses import dataclass
+from typing import Iterable, Iterator
+
+_NON_WORD_RE = re.compile(r"[\W_]+")
+ALIAS_SEPARATOR = "|"
+
+
+def normalize_name(name: str) -> str:
+    """
+    Canonical lookup key for a character name:
+    'Rém  (Re:Zero)' -> 'rem re zero'.
+    """
+    decomposed = unicodedata.normalize("NFKD", name)
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    key = _NON_WORD_RE.sub(" ", stripped.casefold()).strip()
+    # names made only of punctuation still need a usable key
+    return key or name.strip().casefold()
+
+
+def trigrams(key: str) -> frozenset[str]:
+    """Padded character trigrams of a normalized key."""
+    padded = f"  {key} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+@dataclass(slots=True, frozen=True)
+class WatchMatch:
+    """A watchlist hit: the stored name, how it matched and its similarity."""
+    name: str
+    reason: str  # "exact", "alias" or "fuzzy"
+    score: float = 1.0
+
+    def describe(self) -> str:
+        if self.reason == "fuzzy":
+            return f"fuzzy {self.score:.2f} → {self.name}"
+        if self.reason == "alias":
+            return f"alias → {self.name}"
+        return "exact"
+
+
+class Watchlist:
+    """
+    Ordered set of character names with O(1) normalized lookup/add/remove,
+    an alias table and an optional trigram index for fuzzy matching.
+    `fuzzy_threshold` is the minimum Dice similarity (0-1); 0 disables fuzzy.
+    """
+
+    __slots__ = ("_names", "_aliases", "_alias_index", "_grams", "_postings", "fuzzy_threshold")
+
+    def __init__(self, names: Iterable[str] = (), fuzzy_threshold: float = 0.0):
+        self.fuzzy_threshold = fuzzy_threshold
+        # normalized key -> name as entered (dicts keep insertion order)
+        self._names: dict[str, str] = {}
+        # canonical key -> aliases as entered; alias key -> canonical key
+        self._aliases: dict[str, list[str]] = {}
+        self._alias_index: dict[str, str] = {}
+        # indexed term (name or alias key) -> its trigrams; trigram -> terms
+        self._grams: dict[str, frozenset[str]] = {}
+        self._postings: dict[str, set[str]] = {}
+        for name in names:
+            self.add(name)
+
+    # ---- mutation ----
+    def add(self, entry: str) -> bool:
+        """
+        Add a watchlist line (`name` or `name | alias | ...`).
+        Returns True if the name or any of its aliases was new.
+        """
+        name, *aliases = [part.strip() for part in entry.split(ALIAS_SEPARATOR)]
+        if not name:
+            return False
+        key = normalize_name(name)
+        added = key not in self._names and key not in self._alias_index
+        if added:
+            self._names[key] = name
+            self._index_term(key)
+        else:
+            key = self._alias_index.get(key, key)
+        for alias in aliases:
+            added = self.add_alias(key, alias) or added
+        return added
+
+    def add_alias(self, key: str, alias: str) -> bool:
+        """Attach `alias` to the stored name with normalized `key`."""
+        alias_key = normalize_name(alias) if alias.strip() else ""
+        if not alias_key or alias_key in self._names or alias_key in self._alias_index:
+            return False
+        self._aliases.setdefault(key, []).append(alias.strip())
+        self._alias_index[alias_key] = key
+        self._index_term(alias_key)
+        return True
+
+    def remove(self, name: str) -> bool:
+        """Remove `name` (or the name owning alias `name`) and its aliases."""
+        key = normalize_name(name)
+        key = self._alias_index.get(key, key)
+        if self._names.pop(key, None) is None:
+            return False
+        self._unindex_term(key)
+        for alias in self._aliases.pop(key, ()):
+            alias_key = normalize_name(alias)
+            self._alias_index.pop(alias_key, None)
+            self._unindex_term(alias_key)
+        return True
+
+    def clear(self) -> None:
+        self._names.clear()
+        self._aliases.clear()
+        self._alias_index.clear()
+        self._grams.clear()
+        self._postings.clear()
+
+    # ---- lookup ----
+    def lookup(self, name: str) -> WatchMatch | None:
+        """Match a rolled name: exact, then alias, then fuzzy (if enabled)."""
+        key = normalize_name(name)
+        stored = self._names.get(key)
+        if stored is not None:
+            return WatchMatch(stored, "exact")
+        owner = self._alias_index.get(key)
+        if owner is not None:
+            return WatchMatch(self._names[owner], "alias")
+        if self.fuzzy_threshold > 0:
+            return self._fuzzy_lookup(key)
+        return None
+
+    def match(self, name: str) -> str | None:
+        """Return the stored name matching `name`, or None."""
+        hit = self.lookup(name)
+        return hit.name if hit else None
+
+    def names(self) -> list[str]:
+        """Stored names in insertion order."""
+        return list(self._names.values())
+
+    def entries(self) -> list[str]:
+        """Watchlist lines (name plus aliases) in insertion order."""
+        lines = []
+        for key, name in self._names.items():
+            aliases = self._aliases.get(key)
+            lines.append(f" {ALIAS_SEPARATOR} ".join([name, *aliases]) if aliases else name)
+        return lines
+
+    def __contains__(self, name: object) -> bool:
+        if not isinstance(name, str):
+            return False
+        key = normalize_name(name)
+        return key in self._names or key in self._alias_index
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._names.values())
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def __bool__(self) -> bool:
+        return bool(self._names)
+
+    # ---- trigram index ----
+    def _index_term(self, term: str) -> None:
+        grams = trigrams(term)
+        self._grams[term] = grams
+        for gram in grams:
+            self._postings.setdefault(gram, set()).add(term)
+
+    def _unindex_term(self, term: str) -> None:
+        for gram in self._grams.pop(term, ()):
+            terms = self._postings.get(gram)
+            if terms is not None:
+                terms.discard(term)
+                if not terms:
+                    del self._postings[gram]
+
+    def _fuzzy_lookup(self, key: str) -> WatchMatch | None:
+        """
+        Best Dice match over trigrams at or above fuzzy_threshold.
+        Prefix filter: a term reaching the threshold must share at least
+        ceil(t*|q|/(2-t)) trigrams with the query, so it has to appear in the
+        postings of the query's |q| - that + 1 rarest trigrams. Shared hits
+        are counted over those postings, and only terms whose trigram count
+        can reach the threshold and whose hits plus the trigrams left can
+        reach the overlap their length needs get scored.
+        """
+        query = trigrams(key)
+        threshold = self.fuzzy_threshold
+        size = len(query)
+        shortest = max(1, math.ceil(threshold * size / (2 - threshold)))
+        longest = math.floor((2 - threshold) * size / threshold)
+        postings = self._postings
+        known = sorted((g for g in query if g in postings), key=lambda g: len(postings[g]))
+        if len(known) < shortest:
+            return None
+        # unseen trigrams are the rarest of all and already fill part of the prefix
+        prefix = len(known) - shortest + 1
+        rest = shortest - 1  # known trigrams outside the prefix
+
+        hits = Counter()
+        for gram in known[:prefix]:
+            hits.update(postings[gram])
+        # prefix hits a term with n trigrams needs before it is worth scoring
+        needed = [math.ceil(threshold * (size + n) / 2) - rest for n in range(longest + 1)]
+        grams_of = self._grams
+        best_score, best_term = 0.0, None
+        for term, count in hits.items():
+            grams = grams_of[term]
+            n = len(grams)
+            if n < shortest or n > longest or count < needed[n]:
+                continue
+            score = 2 * len(query & grams) / (size + n)
+            if (score, term) > (best_score, best_term or ""):
+                best_score, best_term = score, term
+        if best_score < threshold:
+            return None
+        owner = self._alias_index.get(best_term, best_term)
+        return WatchMatch(self._names[owner], "fuzzy", best_score)